@@ -1,14 +1,37 @@
 # app/main.py
 
-from fastapi import FastAPI, UploadFile, File
-from fastapi.responses import HTMLResponse
+from fastapi import BackgroundTasks, FastAPI, UploadFile, File, Request, Response, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from app.services.parser import extract_text_from_bytes
-from app.services.llm import UIAnalyzer
+from pydantic import ValidationError
+from app.services.parse_cache import parse_cache
+from app.services.llm import ScreenRegenerationError, UIAnalyzer
+from app.services.dynamic_ui_generator import DynamicUIGenerator
 from app.services.figma_client import FigmaClient
-from app.schemas import UIReport, UIReportResponse
+from app.services import metrics
+from app.services.admission import AdmissionController, AdmissionRejected
+from app.services.job_queue import JobQueue
+from app.services.profiler import ProfilerBusyError, check_admin_token, profile_worker
+from app.services.uploads import UploadSizeLimitMiddleware, spool_upload
+from app.services.compression import CompressionMiddleware
+from app.services.fast_json import FastJSONResponse, dumps, encode_fields, encode_report
+from app.services.pages import (ASSETS, PAGE_CACHE_CONTROL, STATIC_CACHE_CONTROL, UPLOAD_FORM, cached_response,
+                                etag_matches, render_report_page)
+from app.services.report_feed import LATEST_REPORT_MAX_WAIT, PublishedReport, ReportFeed
+from app.services.revisions import RevisionStore, diff_paragraphs, plan_revision, project_key, split_paragraphs
+from app.services.safe_regex import safe_pattern
+from app.services.summarizer import summarize
+from app.services.keywords import keyword_matcher, register_tables
+from app.services.text_index import token_index
+from app.schemas import UIReport, UIReportResponse, UIScreen
+from concurrent.futures import ThreadPoolExecutor
+from typing import Literal, Optional
+import asyncio
+import contextvars
 import os
+import re
 import json
 import webbrowser
 import threading
@@ -21,6 +44,39 @@ analyzer = UIAnalyzer()
 # Initialize Figma client
 figma_client = FigmaClient()
 
+# LLM-free report generator for /upload?mode=draft
+draft_generator = DynamicUIGenerator()
+
+# Bounded job queue for the upload endpoints (plugin lane has priority over the HTML form)
+admission = AdmissionController.from_env()
+
+# Durable queue for out-of-process report generation (see start_worker.py)
+job_queue = JobQueue()
+
+# Previous versions of each project's document, for incremental regeneration
+revision_store = RevisionStore()
+INCREMENTAL_REGENERATION = os.getenv("INCREMENTAL_REGENERATION", "1") != "0"
+
+# Token budget for the document excerpt in generated prompts (filled by the local summarizer)
+PROMPT_CONTENT_TOKENS = int(os.getenv("PROMPT_CONTENT_TOKENS", "250"))
+
+# Shared pool that builds document briefs while build_ui_report assembles the prompt (one slot per admitted pipeline)
+BRIEF_WORKERS = int(os.getenv("BRIEF_WORKERS", os.getenv("ADMISSION_MAX_CONCURRENCY", "4")))
+brief_executor = ThreadPoolExecutor(max_workers=BRIEF_WORKERS, thread_name_prefix="brief")
+
+CAMEL_CASE = re.compile(r'[A-Z][a-z]+(?:[A-Z][a-z]+)+')
+TECH_PATTERNS = [
+    safe_pattern("tech_names", r'\b(React|Angular|Vue|Python|Java|Node\.?js|MongoDB|PostgreSQL|MySQL|AWS|Azure|Docker|Kubernetes)\b', re.IGNORECASE),
+    safe_pattern("tech_phrases", r'(?:using|built with|powered by|based on)\s+([A-Z][a-zA-Z\s]{3,25})', re.IGNORECASE),
+]
+
+# Keyword tables for the shared matcher (app/services/keywords.py)
+register_tables({
+    "screens": ["login", "signup", "home", "dashboard", "profile", "cart", "checkout", "menu", "search", "settings", "booking", "payment"],
+    "features": ["search", "filter", "payment", "notification", "chat", "map", "calendar", "upload", "analytics"],
+    "project_domains": ["calculator", "chat", "ecommerce", "shop", "banking", "health", "food"],
+})
+
 # --------------------------------------------
 # LLM ANALYSIS → project name
 # --------------------------------------------
@@ -30,7 +86,7 @@ def extract_project_name(text: str) -> str:
         import hashlib
         from datetime import datetime
         
-        text_lower = text.lower()
+        text_lower = token_index(text).lower
         lines = [line.strip() for line in text.split('\n')[:50] if line.strip()]
         
         # Enhanced explicit project name patterns
@@ -122,8 +178,9 @@ def extract_project_name(text: str) -> str:
         }
         
         # Detect domain and extract specific names
+        domains_found = keyword_matcher.scan(text).found("project_domains")
         for domain, patterns in domain_patterns.items():
-            if any(keyword in text_lower for keyword in [domain, domain.replace('ecommerce', 'shop')]):
+            if domain in domains_found or (domain == 'ecommerce' and 'shop' in domains_found):
                 for pattern in patterns:
                     matches = re.findall(pattern, text[:800], re.IGNORECASE)
                     if matches:
@@ -252,29 +309,25 @@ def detect_domain_from_text(text: str) -> str:
     import re
     from collections import Counter
     
-    text_lower = text.lower()
+    index = token_index(text)
     
     # Extract domain-related nouns and phrases (what the app is ABOUT)
     domain_indicators = []
     
     # Pattern 1: "X app", "X application", "X platform", "X system"
-    app_patterns = re.findall(r'\b([a-z]+)\s+(?:app|application|platform|system|service|tool|portal|software)\b', text_lower)
-    domain_indicators.extend(app_patterns)
+    domain_indicators.extend(index.words_before(('app', 'application', 'platform', 'system', 'service', 'tool', 'portal', 'software')))
     
     # Pattern 2: "for X", "X management", "X solution"
-    for_patterns = re.findall(r'\bfor\s+([a-z]+(?:\s+[a-z]+){0,2})\b', text_lower)
-    domain_indicators.extend([p.strip() for p in for_patterns])
+    domain_indicators.extend(index.words_after(('for',), max_words=3))
     
-    management_patterns = re.findall(r'\b([a-z]+)\s+(?:management|solution|service)\b', text_lower)
-    domain_indicators.extend(management_patterns)
+    domain_indicators.extend(index.words_before(('management', 'solution', 'service')))
     
     # Pattern 3: Common action verbs that indicate domain
-    action_patterns = re.findall(r'\b(?:book|order|buy|sell|track|manage|schedule|reserve|deliver|browse|search|chat|message|pay|transfer|learn|teach|diagnose|treat)\s+([a-z]+)\b', text_lower)
-    domain_indicators.extend(action_patterns)
+    domain_indicators.extend(index.words_after(('book', 'order', 'buy', 'sell', 'track', 'manage', 'schedule', 'reserve', 'deliver', 'browse', 'search', 'chat', 'message', 'pay', 'transfer', 'learn', 'teach', 'diagnose', 'treat')))
     
     # Pattern 4: Industry-specific terms (first 500 chars for context)
-    industry_terms = re.findall(r'\b([a-z]{5,15})\b', text_lower[:500])
-    domain_indicators.extend(industry_terms)
+    domain_indicators.extend(index.lower_tokens[i] for i in index.token_range(0, 500)
+                             if index.tokens[i].isalpha() and 5 <= len(index.tokens[i]) <= 15)
     
     # Filter out common words
     stop_words = {'the', 'and', 'for', 'with', 'this', 'that', 'from', 'have', 'will', 'been', 'were', 
@@ -304,7 +357,8 @@ def detect_domain_from_text(text: str) -> str:
             return title_match.group(1).lower()
     
     # Final fallback: Use most common meaningful noun
-    nouns = re.findall(r'\b[a-z]{5,12}\b', text_lower[:1000])
+    nouns = [index.lower_tokens[i] for i in index.token_range(0, 1000)
+             if index.tokens[i].isalpha() and 5 <= len(index.tokens[i]) <= 12]
     filtered_nouns = [n for n in nouns if n not in stop_words]
     if filtered_nouns:
         noun_counts = Counter(filtered_nouns)
@@ -358,34 +412,36 @@ def extract_detailed_pdf_content(text: str) -> dict:
                 features.append(line)
     
     # Extract user personas (actual roles, not headings)
-    persona_patterns = [
-        r'(?:as\s+a|as\s+an)\s+([a-z]+(?:\s+[a-z]+){0,2})',
-        r'\b(customer|user|admin|manager|student|teacher|doctor|patient|buyer|seller|driver|rider)s?\b'
-    ]
+    index = token_index(text)
     personas = set()
-    for pattern in persona_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        personas.update([m.strip().title() for m in matches if len(m.strip()) > 2])
+    # "as a/an X Y Z"
+    for article in ('a', 'an'):
+        for i in index.occurrences(article):
+            if i > 0 and index.lower_tokens[i - 1] == 'as' and index.spaced(i - 1):
+                run = index.run_after(i, 3)
+                phrase = ' '.join(index.tokens[j] for j in run)
+                if len(phrase) > 2:
+                    personas.add(phrase.title())
+    for role in ('customer', 'user', 'admin', 'manager', 'student', 'teacher', 'doctor', 'patient', 'buyer', 'seller', 'driver', 'rider'):
+        if index.frequencies[role] or index.frequencies[role + 's']:
+            personas.add(role.title())
     
     # Extract technical specs (actual technologies, not headings)
-    tech_patterns = [
-        r'\b(React|Angular|Vue|Python|Java|Node\.?js|MongoDB|PostgreSQL|MySQL|AWS|Azure|Docker|Kubernetes)\b',
-        r'(?:using|built with|powered by|based on)\s+([A-Z][a-zA-Z\s]{3,25})'
-    ]
     tech_specs = set()
-    for pattern in tech_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
+    for pattern in TECH_PATTERNS:
+        matches = pattern.findall(text)
         tech_specs.update([m.strip() for m in matches if len(m.strip()) > 2])
     
     # Extract data entities dynamically from PDF content
     entities = set()
     
     # Extract nouns after "the", "a", "an" (most reliable for concrete nouns)
-    article_nouns = re.findall(r'\b(?:the|a|an)\s+([a-z]{4,15})\b', text.lower())
-    entities.update([n.title() for n in article_nouns])
+    article_nouns = index.words_after(('the', 'a', 'an'))
+    entities.update([n.title() for n in article_nouns if 4 <= len(n) <= 15])
     
     # Extract common entity patterns (Class-like names)
-    entity_patterns = re.findall(r'\b([A-Z][a-z]+(?:[A-Z][a-z]+)+)\b', text)  # CamelCase
+    entity_patterns = [t for t in index.tokens if t[0].isupper() and not t.isupper() and not t[1:].islower()
+                       and CAMEL_CASE.fullmatch(t)]  # CamelCase
     entities.update(entity_patterns)
     
     # Filter out verbs, adjectives, months, and error terms
@@ -471,12 +527,10 @@ def generate_dynamic_prompt(text: str, project_name: str, domain: str) -> str:
     # Extract detailed content
     detailed_content = extract_detailed_pdf_content(text)
     
-    # Original screen and feature detection
-    screen_keywords = ["login", "signup", "home", "dashboard", "profile", "cart", "checkout", "menu", "search", "settings", "booking", "payment"]
-    screens = [s for s in screen_keywords if s in text.lower()][:5]
-    
-    feature_keywords = ["search", "filter", "payment", "notification", "chat", "map", "calendar", "upload", "analytics"]
-    features = [f for f in feature_keywords if f in text.lower()][:6]
+    # Original screen and feature detection (one keyword scan for both tables)
+    hits = keyword_matcher.scan(text)
+    screens = hits.found("screens")[:5]
+    features = hits.found("features")[:6]
     
     # Extract PDF colors first - now always returns colors
     pdf_colors = extract_colors_from_pdf(text)
@@ -611,57 +665,79 @@ Incorporate the extracted business requirements, user personas, and workflows in
 Create screens that reflect the actual processes and data entities found in the PDF.
 Ensure the design supports the identified technical specifications and security requirements.
 
-Document Content: {text[:1000]}
+Document Content: {summarize(text, PROMPT_CONTENT_TOKENS)}
 
 REQUIRED: Create a UI that reflects the ACTUAL PDF content, not generic templates."""
     
     return prompt
 
-def build_ui_report(project_name: str, text: str, domain: str = "ecommerce") -> tuple:
+def add_document_brief(prompt: str, brief: str) -> str:
+    """Put the map-reduce brief right under the title line (the prompt is sent whole, so it is never dropped)"""
+    if not brief:
+        return prompt
+    title, _, rest = prompt.partition("\n")
+    return f"{title}\n\n{brief}\n{rest}"
+
+def apply_feature_screen_names(screens: list, features: list, project_name: str, indexes=None) -> None:
+    """Name the first screens after the extracted business requirements (in place)"""
+    for i, screen in enumerate(screens[:5]):
+        if i < len(features) and (indexes is None or i in indexes):
+            screen['name'] = f"{features[i][:50]} Screen"
+            screen['description'] = f"{features[i]} for {project_name}"
+
+def build_report_summary(domain: str, detailed_content: dict) -> str:
+    """Report summary built from extract_detailed_pdf_content() output"""
+    features_summary = ', '.join(detailed_content['business_requirements'][:3]) if detailed_content['business_requirements'] else 'core functionality'
+    return f"""{domain.title()} app with {features_summary}
+        
+📋 BUSINESS REQUIREMENTS: {len(detailed_content['business_requirements'])} identified
+👥 USER PERSONAS: {', '.join(detailed_content['user_personas'][:3]) if detailed_content['user_personas'] else 'General Users'}
+⚙️ TECHNICAL SPECS: {len(detailed_content['technical_specs'])} specifications
+🔄 WORKFLOWS: {len(detailed_content['workflows'])} processes identified
+🗃️ DATA ENTITIES: {', '.join(detailed_content['data_entities'][:4]) if detailed_content['data_entities'] else 'Standard entities'}
+🔒 SECURITY: {len(detailed_content['security_requirements'])} requirements"""
+
+def build_ui_report(project_name: str, text: str, domain: str = "ecommerce", detailed_content: Optional[dict] = None) -> tuple:
     try:
         # Extract detailed content for enhanced reporting
-        detailed_content = extract_detailed_pdf_content(text)
+        if detailed_content is None:
+            with metrics.stage("feature_extraction"):
+                detailed_content = extract_detailed_pdf_content(text)
+        
+        # Long documents: map-reduce brief over all sections, overlapped with local prompt building
+        brief_future = brief_executor.submit(contextvars.copy_context().run, analyzer.build_document_brief, text)
         
         # Generate enhanced prompt
-        dynamic_prompt = generate_dynamic_prompt(text, project_name, domain)
+        with metrics.stage("prompt_build"):
+            dynamic_prompt = generate_dynamic_prompt(text, project_name, domain)
+        try:
+            dynamic_prompt = add_document_brief(dynamic_prompt, brief_future.result())
+        except Exception as e:
+            print(f"Document brief error: {e}")
         ui_data = analyzer.generate_ui_spec(dynamic_prompt)
         
         if not ui_data or not ui_data.get("screens"):
             raise ValueError("LLM returned empty or invalid response")
         
         # FORCE correct screen names from extracted features
-        features = detailed_content['business_requirements']
-        if features and len(features) > 0:
-            # Override LLM-generated screen names with actual features
-            for i, screen in enumerate(ui_data.get("screens", [])[:5]):
-                if i < len(features):
-                    # Replace screen name with actual feature
-                    screen['name'] = f"{features[i][:50]} Screen"
-                    screen['description'] = f"{features[i]} for {project_name}"
+        apply_feature_screen_names(ui_data.get("screens", []), detailed_content['business_requirements'], project_name)
         
         # Generate dynamic summary from extracted features
-        features_summary = ', '.join(detailed_content['business_requirements'][:3]) if detailed_content['business_requirements'] else 'core functionality'
-        enhanced_summary = f"""{domain.title()} app with {features_summary}
-        
-📋 BUSINESS REQUIREMENTS: {len(detailed_content['business_requirements'])} identified
-👥 USER PERSONAS: {', '.join(detailed_content['user_personas'][:3]) if detailed_content['user_personas'] else 'General Users'}
-⚙️ TECHNICAL SPECS: {len(detailed_content['technical_specs'])} specifications
-🔄 WORKFLOWS: {len(detailed_content['workflows'])} processes identified
-🗃️ DATA ENTITIES: {', '.join(detailed_content['data_entities'][:4]) if detailed_content['data_entities'] else 'Standard entities'}
-🔒 SECURITY: {len(detailed_content['security_requirements'])} requirements"""
+        enhanced_summary = build_report_summary(domain, detailed_content)
             
-        report = UIReport(
-            project_name=ui_data.get("project_name", project_name),
-            summary=enhanced_summary,
-            screens=ui_data.get("screens", []),
-            styles=ui_data.get("styles", {}),
-            navigation_flow=ui_data.get("navigation_flow", []),
-            prototype_settings=ui_data.get("prototype_settings", {})
-        )
+        with metrics.stage("report_validation"):
+            report = UIReport(
+                project_name=ui_data.get("project_name", project_name),
+                summary=enhanced_summary,
+                screens=ui_data.get("screens", []),
+                styles=ui_data.get("styles", {}),
+                navigation_flow=ui_data.get("navigation_flow", []),
+                prototype_settings=ui_data.get("prototype_settings", {})
+            )
         return report, dynamic_prompt
     except Exception as e:
         print(f"LLM Error: {e}")
-        retry_prompt = f"Create a UI for: {project_name}. Context: {text[:1000]}"
+        retry_prompt = f"Create a UI for: {project_name}. Context: {summarize(text, PROMPT_CONTENT_TOKENS)}"
         ui_data = analyzer.generate_ui_spec(retry_prompt)
         report = UIReport(
             project_name=ui_data.get("project_name", project_name),
@@ -673,10 +749,88 @@ def build_ui_report(project_name: str, text: str, domain: str = "ecommerce") ->
         )
         return report, retry_prompt
 
+def reuse_previous_report(previous: dict, plan: dict, paragraphs: list, features: list, project_name: str,
+                          domain: str, detailed_content: dict) -> tuple:
+    """Partial/reuse plans: the previous report with only the affected screens regenerated"""
+    old = previous["report"]
+    screens = [dict(screen) for screen in old["screens"]]
+    prompt_used = previous.get("prompt") or ""
+    if plan["mode"] == "partial":
+        diff = diff_paragraphs(previous["paragraphs"], paragraphs)
+        changed_text = "\n".join(paragraphs[i] for i in sorted(diff["changed"]))
+        targets = [{"name": f"{features[i][:50]} Screen", "feature": features[i]} for i in plan["affected"]]
+        new_screens, prompt_used = analyzer.regenerate_screens(
+            changed_text, targets, old.get("styles", {}).get("colors", {})
+        )
+        # Screens the model did not return keep their layout and only get the new name
+        renamed = {screens[index]["name"]: target["name"] for index, target in zip(plan["affected"], targets)}
+        for index, screen in zip(plan["affected"], new_screens):
+            # Model output is merged only if the result is still a valid screen
+            try:
+                screens[index] = UIScreen.model_validate({**screens[index], **screen}).model_dump()
+            except ValidationError as e:
+                print(f"Keeping previous layout of screen {index}: {e.error_count()} invalid fields")
+        apply_feature_screen_names(screens, features, project_name, set(plan["affected"]))
+        navigation = []
+        for step in old.get("navigation_flow", []):
+            navigation.append({**step, "from_screen": renamed.get(step["from_screen"], step["from_screen"]),
+                               "to_screen": renamed.get(step["to_screen"], step["to_screen"])})
+    else:
+        navigation = old.get("navigation_flow", [])
+
+    with metrics.stage("report_validation"):
+        report = UIReport(
+            project_name=old["project_name"],
+            summary=build_report_summary(domain, detailed_content),
+            screens=screens,
+            styles=old.get("styles", {}),
+            navigation_flow=navigation,
+            prototype_settings=old.get("prototype_settings", {})
+        )
+    return report, prompt_used
+
+def build_ui_report_incremental(key: str, project_name: str, text: str, domain: str,
+                                sha256: Optional[str] = None) -> tuple:
+    """
+    build_ui_report() for a new revision of a known project: diff paragraphs against the
+    previous version, re-request only screens whose source features changed and reuse the rest.
+    """
+    paragraphs = split_paragraphs(text)
+    with metrics.stage("feature_extraction"):
+        detailed_content = extract_detailed_pdf_content(text)
+    features = detailed_content['business_requirements']
+
+    previous = revision_store.latest(key) if INCREMENTAL_REGENERATION else None
+    plan = plan_revision(previous, paragraphs, features, domain)
+    print(f"Revision plan for '{key}': {plan['mode']} ({plan['reason']}, {plan['changed']} paragraphs changed)")
+
+    report = None
+    if plan["mode"] != "full":
+        try:
+            report, prompt_used = reuse_previous_report(previous, plan, paragraphs, features, project_name,
+                                                        domain, detailed_content)
+        except (ScreenRegenerationError, ValidationError) as e:
+            print(f"{plan['mode'].title()} regeneration failed, regenerating in full: {e}")
+    if report is None:
+        report, prompt_used = build_ui_report(project_name, text, domain, detailed_content)
+
+    try:
+        version = revision_store.save(key, sha256, domain, paragraphs, features, encode_report(report).json.decode(), prompt_used)
+        print(f"Stored revision {version} of '{key}'")
+    except Exception as e:
+        print(f"Revision store error: {e}")
+    return report, prompt_used
+
 # --------------------------------------------
 # FASTAPI APP
 # --------------------------------------------
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
+
+# Reject oversized uploads before their body is parsed (added first so CORS headers still wrap the 413)
+app.add_middleware(UploadSizeLimitMiddleware)
+
+# Brotli/gzip for HTML and JSON responses (precompressed pages and assets pass through)
+app.add_middleware(CompressionMiddleware)
 
 # Add CORS middleware with specific configuration for Figma plugin
 app.add_middleware(
@@ -696,8 +850,11 @@ app.add_middleware(
         "Authorization",
         "X-Requested-With",
         "Accept",
-        "Origin"
+        "Origin",
+        "If-None-Match"
     ],
+    # Let the plugin read the ETag it sends back as If-None-Match
+    expose_headers=["ETag", "X-Report-Version"],
 )
 
 # --------------------------------------------
@@ -708,673 +865,255 @@ async def devtools():
     return {}
 
 @app.get("/upload-and-report", response_class=HTMLResponse)
-async def upload_form():
-    return """
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>PDF to Figma Generator</title>
-        <style>
-            * { margin: 0; padding: 0; box-sizing: border-box; }
-            
-            @keyframes gradientShift {
-                0% { background-position: 0% 50%; }
-                50% { background-position: 100% 50%; }
-                100% { background-position: 0% 50%; }
-            }
-            
-            @keyframes fadeInUp {
-                from { opacity: 0; transform: translateY(30px); }
-                to { opacity: 1; transform: translateY(0); }
-            }
-            
-            @keyframes pulse {
-                0%, 100% { transform: scale(1); }
-                50% { transform: scale(1.05); }
-            }
-            
-            body {
-                font-family: 'Inter', -apple-system, BlinkMacSystemFont, sans-serif;
-                background: linear-gradient(-45deg, #667eea, #764ba2, #f093fb, #f5576c, #4facfe, #00f2fe);
-                background-size: 400% 400%;
-                animation: gradientShift 15s ease infinite;
-                min-height: 100vh;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                padding: 20px;
-            }
-            
-            .container {
-                background: rgba(255, 255, 255, 0.15);
-                backdrop-filter: blur(20px);
-                border: 1px solid rgba(255, 255, 255, 0.2);
-                border-radius: 32px;
-                padding: 48px;
-                box-shadow: 0 25px 50px rgba(0, 0, 0, 0.15), inset 0 1px 0 rgba(255, 255, 255, 0.3);
-                max-width: 520px;
-                width: 100%;
-                text-align: center;
-                animation: fadeInUp 0.8s ease;
-            }
-            
-            .logo { 
-                font-size: 56px; 
-                margin-bottom: 16px;
-                animation: pulse 2s ease-in-out infinite;
-                filter: drop-shadow(0 4px 8px rgba(0, 0, 0, 0.2));
-            }
-            
-            h1 { 
-                color: #ffffff; 
-                font-size: 32px; 
-                font-weight: 800; 
-                margin-bottom: 12px;
-                text-shadow: 0 2px 4px rgba(0, 0, 0, 0.3);
-                background: linear-gradient(135deg, #ffffff, #f0f0f0);
-                -webkit-background-clip: text;
-                -webkit-text-fill-color: transparent;
-                background-clip: text;
-            }
-            
-            .subtitle { 
-                color: rgba(255, 255, 255, 0.9); 
-                font-size: 18px; 
-                margin-bottom: 40px;
-                text-shadow: 0 1px 2px rgba(0, 0, 0, 0.2);
-            }
-            
-            .upload-area {
-                border: 2px dashed rgba(255, 255, 255, 0.4);
-                border-radius: 24px;
-                padding: 48px 24px;
-                margin-bottom: 32px;
-                transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1);
-                cursor: pointer;
-                background: rgba(255, 255, 255, 0.1);
-                backdrop-filter: blur(10px);
-                position: relative;
-                overflow: hidden;
-            }
-            
-            .upload-area::before {
-                content: '';
-                position: absolute;
-                top: 0;
-                left: -100%;
-                width: 100%;
-                height: 100%;
-                background: linear-gradient(90deg, transparent, rgba(255, 255, 255, 0.2), transparent);
-                transition: left 0.5s;
-            }
-            
-            .upload-area:hover {
-                border-color: rgba(255, 255, 255, 0.8);
-                background: rgba(255, 255, 255, 0.2);
-                transform: translateY(-4px);
-                box-shadow: 0 15px 35px rgba(0, 0, 0, 0.2);
-            }
-            
-            .upload-area:hover::before {
-                left: 100%;
-            }
-            
-            .upload-icon { 
-                font-size: 56px; 
-                color: rgba(255, 255, 255, 0.8); 
-                margin-bottom: 20px;
-                filter: drop-shadow(0 2px 4px rgba(0, 0, 0, 0.2));
-            }
-            
-            .upload-text { 
-                color: rgba(255, 255, 255, 0.95); 
-                font-size: 18px; 
-                font-weight: 600;
-                margin-bottom: 8px;
-                text-shadow: 0 1px 2px rgba(0, 0, 0, 0.2);
-            }
-            
-            .upload-hint { 
-                color: rgba(255, 255, 255, 0.7); 
-                font-size: 14px;
-            }
-            
-            #file-input { display: none; }
-            
-            .file-info {
-                background: rgba(255, 255, 255, 0.2);
-                border: 1px solid rgba(255, 255, 255, 0.3);
-                border-radius: 20px;
-                padding: 20px;
-                margin-bottom: 32px;
-                display: none;
-                backdrop-filter: blur(10px);
-                animation: fadeInUp 0.5s ease;
-            }
-            
-            .file-name { 
-                color: #ffffff; 
-                font-weight: 700; 
-                margin-bottom: 6px;
-                text-shadow: 0 1px 2px rgba(0, 0, 0, 0.2);
-            }
-            
-            .file-size { 
-                color: rgba(255, 255, 255, 0.8); 
-                font-size: 14px;
-            }
-            
-            .generate-btn {
-                background: linear-gradient(135deg, #ff6b6b, #4ecdc4, #45b7d1, #96ceb4);
-                background-size: 300% 300%;
-                animation: gradientShift 3s ease infinite;
-                color: white;
-                border: none;
-                border-radius: 20px;
-                padding: 20px 40px;
-                font-size: 18px;
-                font-weight: 700;
-                cursor: pointer;
-                transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1);
-                width: 100%;
-                text-shadow: 0 1px 2px rgba(0, 0, 0, 0.2);
-                box-shadow: 0 8px 25px rgba(0, 0, 0, 0.2);
-                position: relative;
-                overflow: hidden;
-            }
-            
-            .generate-btn::before {
-                content: '';
-                position: absolute;
-                top: 0;
-                left: -100%;
-                width: 100%;
-                height: 100%;
-                background: linear-gradient(90deg, transparent, rgba(255, 255, 255, 0.3), transparent);
-                transition: left 0.5s;
-            }
-            
-            .generate-btn:hover {
-                transform: translateY(-3px) scale(1.02);
-                box-shadow: 0 15px 40px rgba(0, 0, 0, 0.3);
-            }
-            
-            .generate-btn:hover::before {
-                left: 100%;
-            }
-            
-            .generate-btn:active {
-                transform: translateY(-1px) scale(0.98);
-            }
-            
-            .generate-btn:disabled { 
-                opacity: 0.6; 
-                cursor: not-allowed;
-                transform: none;
-            }
-            
-            .loading { 
-                display: none; 
-                color: rgba(255, 255, 255, 0.9); 
-                font-size: 16px; 
-                margin-top: 20px;
-                animation: pulse 1.5s ease-in-out infinite;
-            }
-            
-            .result {
-                display: none;
-                background: rgba(255, 255, 255, 0.2);
-                border: 1px solid rgba(255, 255, 255, 0.3);
-                border-radius: 20px;
-                padding: 24px;
-                margin-top: 32px;
-                backdrop-filter: blur(10px);
-                animation: fadeInUp 0.6s ease;
-            }
-            
-            .result h3 {
-                color: #ffffff;
-                margin-bottom: 12px;
-                text-shadow: 0 1px 2px rgba(0, 0, 0, 0.2);
-            }
-            
-            .result p {
-                color: rgba(255, 255, 255, 0.9);
-                margin-bottom: 16px;
-            }
-            
-            .figma-link { 
-                color: #ffffff; 
-                text-decoration: none; 
-                font-weight: 700;
-                word-break: break-all;
-                background: linear-gradient(135deg, #ff6b6b, #4ecdc4);
-                padding: 12px 24px;
-                border-radius: 12px;
-                display: inline-block;
-                transition: all 0.3s ease;
-                text-shadow: 0 1px 2px rgba(0, 0, 0, 0.2);
-            }
-            
-            .figma-link:hover {
-                transform: translateY(-2px);
-                box-shadow: 0 8px 20px rgba(0, 0, 0, 0.2);
-            }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="logo">🎨</div>
-            <h1>UI/UX Agent</h1>
-            <p class="subtitle">Transform documents into stunning, dynamic UI designs with professional color schemes</p>
-            
-            <form id="upload-form" action="/upload-and-report" method="post" enctype="multipart/form-data">
-                <div class="upload-area" onclick="document.getElementById('file-input').click()">
-                    <div class="upload-icon">📄</div>
-                    <div class="upload-text">Click to upload or drag and drop</div>
-                    <div class="upload-hint">PDF, DOCX files supported</div>
-                    <input type="file" id="file-input" name="file" accept=".pdf,.docx,.doc" required>
-                </div>
-                
-                <div class="file-info" id="file-info">
-                    <div class="file-name" id="file-name"></div>
-                    <div class="file-size" id="file-size"></div>
-                </div>
-                
-                <button type="submit" class="generate-btn" id="generate-btn" disabled>
-                    🚀 Generate Figma Design
-                </button>
-                
-                <div class="loading" id="loading">⏳ Analyzing document and generating design...</div>
-                <div class="result" id="result">
-                    <h3>✅ Design Generated Successfully!</h3>
-                    <p>Your Figma design is ready:</p>
-                    <a href="#" id="figma-link" class="figma-link" target="_blank">Open Figma Design</a>
-                </div>
-            </form>
-        </div>
-        
-        <script>
-            const fileInput = document.getElementById('file-input');
-            const fileInfo = document.getElementById('file-info');
-            const fileName = document.getElementById('file-name');
-            const fileSize = document.getElementById('file-size');
-            const generateBtn = document.getElementById('generate-btn');
-            
-            fileInput.addEventListener('change', function() {
-                const file = this.files[0];
-                if (file) {
-                    fileName.textContent = file.name;
-                    fileSize.textContent = (file.size / 1024 / 1024).toFixed(2) + ' MB';
-                    fileInfo.style.display = 'block';
-                    generateBtn.disabled = false;
-                }
-            });
-        </script>
-    </body>
-    </html>
-    """
+async def upload_form(request: Request):
+    return cached_response(request, UPLOAD_FORM, PAGE_CACHE_CONTROL)
+
+@app.get("/static/{name}")
+async def static_asset(name: str, request: Request):
+    """Fingerprinted stylesheets; the URL changes whenever the file does"""
+    asset = ASSETS.get(name)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return cached_response(request, asset, STATIC_CACHE_CONTROL)
 
 # --------------------------------------------
-# POST Endpoint (Generate Figma Link + Report)
+# Shared upload pipeline (runs in the threadpool, behind admission control)
 # --------------------------------------------
-@app.post("/upload-and-report")
-async def create_upload_file(file: UploadFile = File(...)):
-    file_bytes = await file.read()
-    text = extract_text_from_bytes(file_bytes, file.content_type)
+def prepare_upload(file_bytes, content_type: str, filename: str, sha256: Optional[str] = None) -> tuple:
+    """Parse → detect domain. Returns (text, project_name, domain)."""
+    with metrics.stage("parse"):
+        text = parse_cache.parse(file_bytes, content_type, sha256)["text"]
     
     if not text.strip():
         text = "Create a modern mobile application"
 
     # Use uploaded filename as project name
-    import os
-    import html
-    project_name = os.path.splitext(file.filename)[0].replace('_', ' ').replace('-', ' ').title()
-    domain = detect_domain_from_text(text)
-    
-    report, prompt_used = build_ui_report(project_name, text, domain)
+    project_name = os.path.splitext(filename)[0].replace('_', ' ').replace('-', ' ').title()
+    with metrics.stage("domain_detection"):
+        domain = detect_domain_from_text(text)
+    return text, project_name, domain
+
+
+def generate_upload_report(text: str, project_name: str, domain: str, filename: str,
+                           sha256: Optional[str] = None, project: Optional[str] = None) -> tuple:
+    """
+    LLM report → Figma file → publish as the latest report. Returns (report, prompt_used, domain, figma_url).
+    project (the client's project id, when sent) keys the revision history instead of the file name.
+    """
+    report, prompt_used = build_ui_report_incremental(project_key(filename, project), project_name, text, domain, sha256)
     
     # Create unique filename for Figma
     unique_project_name = create_unique_filename(project_name, domain)
     
     # Create Figma file with error handling
     try:
-        figma_url = figma_client.create_figma_file(unique_project_name)
+        with metrics.stage("figma"):
+            figma_url = figma_client.create_figma_file(unique_project_name)
     except Exception as e:
         print(f"Figma API error: {e}")
         figma_url = None
     
-    global latest_report_data, latest_prompt_used
-    latest_report_data = report.dict()
-    latest_prompt_used = prompt_used
-    
-    # Generate HTML response with styled UI Report and Prompt
-    report_dict = report.dict()
-    screens_html = ''.join([
-        f'''<div class="screen-card">
-            <div class="screen-icon">🎨</div>
-            <h3>{screen.get("name", "Screen")}</h3>
-            <p>{screen.get("description", "No description")[:150]}...</p>
-        </div>'''
-        for screen in report_dict.get('screens', [])[:6]
-    ])
-    
-    colors = report_dict.get('styles', {}).get('colors', {})
-    primary = colors.get('primary', '#667eea')
-    secondary = colors.get('secondary', '#764ba2')
-    escaped_prompt = html.escape(prompt_used)
+    publish_latest_report(report, prompt_used)
+    return report, prompt_used, domain, figma_url
+
+
+def run_upload_pipeline(file_bytes, content_type: str, filename: str, sha256: Optional[str] = None,
+                        project: Optional[str] = None) -> tuple:
+    """
+    Parse → detect domain → LLM report → Figma file. Returns (report, prompt_used, domain, figma_url).
+    file_bytes may be bytes or the memory-mapped view of a spooled upload; sha256 (when
+    already computed while spooling) keys the parse cache.
+    """
+    text, project_name, domain = prepare_upload(file_bytes, content_type, filename, sha256)
+    return generate_upload_report(text, project_name, domain, filename, sha256, project)
+
+
+def build_draft_report(text: str) -> UIReport:
+    """Instant report for mode=draft: DynamicUIGenerator over the content analysis, no LLM or network"""
+    content_analysis = analyzer.analyze_content(text)
+    with metrics.stage("draft_report"):
+        return draft_generator.create_enhanced_ui_report(content_analysis)
+
+
+async def refine_draft(draft_version: int, text: str, project_name: str, domain: str, filename: str,
+                       sha256: Optional[str], project: Optional[str] = None) -> None:
+    """
+    Background half of mode=draft: run the LLM pipeline and publish its report over the draft.
+    On failure the draft is republished with refinement_error, so pollers stop waiting.
+    """
+    trace = metrics.start_trace()
+    try:
+        async with admission.slot("plugin"):
+            with metrics.JOBS_IN_FLIGHT.track(endpoint="/upload?mode=draft"):
+                await run_in_threadpool(generate_upload_report, text, project_name, domain, filename, sha256, project)
+    except AdmissionRejected as e:
+        print(f"Draft refinement for '{filename}' not admitted: {e.reason}")
+        report_feed.fail_refinement(draft_version, f"Server busy: {e.reason}")
+        return
+    except Exception as e:
+        print(f"Draft refinement for '{filename}' failed: {e}")
+        report_feed.fail_refinement(draft_version, "LLM report generation failed")
+        return
+    print(f"Pipeline trace /upload?mode=draft (refine): {metrics.format_trace(trace)}")
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    """Fast-fail with 503 + Retry-After when the pipeline queue is full"""
+    headers = {"Retry-After": str(exc.retry_after)}
+    if request.url.path == "/upload-and-report":
+        return HTMLResponse(
+            f"<h1>Server busy</h1><p>{exc.reason}. Please retry in {exc.retry_after} seconds.</p>",
+            status_code=503,
+            headers=headers,
+        )
+    return JSONResponse(
+        {"status": "busy", "detail": exc.reason, "retry_after": exc.retry_after},
+        status_code=503,
+        headers=headers,
+    )
+
+# --------------------------------------------
+# POST Endpoint (Generate Figma Link + Report)
+# --------------------------------------------
+@app.post("/upload-and-report")
+async def create_upload_file(file: UploadFile = File(...), project: Optional[str] = None):
+    trace = metrics.start_trace()
+    async with admission.slot("form"):
+        with metrics.JOBS_IN_FLIGHT.track(endpoint="/upload-and-report"):
+            with await spool_upload(file) as upload:
+                report, prompt_used, domain, figma_url = await run_in_threadpool(
+                    run_upload_pipeline, upload.view(), upload.content_type, upload.filename, upload.sha256, project
+                )
+            with metrics.stage("render_html"):
+                page = render_report_html(encode_report(report).data, domain, figma_url, prompt_used)
     
-    return HTMLResponse(f"""
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>UI Report - {report_dict.get('project_name', 'Project')}</title>
-        <style>
-            * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-            body {{
-                font-family: 'Inter', -apple-system, sans-serif;
-                background: linear-gradient(135deg, {primary}, {secondary});
-                min-height: 100vh;
-                padding: 40px 20px;
-            }}
-            .container {{ max-width: 1400px; margin: 0 auto; }}
-            
-            .section {{
-                background: rgba(255, 255, 255, 0.95);
-                border-radius: 24px;
-                padding: 40px;
-                margin-bottom: 32px;
-                box-shadow: 0 20px 60px rgba(0,0,0,0.2);
-            }}
-            
-            .section-title {{
-                font-size: 32px;
-                font-weight: 800;
-                color: {primary};
-                margin-bottom: 24px;
-                display: flex;
-                align-items: center;
-                gap: 12px;
-            }}
-            
-            .project-title {{
-                font-size: 42px;
-                font-weight: 800;
-                color: {primary};
-                margin-bottom: 16px;
-            }}
-            
-            .summary {{
-                font-size: 16px;
-                color: #666;
-                line-height: 1.6;
-                margin-bottom: 20px;
-            }}
-            
-            .badge {{
-                display: inline-block;
-                background: linear-gradient(135deg, {primary}, {secondary});
-                color: white;
-                padding: 8px 16px;
-                border-radius: 20px;
-                font-size: 14px;
-                font-weight: 600;
-                margin-right: 12px;
-            }}
-            
-            .figma-btn {{
-                display: inline-block;
-                background: linear-gradient(135deg, #ff6b6b, #4ecdc4);
-                color: white;
-                padding: 12px 32px;
-                border-radius: 12px;
-                text-decoration: none;
-                font-weight: 700;
-                margin-top: 16px;
-                transition: transform 0.3s ease;
-            }}
-            
-            .figma-btn:hover {{
-                transform: translateY(-2px);
-                box-shadow: 0 8px 20px rgba(0,0,0,0.2);
-            }}
-            
-            .screens-grid {{
-                display: grid;
-                grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));
-                gap: 24px;
-                margin-top: 32px;
-            }}
-            
-            .screen-card {{
-                background: white;
-                border: 2px solid #f0f0f0;
-                border-radius: 16px;
-                padding: 24px;
-                transition: all 0.3s ease;
-            }}
-            
-            .screen-card:hover {{
-                transform: translateY(-4px);
-                box-shadow: 0 12px 40px rgba(0,0,0,0.1);
-                border-color: {primary};
-            }}
-            
-            .screen-icon {{
-                font-size: 40px;
-                margin-bottom: 12px;
-            }}
-            
-            .screen-card h3 {{
-                font-size: 20px;
-                font-weight: 700;
-                color: #333;
-                margin-bottom: 8px;
-            }}
-            
-            .screen-card p {{
-                color: #666;
-                font-size: 14px;
-                line-height: 1.5;
-            }}
-            
-            .prompt-section {{
-                background: #1e1e1e;
-                border-radius: 24px;
-                padding: 0;
-                overflow: hidden;
-                box-shadow: 0 20px 60px rgba(0,0,0,0.4);
-            }}
-            
-            .prompt-header {{
-                background: #2d2d2d;
-                padding: 20px 32px;
-                display: flex;
-                justify-content: space-between;
-                align-items: center;
-                border-bottom: 1px solid #3e3e3e;
-            }}
-            
-            .prompt-title {{
-                color: #58a6ff;
-                font-size: 24px;
-                font-weight: 700;
-                display: flex;
-                align-items: center;
-                gap: 12px;
-            }}
-            
-            .copy-btn {{
-                background: #238636;
-                color: white;
-                border: none;
-                padding: 10px 24px;
-                border-radius: 8px;
-                cursor: pointer;
-                font-family: inherit;
-                font-size: 14px;
-                font-weight: 600;
-                transition: background 0.2s;
-            }}
-            
-            .copy-btn:hover {{
-                background: #2ea043;
-            }}
-            
-            .copy-btn:active {{
-                transform: scale(0.95);
-            }}
-            
-            .prompt-content {{
-                padding: 32px;
-                color: #c9d1d9;
-                font-family: 'Fira Code', 'Courier New', monospace;
-                font-size: 13px;
-                line-height: 1.8;
-                overflow-x: auto;
-                max-height: 600px;
-                overflow-y: auto;
-            }}
-            
-            .prompt-content pre {{
-                margin: 0;
-                white-space: pre-wrap;
-                word-wrap: break-word;
-            }}
-            
-            .stats {{
-                display: flex;
-                gap: 16px;
-                margin-top: 16px;
-            }}
-            
-            .stat {{
-                background: #f8f9fa;
-                padding: 12px 20px;
-                border-radius: 12px;
-                border: 1px solid #e0e0e0;
-            }}
-            
-            .stat-label {{
-                color: #666;
-                font-size: 12px;
-                margin-bottom: 4px;
-            }}
-            
-            .stat-value {{
-                color: {primary};
-                font-size: 18px;
-                font-weight: 700;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <!-- UI Report Section -->
-            <div class="section">
-                <div class="project-title">🎨 {report_dict.get('project_name', 'UI Report')}</div>
-                <div class="summary">{report_dict.get('summary', 'No summary available')[:400]}</div>
-                
-                <div class="stats">
-                    <div class="stat">
-                        <div class="stat-label">Screens</div>
-                        <div class="stat-value">{len(report_dict.get('screens', []))}</div>
-                    </div>
-                    <div class="stat">
-                        <div class="stat-label">Domain</div>
-                        <div class="stat-value">{domain.title()}</div>
-                    </div>
-                    <div class="stat">
-                        <div class="stat-label">Colors</div>
-                        <div class="stat-value">{len(colors)}</div>
-                    </div>
-                </div>
-                
-                {f'<a href="{figma_url}" class="figma-btn" target="_blank">🚀 Open in Figma</a>' if figma_url else ''}
-                
-                <div class="section-title" style="margin-top: 40px;">
-                    <span>📊</span>
-                    <span>Generated Screens</span>
-                </div>
-                <div class="screens-grid">
-                    {screens_html}
-                </div>
-            </div>
-            
-            <!-- Prompt Used Section -->
-            <div class="prompt-section">
-                <div class="prompt-header">
-                    <div class="prompt-title">
-                        <span>💻</span>
-                        <span>Prompt Used</span>
-                    </div>
-                    <button class="copy-btn" onclick="copyPrompt()">📋 Copy Prompt</button>
-                </div>
-                <div class="prompt-content">
-                    <pre id="prompt-text">{escaped_prompt}</pre>
-                </div>
-            </div>
-        </div>
-        
-        <script>
-            function copyPrompt() {{
-                const text = document.getElementById('prompt-text').textContent;
-                navigator.clipboard.writeText(text).then(() => {{
-                    const btn = document.querySelector('.copy-btn');
-                    const originalText = btn.textContent;
-                    btn.textContent = '✅ Copied!';
-                    btn.style.background = '#2ea043';
-                    setTimeout(() => {{
-                        btn.textContent = originalText;
-                        btn.style.background = '#238636';
-                    }}, 2000);
-                }}).catch(err => {{
-                    alert('Failed to copy: ' + err);
-                }});
-            }}
-        </script>
-    </body>
-    </html>
-    """)
+    print(f"Pipeline trace /upload-and-report: {metrics.format_trace(trace)}")
+    return HTMLResponse(page, headers={"Server-Timing": metrics.server_timing_header(trace),
+                                       "X-Token-Usage": metrics.request_usage().header()})
+
+
+def render_report_html(report_dict: dict, domain: str, figma_url, prompt_used: str) -> str:
+    """Render the styled UI Report + Prompt page returned by /upload-and-report"""
+    return render_report_page(report_dict, domain, figma_url, prompt_used)
 
 # --------------------------------------------
 # Upload endpoint for Figma plugin (JSON response)
 # --------------------------------------------
 @app.post("/upload", response_model=UIReportResponse)
-async def upload_for_plugin(file: UploadFile = File(...)):
-    file_bytes = await file.read()
-    text = extract_text_from_bytes(file_bytes, file.content_type)
-    
-    if not text.strip():
-        text = "Create a modern mobile application"
+async def upload_for_plugin(background_tasks: BackgroundTasks, file: UploadFile = File(...),
+                            mode: Literal["full", "draft"] = "full", project: Optional[str] = None):
+    """
+    mode=full waits for the LLM report. mode=draft returns a DynamicUIGenerator report right
+    away (draft=true) and publishes the LLM report to /latest-report when it is ready.
+    """
+    trace = metrics.start_trace()
+    if mode == "draft":
+        # Parsing (possibly OCR) and content analysis are real work, so drafts queue in the plugin lane too
+        async with admission.slot("plugin"):
+            with metrics.JOBS_IN_FLIGHT.track(endpoint="/upload?mode=draft"):
+                with await spool_upload(file) as upload:
+                    text, project_name, domain = await run_in_threadpool(
+                        prepare_upload, upload.view(), upload.content_type, upload.filename, upload.sha256
+                    )
+                    filename, sha256 = upload.filename, upload.sha256
+                report = await run_in_threadpool(build_draft_report, text)
+        published = publish_latest_report(report, None, draft=True)
+        background_tasks.add_task(refine_draft, published.version, text, project_name, domain, filename, sha256,
+                                  project)
+        print(f"Pipeline trace /upload?mode=draft: {metrics.format_trace(trace)}")
+        return report_response(report, draft=True,
+                               headers={"Server-Timing": metrics.server_timing_header(trace)})
 
-    import os
-    project_name = os.path.splitext(file.filename)[0].replace('_', ' ').replace('-', ' ').title()
-    domain = detect_domain_from_text(text)
-    
-    report, prompt_used = build_ui_report(project_name, text, domain)
-    
-    unique_project_name = create_unique_filename(project_name, domain)
-    
-    try:
-        figma_url = figma_client.create_figma_file(unique_project_name)
-    except Exception as e:
-        print(f"Figma API error: {e}")
-        figma_url = None
-    
-    global latest_report_data, latest_prompt_used
-    latest_report_data = report.dict()
-    latest_prompt_used = prompt_used
+    async with admission.slot("plugin"):
+        with metrics.JOBS_IN_FLIGHT.track(endpoint="/upload"):
+            with await spool_upload(file) as upload:
+                report, prompt_used, domain, figma_url = await run_in_threadpool(
+                    run_upload_pipeline, upload.view(), upload.content_type, upload.filename, upload.sha256, project
+                )
     
-    return UIReportResponse(
-        figma_url=figma_url,
-        report=report,
-        prompt_used=prompt_used
+    print(f"Pipeline trace /upload: {metrics.format_trace(trace)}")
+    usage = metrics.request_usage()
+    return report_response(report, figma_url, prompt_used, usage.as_dict(),
+                           headers={"Server-Timing": metrics.server_timing_header(trace),
+                                    "X-Token-Usage": usage.header()})
+
+def report_response(report: UIReport, figma_url: Optional[str] = None, prompt_used: Optional[str] = None,
+                    token_usage: Optional[dict] = None, draft: bool = False, headers: Optional[dict] = None):
+    """UIReportResponse body with the report's cached JSON spliced in (no re-validation or re-encoding)"""
+    body = encode_fields(
+        {"figma_url": figma_url, "report": None, "prompt_used": prompt_used, "token_usage": token_usage, "draft": draft},
+        {"report": encode_report(report).json},
     )
+    return FastJSONResponse(body, headers=headers)
+
+# --------------------------------------------
+# Durable jobs: enqueue now, a worker process generates the report
+# --------------------------------------------
+@app.post("/jobs", status_code=202)
+async def enqueue_report_job(file: UploadFile = File(...), project: Optional[str] = None):
+    """Queue a report job for start_worker.py; poll GET /jobs/{job_id} for the result"""
+    with await spool_upload(file) as upload:
+        # SQLite reads the BLOB straight from the spool's memory map; no full copy for large uploads
+        job_id = await run_in_threadpool(
+            job_queue.enqueue,
+            "report",
+            {"filename": upload.filename, "content_type": upload.content_type, "sha256": upload.sha256,
+             "project": project},
+            upload.view(),
+            int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+        )
+    return {"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}
+
+@app.get("/jobs/{job_id}")
+def get_report_job(job_id: str):
+    """Status of a queued report job, including the report once done"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    response = {
+        "job_id": job["id"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "max_attempts": job["max_attempts"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+    }
+    if job["error"]:
+        response["error"] = job["error"]
+    if job["status"] == "done":
+        response.update(job["result"] or {})
+    return response
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus scrape endpoint: stage latency, LLM tokens, cache, queue and in-flight gauges"""
+    if job_queue.exists():
+        metrics.QUEUE_DEPTH.set(job_queue.counts().get("queued", 0), lane="durable")
+    return PlainTextResponse(metrics.render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# --------------------------------------------
+# Admin: on-demand sampling profiler (requires ADMIN_TOKEN)
+# --------------------------------------------
+@app.post("/admin/profile", response_class=PlainTextResponse)
+def admin_profile(
+    seconds: float = 10,
+    interval_ms: float = 5,
+    tag_stages: bool = True,
+    x_admin_token: str = Header(None),
+):
+    """Sample this worker for N seconds and return flamegraph-compatible collapsed stacks"""
+    if not os.getenv("ADMIN_TOKEN"):
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled")
+    if not check_admin_token(x_admin_token):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+    try:
+        collapsed = profile_worker(seconds, interval_ms, tag_stages)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    filename = f"profile-{int(time.time())}.collapsed"
+    return PlainTextResponse(collapsed, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
 
 @app.get("/favicon.ico")
 async def favicon():
@@ -1387,14 +1126,14 @@ async def favicon():
 def sample_report():
     """Generate report from sample document and auto-open Figma"""
     sample_path = os.getenv("SAMPLE_DOCUMENT_PATH", "./sample-data/ecommerce_uiux_report.pdf")
+    metrics.start_trace()
     
     try:
-        with open(sample_path, "rb") as f:
-            file_bytes = f.read()
-        
-        text = extract_text_from_bytes(file_bytes, "application/pdf")
+        with metrics.stage("parse"):
+            text = parse_cache.parse_file(sample_path, "application/pdf")["text"]
         project_name = extract_project_name(text) if text.strip() else "Sample-Project"
-        domain = detect_domain_from_text(text)
+        with metrics.stage("domain_detection"):
+            domain = detect_domain_from_text(text)
         
         report, prompt_used = build_ui_report(project_name, text, domain)
         
@@ -1403,7 +1142,8 @@ def sample_report():
         
         # Create Figma file with error handling
         try:
-            figma_url = figma_client.create_figma_file(unique_project_name)
+            with metrics.stage("figma"):
+                figma_url = figma_client.create_figma_file(unique_project_name)
         except Exception as e:
             print(f"Figma API error: {e}")
             figma_url = None
@@ -1411,36 +1151,79 @@ def sample_report():
         return UIReportResponse(
             figma_url=figma_url,
             report=report,
-            prompt_used=prompt_used
+            prompt_used=prompt_used,
+            token_usage=metrics.request_usage().as_dict()
         )
     except Exception as e:
         return {"error": f"Could not process sample document: {e}"}
 
-# Store latest report and prompt globally for auto-fetch
-latest_report_data = None
-latest_prompt_used = None
+# Latest report (and prompt) for auto-fetch, versioned for conditional GETs and long-polling
+report_feed = ReportFeed()
+# How often a long-poll checks the job DB for reports finished by worker processes
+LATEST_REPORT_JOB_POLL = float(os.getenv("LATEST_REPORT_JOB_POLL", "1"))
+
+def publish_latest_report(report: UIReport, prompt_used: Optional[str], draft: bool = False) -> PublishedReport:
+    encoded = encode_report(report)
+    return report_feed.publish(encoded.data, encoded.json, prompt_used, draft)
+
+def _refresh_latest_from_jobs() -> None:
+    """Pick up reports finished by worker processes if they are newer than ours"""
+    latest = job_queue.latest_finished_at()
+    current = report_feed.current
+    if latest is None or latest[1] <= (current.at if current else 0):
+        return
+    # Only a newer job's result is loaded and decoded
+    job = job_queue.get(latest[0])
+    if job and job["result"] and job["result"].get("report"):
+        report = job["result"]["report"]
+        report_feed.publish(report, dumps(report), job["result"].get("prompt_used"), at=job["finished_at"])
+
+async def _wait_for_newer_report(version: int, timeout: float) -> None:
+    """Hold until a report newer than `version` is published (here or by a worker) or `timeout` passes"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while report_feed.version == version:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return
+        watch_jobs = job_queue.exists()
+        await report_feed.wait(version, min(remaining, LATEST_REPORT_JOB_POLL) if watch_jobs else remaining)
+        if watch_jobs:
+            await run_in_threadpool(_refresh_latest_from_jobs)
 
 @app.get("/latest-report")
-def get_latest_report():
-    """Get the most recent report for auto-plugin fetching"""
-    if latest_report_data:
-        return {
-            "status": "success",
-            "report": latest_report_data
-        }
-    else:
+async def get_latest_report(request: Request, wait: float = 0):
+    """
+    Get the most recent report for auto-plugin fetching. Send the last ETag as If-None-Match
+    to get 304 when nothing changed; with wait=N the request is held up to N seconds
+    (max LATEST_REPORT_MAX_WAIT) until a newer report exists.
+    """
+    if job_queue.exists():
+        await run_in_threadpool(_refresh_latest_from_jobs)
+    if_none_match = request.headers.get("if-none-match")
+    current = report_feed.current
+    if wait > 0 and (current is None or etag_matches(if_none_match, current.etag)):
+        await _wait_for_newer_report(report_feed.version, min(wait, LATEST_REPORT_MAX_WAIT))
+        current = report_feed.current
+    if current is None:
         return {
             "status": "no_data",
             "message": "No recent reports available"
         }
+    headers = {"ETag": current.etag, "Cache-Control": "no-cache", "X-Report-Version": str(current.version)}
+    if etag_matches(if_none_match, current.etag):
+        return Response(status_code=304, headers=headers)
+    return FastJSONResponse(current.body, headers=headers)
 
 @app.get("/latest-prompt")
 def get_latest_prompt():
     """Get the most recent prompt used for generation"""
-    if latest_prompt_used:
+    _refresh_latest_from_jobs()
+    current = report_feed.current
+    if current and current.prompt_used:
         return {
             "status": "success",
-            "prompt": latest_prompt_used
+            "prompt": current.prompt_used
         }
     else:
         return {
@@ -1451,7 +1234,6 @@ def get_latest_prompt():
 @app.options("/latest-report")
 def options_latest_report():
     """Handle CORS preflight for latest-report endpoint"""
-    from fastapi import Response
     return Response(
         headers={
             "Access-Control-Allow-Origin": "*",
@@ -1,6 +1,6 @@
 from typing import Any, Dict, List, Optional, Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 class Interaction(BaseModel):
@@ -44,12 +44,16 @@ class UIReport(BaseModel):
     summary: str
     navigation_flow: List[Navigation] = Field(default_factory=list)
     prototype_settings: Dict[str, Any] = Field(default_factory=dict)
+    # model_dump() and JSON bytes, cached by app.services.fast_json.encode_report (reports are not mutated once built)
+    _encoded: Optional[Any] = PrivateAttr(default=None)
 
 
 class UIReportResponse(BaseModel):
     figma_url: Optional[str] = None
     report: UIReport
     prompt_used: Optional[str] = None
+    token_usage: Optional[Dict[str, Any]] = None  # LLM calls and prompt/completion tokens for this request
+    draft: bool = False  # mode=draft: instant DynamicUIGenerator report; the LLM report follows on /latest-report
 
 
 class HealthResponse(BaseModel):
@@ -0,0 +1,130 @@
+# app/services/admission.py
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional, Sequence
+
+from app.services import metrics
+
+
+class AdmissionRejected(Exception):
+    """Raised when a job cannot be admitted; carries a Retry-After hint in seconds"""
+
+    def __init__(self, reason: str, retry_after: int) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Bounded job queue in front of the report pipeline.
+
+    At most `max_concurrency` jobs run at once. Extra jobs wait in per-lane
+    FIFO queues bounded by `max_queue[lane]`; when a slot frees up, lanes are
+    served in the order given by `lanes` (first lane = highest priority).
+    Jobs that cannot be queued, or wait longer than `queue_timeout`, are
+    rejected immediately with a Retry-After estimate.
+
+    Runs on the event loop only, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        max_queue: Optional[Dict[str, int]] = None,
+        lanes: Sequence[str] = ("plugin", "form"),
+        queue_timeout: float = 30.0,
+    ) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self.lanes = tuple(lanes)
+        self.max_queue = {lane: 16 for lane in self.lanes}
+        self.max_queue.update(max_queue or {})
+        self.queue_timeout = queue_timeout
+        self.running = 0
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {lane: deque() for lane in self.lanes}
+        # Exponentially weighted job duration, used for Retry-After
+        self._avg_job_seconds = 10.0
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        return cls(
+            max_concurrency=int(os.getenv("ADMISSION_MAX_CONCURRENCY", "4")),
+            max_queue={
+                "plugin": int(os.getenv("ADMISSION_MAX_QUEUE_PLUGIN", "16")),
+                "form": int(os.getenv("ADMISSION_MAX_QUEUE_FORM", "8")),
+            },
+            queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "30")),
+        )
+
+    def queued(self, lane: Optional[str] = None) -> int:
+        if lane is not None:
+            return len(self._waiters[lane])
+        return sum(len(w) for w in self._waiters.values())
+
+    def retry_after(self) -> int:
+        """Seconds until a new job would likely get a slot"""
+        waves = (self.queued() + 1) / self.max_concurrency
+        return max(1, math.ceil(waves * self._avg_job_seconds))
+
+    def _publish(self, lane: str) -> None:
+        metrics.QUEUE_DEPTH.set(len(self._waiters[lane]), lane=lane)
+
+    async def acquire(self, lane: str) -> None:
+        if self.running < self.max_concurrency and not self.queued():
+            self.running += 1
+            return
+
+        waiters = self._waiters[lane]
+        if len(waiters) >= self.max_queue.get(lane, 0):
+            raise AdmissionRejected(f"{lane} queue is full", self.retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        waiters.append(future)
+        self._publish(lane)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # Slot was handed over just as we timed out; give it back
+                self.release()
+            else:
+                future.cancel()
+            raise AdmissionRejected(f"Timed out waiting in {lane} queue", self.retry_after())
+        except BaseException:
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                future.cancel()
+            raise
+        finally:
+            if future in waiters:
+                waiters.remove(future)
+            self._publish(lane)
+
+    def release(self) -> None:
+        # Hand the slot straight to the highest-priority waiter, if any
+        for lane in self.lanes:
+            waiters = self._waiters[lane]
+            while waiters:
+                future = waiters.popleft()
+                self._publish(lane)
+                if not future.done():
+                    future.set_result(None)
+                    return
+        self.running -= 1
+
+    @asynccontextmanager
+    async def slot(self, lane: str) -> AsyncIterator[None]:
+        await self.acquire(lane)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._avg_job_seconds = 0.8 * self._avg_job_seconds + 0.2 * elapsed
+            self.release()
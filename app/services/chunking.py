@@ -0,0 +1,107 @@
+# app/services/chunking.py
+
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, List
+
+CHUNK_CHARS = int(os.getenv("LLM_CHUNK_CHARS", "6000"))
+# One wave of concurrent chunk calls by default (see LLM_CHUNK_CONCURRENCY)
+MAX_CHUNKS = int(os.getenv("LLM_MAX_CHUNKS", "8"))
+# Documents shorter than this fit the main prompt; chunking only kicks in above it
+CHUNKED_MIN_CHARS = int(os.getenv("LLM_CHUNKED_MIN_CHARS", "8000"))
+
+BRIEF_FIELDS = ("features", "screens", "workflows", "personas", "entities")
+
+_HEADING = re.compile(r"^(\d+(\.\d+)*[\.\)]\s+\S.{0,78}|[A-Z][A-Z0-9 &/\-]{4,60}|[^\s•\-\*].{3,78}:)$")
+
+
+def chunked_mode_enabled(text: str) -> bool:
+    """LLM_CHUNKED_MODE=auto (default) chunks long documents only; on/off force it"""
+    mode = os.getenv("LLM_CHUNKED_MODE", "auto").lower()
+    if mode in ("0", "off", "false"):
+        return False
+    if mode in ("1", "on", "true"):
+        return True
+    return len(text) > CHUNKED_MIN_CHARS
+
+
+def split_sections(text: str, chunk_chars: int = CHUNK_CHARS, max_chunks: int = MAX_CHUNKS) -> List[str]:
+    """
+    Split at section headings (numbered, ALL CAPS or "Heading:" lines), then
+    pack consecutive sections into chunks of about chunk_chars. Oversized
+    sections are cut at line boundaries. If that yields more than max_chunks,
+    the chunk size grows so the whole document is still covered.
+    """
+    sections: List[List[str]] = [[]]
+    for line in text.split("\n"):
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if _HEADING.match(stripped) and sections[-1]:
+            sections.append([])
+        sections[-1].append(stripped)
+
+    chunk_chars = max(chunk_chars, len(text) // max(1, max_chunks) + 1)
+    while True:
+        chunks = _pack(sections, chunk_chars)
+        if len(chunks) <= max_chunks:
+            return chunks
+        chunk_chars = int(chunk_chars * 1.25)
+
+
+def _pack(sections: List[List[str]], chunk_chars: int) -> List[str]:
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for section in sections:
+        block = "\n".join(section)
+        # Keep a section whole when it fits, otherwise pack it line by line
+        for piece in (section if len(block) > chunk_chars else [block]):
+            if current and size + len(piece) + 1 > chunk_chars:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def reduce_extractions(extractions: List[Dict[str, Any]], limits: Dict[str, int] = None) -> Dict[str, List[str]]:
+    """
+    Merge per-chunk extractions: case-insensitive de-duplication, ranked by
+    how many chunks mention the item, ties kept in document order.
+    """
+    limits = limits or {"features": 12, "screens": 8, "workflows": 8, "personas": 6, "entities": 8}
+    merged: Dict[str, List[str]] = {}
+    for field in BRIEF_FIELDS:
+        counts: Counter = Counter()
+        first_seen: Dict[str, str] = {}
+        for extraction in extractions:
+            values = extraction.get(field) or []
+            if isinstance(values, str):
+                values = [values]
+            # Each phrase counts once per chunk, keyed by its normalized form (non-string items are skipped)
+            chunk_items: Dict[str, str] = {}
+            for value in values:
+                if isinstance(value, str) and value.strip():
+                    chunk_items.setdefault(" ".join(value.lower().split()), value.strip())
+            for key, value in chunk_items.items():
+                counts[key] += 1
+                first_seen.setdefault(key, value[:80])
+        order = {key: i for i, key in enumerate(first_seen)}
+        ranked = sorted(counts, key=lambda key: (-counts[key], order[key]))
+        merged[field] = [first_seen[key] for key in ranked[:limits.get(field, 8)]]
+    return merged
+
+
+def format_brief(merged: Dict[str, List[str]], chunk_count: int) -> str:
+    """Compact brief for the main UI prompt"""
+    lines = [f"=== FULL-DOCUMENT BRIEF ({chunk_count} sections analyzed) ==="]
+    labels = {"features": "FEATURES", "screens": "SCREENS", "workflows": "WORKFLOWS",
+              "personas": "PERSONAS", "entities": "DATA ENTITIES"}
+    for field in BRIEF_FIELDS:
+        if merged.get(field):
+            lines.append(f"{labels[field]}: {'; '.join(merged[field])}")
+    return "\n".join(lines) if len(lines) > 1 else ""
@@ -0,0 +1,181 @@
+# app/services/colors.py
+
+from functools import lru_cache
+from typing import Dict, List, Sequence, Union
+
+import numpy as np
+
+# Shape (..., 3) arrays: RGB as 0-255 integers, HSL as (hue degrees, saturation %, lightness %) integers
+ColorArray = np.ndarray
+HexColors = Union[str, Sequence[str]]
+
+# Hue offsets and (saturation, lightness) per role for each harmony, as used by DynamicUIGenerator
+HARMONIES: Dict[str, Dict[str, tuple]] = {
+    "monochromatic": {"primary": (0, 70, 50), "secondary": (0, 60, 65), "accent": (0, 80, 40), "surface": (0, 20, 95)},
+    "analogous": {"primary": (0, 75, 50), "secondary": (30, 70, 55), "accent": (-30, 80, 45)},
+    "triadic": {"primary": (0, 75, 50), "secondary": (120, 70, 55), "accent": (240, 80, 45)},
+    "complementary": {"primary": (0, 75, 50), "secondary": (180, 70, 55), "accent": (60, 80, 45)},
+    "split_complementary": {"primary": (0, 75, 50), "secondary": (150, 70, 55), "accent": (210, 80, 45)},
+}
+HARMONY_DEFAULTS = {"surface": "#FFFFFF", "background": "#F8F9FA"}
+
+
+# --------------------------------------------
+# Conversions (vectorized over the leading axes)
+# --------------------------------------------
+def hex_to_rgb(colors: HexColors) -> ColorArray:
+    """'#RRGGBB' strings -> (n, 3) integer RGB; a single string gives shape (3,)"""
+    single = isinstance(colors, str)
+    values = np.array([int(c[1:7], 16) for c in ([colors] if single else colors)], dtype=np.int64)
+    rgb = np.stack([(values >> 16) & 0xFF, (values >> 8) & 0xFF, values & 0xFF], axis=-1)
+    return rgb[0] if single else rgb
+
+
+def rgb_to_hex(rgb: ColorArray) -> Union[str, List[str]]:
+    rgb = np.asarray(rgb, dtype=np.int64)
+    values = ((rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]).ravel().tolist()
+    hexes = [f"#{v:06x}" for v in values]
+    return hexes[0] if rgb.ndim == 1 else hexes
+
+
+def _hue_to_channel(p: ColorArray, q: ColorArray, t: ColorArray) -> ColorArray:
+    t = t % 1.0
+    return np.select(
+        [t < 1 / 6, t < 1 / 2, t < 2 / 3],
+        [p + (q - p) * 6 * t, q, p + (q - p) * (2 / 3 - t) * 6],
+        p,
+    )
+
+
+def hsl_to_rgb(hsl: ColorArray) -> ColorArray:
+    """(..., 3) HSL (degrees, %, %) -> (..., 3) integer RGB; channels are truncated like int(x * 255)"""
+    hsl = np.asarray(hsl, dtype=np.float64)
+    h = hsl[..., 0] / 360
+    s = np.clip(hsl[..., 1] / 100, 0.0, 1.0)
+    l = np.clip(hsl[..., 2] / 100, 0.0, 1.0)
+    q = np.where(l < 0.5, l * (1 + s), l + s - l * s)
+    p = 2 * l - q
+    rgb = np.stack([_hue_to_channel(p, q, h + 1 / 3), _hue_to_channel(p, q, h), _hue_to_channel(p, q, h - 1 / 3)], axis=-1)
+    # Achromatic colors are plain grey
+    rgb = np.where((s == 0)[..., None], l[..., None], rgb)
+    return (rgb * 255).astype(np.int64)
+
+
+def rgb_to_hsl(rgb: ColorArray) -> ColorArray:
+    """(..., 3) integer RGB -> (..., 3) integer HSL (degrees, %, %), truncated"""
+    rgb = np.asarray(rgb, dtype=np.float64) / 255.0
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    high = rgb.max(axis=-1)
+    low = rgb.min(axis=-1)
+    diff = high - low
+    l = (high + low) / 2
+    chromatic = diff != 0
+    safe_diff = np.where(chromatic, diff, 1.0)
+    s = np.where(l > 0.5, diff / np.where(chromatic, 2 - high - low, 1.0), diff / np.where(chromatic, high + low, 1.0))
+    h = np.select(
+        [high == r, high == g],
+        [(g - b) / safe_diff + np.where(g < b, 6, 0), (b - r) / safe_diff + 2],
+        (r - g) / safe_diff + 4,
+    ) / 6
+    h = np.where(chromatic, h, 0.0)
+    s = np.where(chromatic, s, 0.0)
+    return np.stack([h * 360, s * 100, l * 100], axis=-1).astype(np.int64)
+
+
+def hsl_to_hex(h, s, l) -> Union[str, List[str]]:
+    """HSL (scalars or broadcastable arrays) -> '#rrggbb' (a list for array input)"""
+    hsl = np.stack(np.broadcast_arrays(np.asarray(h), np.asarray(s), np.asarray(l)), axis=-1)
+    return rgb_to_hex(hsl_to_rgb(hsl))
+
+
+def parse_hsl(color: str) -> tuple:
+    """'hsl(210, 70%, 50%)' -> (210.0, 70.0, 50.0)"""
+    h, s, l = (float(part.strip().rstrip('%')) for part in color.strip()[4:-1].split(','))
+    return h, s, l
+
+
+# --------------------------------------------
+# Adjustments
+# --------------------------------------------
+def adjust_colors(colors: HexColors, hue_shift=0, lightness_shift=0) -> Union[str, List[str]]:
+    """Shift hue (degrees) and lightness (points) of hex colors; shifts broadcast per color"""
+    hsl = rgb_to_hsl(hex_to_rgb(colors))
+    h = (hsl[..., 0] + np.asarray(hue_shift)) % 360
+    l = np.clip(hsl[..., 2] + np.asarray(lightness_shift), 0, 100)
+    return hsl_to_hex(h, hsl[..., 1], l)
+
+
+def tint(colors: HexColors, lightness) -> Union[str, List[str]]:
+    """Same hue at the given lightness with saturation reduced by 40 points (min 10): backgrounds and surfaces"""
+    hsl = rgb_to_hsl(hex_to_rgb(colors))
+    return hsl_to_hex(hsl[..., 0], np.maximum(10, hsl[..., 1] - 40), lightness)
+
+
+# --------------------------------------------
+# WCAG contrast
+# --------------------------------------------
+def relative_luminance(rgb: ColorArray) -> ColorArray:
+    """WCAG relative luminance of (..., 3) integer RGB"""
+    channel = np.asarray(rgb, dtype=np.float64) / 255.0
+    linear = np.where(channel <= 0.03928, channel / 12.92, ((channel + 0.055) / 1.055) ** 2.4)
+    return linear @ np.array([0.2126, 0.7152, 0.0722])
+
+
+def _luminances(colors: HexColors) -> ColorArray:
+    return relative_luminance(hex_to_rgb([colors] if isinstance(colors, str) else colors))
+
+
+def _contrast(fg: ColorArray, bg: ColorArray) -> ColorArray:
+    return (np.maximum(fg, bg) + 0.05) / (np.minimum(fg, bg) + 0.05)
+
+
+def contrast_matrix(foregrounds: HexColors, backgrounds: HexColors) -> ColorArray:
+    """WCAG contrast ratio of every foreground (rows) on every background (columns), 1.0 to 21.0"""
+    return _contrast(_luminances(foregrounds)[:, None], _luminances(backgrounds)[None, :])
+
+
+def contrast_ratios(foregrounds: HexColors, backgrounds: HexColors) -> ColorArray:
+    """WCAG contrast ratio of each foreground on the background at the same position"""
+    return _contrast(_luminances(foregrounds), _luminances(backgrounds))
+
+
+def text_colors(backgrounds: Sequence[str]) -> List[str]:
+    """
+    A tinted text color per background: a dark and a light variant of the
+    background's own hue, whichever has the higher WCAG contrast on it.
+    """
+    hsl = rgb_to_hsl(hex_to_rgb(backgrounds))
+    h, s, l = hsl[..., 0], hsl[..., 1], hsl[..., 2]
+    dark = hsl_to_hex(h, np.minimum(80, s + 20), np.maximum(15, l - 70))
+    light = hsl_to_hex(h, np.maximum(10, s - 30), np.minimum(95, l + 60))
+    use_dark = contrast_ratios(dark, backgrounds) >= contrast_ratios(light, backgrounds)
+    return [d if pick else w for d, w, pick in zip(dark, light, use_dark.tolist())]
+
+
+# --------------------------------------------
+# Harmonies
+# --------------------------------------------
+def harmony_palettes(base_hues: Sequence[int], kind: str) -> List[Dict[str, str]]:
+    """One palette (primary/secondary/accent/surface/background) per base hue, all converted in one pass"""
+    roles = HARMONIES[kind]
+    offsets = np.array([spec for spec in roles.values()], dtype=np.int64)
+    bases = np.asarray(base_hues, dtype=np.int64)[:, None]
+    hexes = hsl_to_hex((bases + offsets[:, 0]) % 360, offsets[:, 1], offsets[:, 2])
+    width = len(roles)
+    palettes = []
+    for i in range(len(bases)):
+        palette = dict(zip(roles, hexes[i * width:(i + 1) * width]))
+        for role, color in HARMONY_DEFAULTS.items():
+            palette.setdefault(role, color)
+        palettes.append(palette)
+    return palettes
+
+
+@lru_cache(maxsize=None)
+def _palette_table(kind: str) -> List[Dict[str, str]]:
+    return harmony_palettes(np.arange(360), kind)
+
+
+def harmony_palette(base_hue: int, kind: str) -> Dict[str, str]:
+    """Palette for one base hue; all 360 per harmony are built in one pass on first use, then looked up"""
+    return dict(_palette_table(kind)[int(base_hue) % 360])
@@ -0,0 +1,132 @@
+# app/services/compression.py
+
+import gzip
+import os
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import brotli  # type: ignore
+except ImportError:
+    brotli = None  # type: ignore
+
+# Responses smaller than this are sent as-is (headers would eat the savings)
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "500"))
+# Levels for responses compressed per request; precompressed assets always use the maximum
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+
+
+def supported_encodings() -> Tuple[str, ...]:
+    """Encodings this server can produce, preferred first"""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Best supported encoding the client accepts (q=0 excluded), or None for identity"""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name] = quality
+    for encoding in supported_encodings():
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str, best: bool = False) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=11 if best else BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=9 if best else GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+class PrecompressedBody:
+    """A static body compressed once, at maximum level, in every supported encoding"""
+
+    def __init__(self, body: bytes) -> None:
+        self.body = body
+        self.variants: Dict[str, bytes] = {}
+        if len(body) >= COMPRESSION_MIN_BYTES:
+            self.variants = {encoding: compress(body, encoding, best=True) for encoding in supported_encodings()}
+
+    def select(self, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+        """(body, Content-Encoding or None) for a request's Accept-Encoding"""
+        encoding = negotiate(accept_encoding) if self.variants else None
+        if encoding is None:
+            return self.body, None
+        return self.variants[encoding], encoding
+
+
+class CompressionMiddleware:
+    """
+    Brotli (when the brotli package is installed) or gzip for single-message
+    text and JSON responses above COMPRESSION_MIN_BYTES. Responses that
+    already carry a Content-Encoding (precompressed assets) and streaming
+    responses pass through untouched.
+    """
+
+    def __init__(self, app: Any, minimum_size: int = COMPRESSION_MIN_BYTES) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        encoding = negotiate(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+
+        async def compressing_send(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if start is None:
+                await send(message)
+                return
+            pending, start = start, None
+            response_headers = pending.get("headers") or []
+            if message.get("more_body") or not self._compressible(response_headers, message.get("body", b"")):
+                await send(pending)
+                await send(message)
+                return
+            body = compress(message["body"], encoding)
+            response_headers = [(k, v) for k, v in response_headers if k.lower() != b"content-length"]
+            vary = [v for k, v in response_headers if k.lower() == b"vary"]
+            response_headers = [(k, v) for k, v in response_headers if k.lower() != b"vary"]
+            response_headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(body)).encode()),
+                (b"vary", b", ".join(vary + [b"Accept-Encoding"])),
+            ]
+            await send({**pending, "headers": response_headers})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, compressing_send)
+
+    def _compressible(self, headers, body: bytes) -> bool:
+        if len(body) < self.minimum_size:
+            return False
+        content_type = b""
+        for key, value in headers:
+            key = key.lower()
+            if key == b"content-encoding":
+                return False
+            if key == b"content-type":
+                content_type = value
+        return content_type.decode("latin-1").startswith(COMPRESSIBLE_TYPES)
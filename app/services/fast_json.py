@@ -0,0 +1,69 @@
+# app/services/fast_json.py
+
+import json
+from typing import Any, Dict, Mapping, Optional
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None  # type: ignore
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON; orjson when installed, the json module otherwise"""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_fields(fields: Mapping[str, Any], encoded: Mapping[str, bytes]) -> bytes:
+    """A JSON object of `fields` in order, splicing in the already-encoded JSON of the keys in `encoded`"""
+    parts = [dumps(key) + b":" + (encoded[key] if key in encoded else dumps(value)) for key, value in fields.items()]
+    return b"{" + b",".join(parts) + b"}"
+
+
+class EncodedReport:
+    """A report's model_dump() and its JSON bytes, each computed once"""
+
+    __slots__ = ("data", "_json")
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        self.data = data
+        self._json: Optional[bytes] = None
+
+    @property
+    def json(self) -> bytes:
+        if self._json is None:
+            self._json = dumps(self.data)
+        return self._json
+
+
+def encode_report(report: BaseModel) -> EncodedReport:
+    """Dump a report once; later calls for the same report object reuse the cached dict and bytes"""
+    cached = report._encoded
+    if cached is None:
+        cached = report._encoded = EncodedReport(report.model_dump())
+    return cached
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson. bytes content is taken as
+    already-encoded JSON and sent as-is (cached report bodies).
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
@@ -7,8 +7,36 @@ from typing import Any, Dict, Optional, List
 
 import requests
 
+from app.services.colors import hsl_to_hex, parse_hsl
+from app.services.keywords import keyword_matcher, register_tables
+
 FIGMA_API_URL = "https://api.figma.com/v1"
 
+# Business/technical terms with weights, for project naming
+KEY_TERM_WEIGHTS = {
+    # Business terms
+    'management': 3, 'dashboard': 3, 'analytics': 3, 'monitoring': 3,
+    'tracking': 2, 'reporting': 2, 'inventory': 2, 'customer': 2,
+    'sales': 2, 'finance': 2, 'hr': 2, 'crm': 2, 'erp': 2,
+    'workflow': 2, 'automation': 2, 'integration': 2,
+    # Tech terms
+    'security': 4, 'scanning': 3, 'automated': 3, 'intelligent': 3,
+    'smart': 2, 'digital': 2, 'cloud': 2, 'mobile': 2,
+    'web': 2, 'api': 2, 'database': 2, 'network': 2
+}
+
+# Checked in order; the first type with a keyword in the document wins
+APP_TYPE_KEYWORDS = {
+    'DASHBOARD': ['dashboard', 'overview', 'summary', 'metrics'],
+    'PORTAL': ['portal', 'gateway', 'access', 'login'],
+    'PLATFORM': ['platform', 'service', 'solution', 'framework'],
+    'APPLICATION': ['application', 'app', 'software', 'tool'],
+    'SYSTEM': ['system', 'management', 'control', 'administration']
+}
+
+register_tables({"figma_key_terms": list(KEY_TERM_WEIGHTS)})
+register_tables({f"figma_app_type:{app_type}": keywords for app_type, keywords in APP_TYPE_KEYWORDS.items()})
+
 
 class FigmaClient:
     def __init__(
@@ -60,30 +88,10 @@ class FigmaClient:
     
     def _extract_key_terms(self, text: str) -> List[str]:
         """Extract key business/technical terms from document."""
-        # Convert to lowercase for analysis
-        text_lower = text.lower()
-        
-        # Define term categories with weights
-        business_terms = {
-            'management': 3, 'dashboard': 3, 'analytics': 3, 'monitoring': 3,
-            'tracking': 2, 'reporting': 2, 'inventory': 2, 'customer': 2,
-            'sales': 2, 'finance': 2, 'hr': 2, 'crm': 2, 'erp': 2,
-            'workflow': 2, 'automation': 2, 'integration': 2
-        }
-        
-        tech_terms = {
-            'security': 4, 'scanning': 3, 'automated': 3, 'intelligent': 3,
-            'smart': 2, 'digital': 2, 'cloud': 2, 'mobile': 2,
-            'web': 2, 'api': 2, 'database': 2, 'network': 2
-        }
+        counts = keyword_matcher.scan(text).counts("figma_key_terms")
         
         # Score terms based on frequency and weight
-        term_scores = {}
-        
-        for term, weight in {**business_terms, **tech_terms}.items():
-            count = text_lower.count(term)
-            if count > 0:
-                term_scores[term] = count * weight
+        term_scores = {term: counts[term] * weight for term, weight in KEY_TERM_WEIGHTS.items() if term in counts}
         
         # Return top terms, capitalized
         sorted_terms = sorted(term_scores.items(), key=lambda x: x[1], reverse=True)
@@ -140,18 +148,9 @@ class FigmaClient:
     
     def _identify_app_type(self, text: str) -> str:
         """Identify the type of application from content."""
-        text_lower = text.lower()
-        
-        app_types = {
-            'DASHBOARD': ['dashboard', 'overview', 'summary', 'metrics'],
-            'PORTAL': ['portal', 'gateway', 'access', 'login'],
-            'PLATFORM': ['platform', 'service', 'solution', 'framework'],
-            'APPLICATION': ['application', 'app', 'software', 'tool'],
-            'SYSTEM': ['system', 'management', 'control', 'administration']
-        }
-        
-        for app_type, keywords in app_types.items():
-            if any(keyword in text_lower for keyword in keywords):
+        hits = keyword_matcher.scan(text)
+        for app_type in APP_TYPE_KEYWORDS:
+            if hits.found(f"figma_app_type:{app_type}"):
                 return app_type
         
         return "APPLICATION"
@@ -288,14 +287,8 @@ class FigmaClient:
     def _hsl_to_hex(self, hsl_color: str) -> str:
         """Convert HSL to HEX color format."""
         try:
-            # Simple conversion for demo - in production use proper color library
-            import colorsys
-            hsl = hsl_color.replace('hsl(', '').replace(')', '').replace('%', '')
-            h, s, l = map(float, hsl.split(', '))
-            h, s, l = h/360, s/100, l/100
-            r, g, b = colorsys.hls_to_rgb(h, l, s)
-            return f"#{int(r*255):02x}{int(g*255):02x}{int(b*255):02x}"
-        except:
+            return hsl_to_hex(*parse_hsl(hsl_color))
+        except ValueError:
             # Fallback to random hex color
             return f"#{random.randint(0, 0xFFFFFF):06x}"
 
@@ -0,0 +1,186 @@
+# app/services/job_queue.py
+
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from app.services.uploads import Buffer
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,              -- queued | running | done | failed
+    payload TEXT NOT NULL,             -- JSON: filename, content_type, ...
+    file_bytes BLOB,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    worker_id TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_claim_idx ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_finished_idx ON jobs (status, finished_at);
+"""
+
+
+class JobQueue:
+    """
+    Durable job queue on a single SQLite file.
+
+    Workers claim jobs with a time-limited lease and must heartbeat to keep
+    it. A job whose lease expires (worker crashed or was restarted) becomes
+    claimable again until max_attempts is reached. Every call opens its own
+    connection, so one JobQueue can be shared across threads, and several
+    processes or nodes can point at the same DB file.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or os.getenv("JOB_DB_PATH", "./jobs.db")
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                self._initialized = True
+            yield conn
+        finally:
+            conn.close()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    # --------------------------------------------
+    # Producer side
+    # --------------------------------------------
+    def enqueue(self, kind: str, payload: Dict[str, Any], file_bytes: Optional[Buffer] = None,
+                max_attempts: int = 3) -> str:
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, payload, file_bytes, max_attempts, created_at) "
+                "VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), file_bytes, max_attempts, time.time()),
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        # Readers never create the DB file; only enqueue() and workers do
+        if not self.exists():
+            return None
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, kind, status, payload, attempts, max_attempts, worker_id, lease_expires, "
+                "result, error, created_at, started_at, finished_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def latest_finished_at(self) -> Optional[Tuple[str, float]]:
+        """
+        (id, finished_at) of the most recently completed job, used by /latest-report
+        when workers run out of process. Index-only; load the result with get().
+        """
+        if not self.exists():
+            return None
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, finished_at FROM jobs WHERE status = 'done' ORDER BY finished_at DESC LIMIT 1"
+            ).fetchone()
+        return (row["id"], row["finished_at"] or 0) if row else None
+
+    def counts(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    # --------------------------------------------
+    # Worker side
+    # --------------------------------------------
+    def claim(self, worker_id: str, lease_seconds: float = 60.0) -> Optional[Dict[str, Any]]:
+        """Atomically lease the oldest runnable job (queued, or running with an expired lease)"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs whose lease expired on their final attempt are given up on
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', finished_at = ?, file_bytes = NULL, "
+                    "error = COALESCE(error, 'Lease expired on final attempt') "
+                    "WHERE status = 'running' AND lease_expires < ? AND attempts >= max_attempts",
+                    (now, now),
+                )
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE (status = 'queued') "
+                    "OR (status = 'running' AND lease_expires < ?) "
+                    "ORDER BY created_at LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', worker_id = ?, lease_expires = ?, "
+                    "attempts = attempts + 1, started_at = ? WHERE id = ?",
+                    (worker_id, now + lease_seconds, now, row["id"]),
+                )
+                job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        result = self._row_to_dict(job)
+        result["file_bytes"] = job["file_bytes"]
+        return result
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float = 60.0) -> bool:
+        """Extend the lease; False means the job was reclaimed by someone else"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker_id = ? AND status = 'running'",
+                (time.time() + lease_seconds, job_id, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, finished_at = ?, "
+                "lease_expires = NULL, file_bytes = NULL "
+                "WHERE id = ? AND worker_id = ? AND status = 'running'",
+                (json.dumps(result), time.time(), job_id, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        """Record a failed attempt: requeue while attempts remain, otherwise mark failed and drop the upload"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET error = ?, lease_expires = NULL, "
+                "status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END, "
+                "finished_at = CASE WHEN attempts >= max_attempts THEN ? ELSE NULL END, "
+                "file_bytes = CASE WHEN attempts >= max_attempts THEN NULL ELSE file_bytes END "
+                "WHERE id = ? AND worker_id = ? AND status = 'running'",
+                (error[:2000], time.time(), job_id, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        data = {key: row[key] for key in row.keys() if key != "file_bytes"}
+        data["payload"] = json.loads(data["payload"]) if data.get("payload") else {}
+        data["result"] = json.loads(data["result"]) if data.get("result") else None
+        return data
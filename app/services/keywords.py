@@ -0,0 +1,160 @@
+# app/services/keywords.py
+
+import re
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.services.text_index import token_index
+
+# Word tokens (as in TokenIndex); multi-word keywords ("unit test", "e-commerce") are token sequences
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+SCAN_CACHE_SIZE = 8
+
+
+def _tokens(keyword: str) -> List[str]:
+    return _TOKEN.findall(keyword.lower())
+
+
+def _inflections(token: str) -> List[str]:
+    """The token plus its plural forms, so "product" also matches "products" and "delivery" "deliveries" """
+    forms = [token, token + "s", token + "es"]
+    if len(token) > 2 and token.endswith("y") and token[-2] not in "aeiou":
+        forms.append(token[:-1] + "ies")
+    return forms
+
+
+class KeywordHits:
+    """Result of one scan: per table, the keywords found with their counts and character offsets"""
+
+    def __init__(self, tables: Dict[str, Tuple[str, ...]], positions: Dict[str, Dict[str, List[int]]]) -> None:
+        self._tables = tables
+        self._positions = positions
+
+    def positions(self, table: str) -> Dict[str, List[int]]:
+        """keyword -> start offsets in the text, for keywords that occur"""
+        return self._positions.get(table, {})
+
+    def counts(self, table: str) -> Dict[str, int]:
+        """keyword -> number of occurrences, for keywords that occur"""
+        return {keyword: len(offsets) for keyword, offsets in self.positions(table).items()}
+
+    def count(self, table: str, keyword: str) -> int:
+        return len(self.positions(table).get(keyword, ()))
+
+    def found(self, table: str) -> List[str]:
+        """Keywords of the table that occur, in table order"""
+        positions = self.positions(table)
+        return [keyword for keyword in self._tables.get(table, ()) if keyword in positions]
+
+
+class KeywordMatcher:
+    """
+    One Aho-Corasick automaton over every registered keyword table.
+
+    The alphabet is word tokens rather than characters, which gives word
+    boundary semantics for free ("git" no longer matches "digital") and
+    keeps the Python-level loop to one dict lookup per word. A scan is a
+    single pass over the document for all tables at once; recent results
+    are cached per text, so the analyzers that look at the same document
+    share one scan.
+    """
+
+    def __init__(self) -> None:
+        self._tables: Dict[str, Tuple[str, ...]] = {}
+        self._lock = threading.Lock()
+        self._automaton: Optional[Tuple[List[Dict[str, int]], List[int], List[List[Tuple[str, str, int]]]]] = None
+        self._cache: "OrderedDict[str, KeywordHits]" = OrderedDict()
+
+    def register(self, table: str, keywords: Iterable[str]) -> None:
+        """Add or replace a keyword table; the automaton is rebuilt on the next scan"""
+        with self._lock:
+            self._tables[table] = tuple(keywords)
+            self._automaton = None
+            self._cache.clear()
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def _build(self) -> Tuple[List[Dict[str, int]], List[int], List[List[Tuple[str, str, int]]]]:
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[Tuple[str, str, int]]] = [[]]
+        for table, keywords in self._tables.items():
+            for keyword in keywords:
+                tokens = _tokens(keyword)
+                if not tokens:
+                    continue
+                for last in _inflections(tokens[-1]):
+                    state = 0
+                    for token in tokens[:-1] + [last]:
+                        if token not in goto[state]:
+                            goto.append({})
+                            outputs.append([])
+                            goto[state][token] = len(goto) - 1
+                        state = goto[state][token]
+                    if (table, keyword, len(tokens)) not in outputs[state]:
+                        outputs[state].append((table, keyword, len(tokens)))
+
+        # Failure links, breadth first; each state also reports the outputs of its failure state
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, child in goto[state].items():
+                queue.append(child)
+                target = fail[state]
+                while target and token not in goto[target]:
+                    target = fail[target]
+                fail[child] = goto[target].get(token, 0)
+                outputs[child] = outputs[child] + outputs[fail[child]]
+        return goto, fail, outputs
+
+    def scan(self, text: str) -> KeywordHits:
+        """Counts and positions of every registered keyword in text (case-insensitive, whole words)"""
+        with self._lock:
+            cached = self._cache.get(text)
+            if cached is not None:
+                self._cache.move_to_end(text)
+                return cached
+            if self._automaton is None:
+                self._automaton = self._build()
+            goto, fail, outputs = self._automaton
+            tables = dict(self._tables)
+
+        index = token_index(text)
+        root = goto[0]
+        matches: List[Tuple[int, int]] = []
+        state = 0
+        for i, token in enumerate(index.lower_tokens):
+            if not state:
+                state = root.get(token, 0)
+                if not state:
+                    continue
+            else:
+                while state and token not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(token, 0)
+            if outputs[state]:
+                matches.append((i, state))
+
+        positions: Dict[str, Dict[str, List[int]]] = {}
+        for i, state in matches:
+            for table, keyword, length in outputs[state]:
+                positions.setdefault(table, {}).setdefault(keyword, []).append(index.starts[i - length + 1])
+
+        hits = KeywordHits(tables, positions)
+        with self._lock:
+            self._cache[text] = hits
+            while len(self._cache) > SCAN_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return hits
+
+
+keyword_matcher = KeywordMatcher()
+
+
+def register_tables(tables: Dict[str, Sequence[str]]) -> None:
+    for table, keywords in tables.items():
+        keyword_matcher.register(table, keywords)
@@ -1,11 +1,24 @@
+import contextvars
+import itertools
 import json
 import os
 import re
 import time
-from typing import Any, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
 
 from fastapi import HTTPException
 
+from app.services import metrics
+from app.services.chunking import BRIEF_FIELDS, chunked_mode_enabled, format_brief, reduce_extractions, split_sections
+from app.services.colors import adjust_colors, hsl_to_hex, text_colors, tint
+from app.services.keywords import KeywordHits, keyword_matcher, register_tables
+from app.services.llm_replay import wrap_llm_client
+from app.services.safe_regex import anchored_run_match, letter_run_match, safe_pattern
+from app.services.summarizer import summarize
+from app.services.text_index import token_index
+from app.services.tokens import LLM_MAX_COMPLETION_TOKENS, LLM_MAX_PROMPT_TOKENS, compact_prompt, completion_budget, count_tokens
+
 try:
     from groq import Groq  # type: ignore
 except ImportError:
@@ -143,30 +156,161 @@ Document:
 """
 
 
+UI_SYSTEM = ("You are a senior UI/UX designer. Analyze the document content carefully and extract REAL project "
+             "information. Create content-specific designs, not generic templates. Output only valid JSON.")
+CHUNK_SYSTEM = "You extract product requirements from document sections. Output only valid JSON."
+CHUNK_PROMPT = """From this section of a product document, list what a UI designer needs.
+Return JSON with the keys {fields}; each value is a list of short phrases (max 8 words, max 6 items).
+Use the document's own terminology. Empty lists are fine.
+
+SECTION:
+{chunk}
+"""
+CHUNK_MAX_TOKENS = int(os.getenv("LLM_CHUNK_MAX_TOKENS", "400"))
+CHUNK_CONCURRENCY = int(os.getenv("LLM_CHUNK_CONCURRENCY", "8"))
+CHUNK_PROMPT_TOKENS = int(os.getenv("LLM_CHUNK_PROMPT_TOKENS", "4000"))
+
+# Token budget for revised document content; the local summarizer picks the most UI-relevant sentences
+DOCUMENT_CONTENT_TOKENS = int(os.getenv("LLM_DOCUMENT_CONTENT_TOKENS", "500"))
+
+# Keyword tables, matched by the shared automaton in app/services/keywords.py
+APP_TYPE_KEYWORDS = {
+    'tech app': ['code', 'coding', 'programming', 'software', 'developer', 'api', 'function', 'algorithm', 'debug', 'git', 'repository', 'framework', 'library', 'script', 'syntax', 'testing', 'unit test', 'automation', 'qa', 'quality', 'junit', 'pytest'],
+    'healthcare app': ['health', 'medical', 'doctor', 'patient', 'hospital', 'clinic', 'medicine', 'healthcare', 'treatment', 'diagnosis', 'prescription'],
+    'fintech app': ['finance', 'financial', 'bank', 'banking', 'investment', 'trading', 'wallet', 'cryptocurrency', 'loan', 'payment', 'transaction', 'money', 'credit', 'debit'],
+    'education app': ['education', 'learning', 'course', 'student', 'teacher', 'school', 'university', 'academic', 'curriculum', 'assignment', 'grade', 'exam'],
+    'food delivery app': ['food', 'restaurant', 'delivery', 'recipe', 'cooking', 'meal', 'dining', 'kitchen', 'chef', 'menu', 'order'],
+    'e-commerce app': ['ecommerce', 'e-commerce', 'shop', 'shopping', 'cart', 'product', 'store', 'retail', 'buy', 'sell', 'marketplace', 'catalog', 'purchase'],
+}
+# Points per keyword present (e-commerce terms show up everywhere, so they count less)
+APP_TYPE_WEIGHTS = {'e-commerce app': 1}
+
+# Content-based color mapping; the first keyword (in this order) found in the document wins
+CONTENT_COLOR_KEYWORDS = {
+    # Security/Scanning - Red family
+    'security': ('#DC2626', '#B91C1C', '#F59E0B'),
+    'scan': ('#EF4444', '#DC2626', '#F97316'),
+    'vulnerability': ('#B91C1C', '#991B1B', '#EA580C'),
+
+    # Healthcare - Blue/Green family
+    'health': ('#0EA5E9', '#06B6D4', '#10B981'),
+    'medical': ('#0284C7', '#0891B2', '#059669'),
+    'hospital': ('#0369A1', '#0E7490', '#047857'),
+
+    # Finance - Blue/Green family
+    'finance': ('#1E40AF', '#3B82F6', '#10B981'),
+    'bank': ('#1E3A8A', '#2563EB', '#059669'),
+    'payment': ('#1D4ED8', '#3B82F6', '#0D9488'),
+
+    # Technology - Dark/Cyan family
+    'tech': ('#374151', '#6B7280', '#06B6D4'),
+    'code': ('#1F2937', '#4B5563', '#0891B2'),
+    'software': ('#111827', '#374151', '#0E7490'),
+
+    # Education - Purple/Blue family
+    'education': ('#7C3AED', '#8B5CF6', '#3B82F6'),
+    'learning': ('#6D28D9', '#7C3AED', '#2563EB'),
+    'course': ('#5B21B6', '#6D28D9', '#1D4ED8'),
+
+    # Food - Orange/Red family
+    'food': ('#EA580C', '#F97316', '#DC2626'),
+    'restaurant': ('#C2410C', '#EA580C', '#B91C1C'),
+    'delivery': ('#9A3412', '#C2410C', '#991B1B'),
+
+    # E-commerce - Purple/Pink family
+    'shop': ('#7C3AED', '#EC4899', '#F59E0B'),
+    'ecommerce': ('#6D28D9', '#DB2777', '#D97706'),
+    'marketplace': ('#5B21B6', '#BE185D', '#B45309'),
+
+    # Calculator - Blue/Orange family
+    'calculator': ('#2563EB', '#1D4ED8', '#F59E0B'),
+    'math': ('#1E40AF', '#1E3A8A', '#EA580C'),
+    'computation': ('#1D4ED8', '#1E40AF', '#D97706')
+}
+
+register_tables({f"app_type:{app_type}": keywords for app_type, keywords in APP_TYPE_KEYWORDS.items()})
+register_tables({"content_colors": list(CONTENT_COLOR_KEYWORDS)})
+
+# Document-wide scans run windowed under a time budget (app/services/safe_regex.py)
+ACTION_PHRASES = safe_pattern("action_phrases", r'(?:is|are|will|can)\s+([a-zA-Z][a-zA-Z\s]{9,49})', re.IGNORECASE)
+QUOTED_PHRASES = safe_pattern("quoted_phrases", r'"([^"]{5,50})"')
+# "\s*(?::\s*)?" rather than "\s*:?\s*": two adjacent \s* split a whitespace run every possible way before failing
+TITLED_NAMES = safe_pattern("titled_names", r'(?:Project|System|Application|Platform|Tool|Agent)\s*(?::\s*)?([A-Z][A-Za-z\s]{5,30})', re.IGNORECASE)
+TEST_FEATURES = [
+    safe_pattern(f"test_feature_{i}", pattern, re.IGNORECASE)
+    for i, pattern in enumerate([
+        r'\b(Unit\s+Test[a-zA-Z\s]*)',
+        r'\b(Test\s+Case[a-zA-Z\s]*)',
+        r'\b(Code\s+Coverage[a-zA-Z\s]*)',
+        r'\b(Test\s+Automation[a-zA-Z\s]*)',
+        r'\b(Quality\s+Assurance[a-zA-Z\s]*)',
+        r'\b(Bug\s+Detection[a-zA-Z\s]*)',
+        r'\b(Test\s+Generation[a-zA-Z\s]*)',
+        r'\b(Code\s+Analysis[a-zA-Z\s]*)',
+    ])
+]
+BULLET_FEATURES = safe_pattern("bullet_features", r'[•\-\*]\s*([A-Za-z][A-Za-z\s]{3,40})')
+COLON_FEATURES = safe_pattern("colon_features", r':\s*([A-Z][A-Za-z\s]{3,40})')
+# "Product Name: ... Agent|Tool|System", then "Project: ..." (linear form of [A-Za-z\s]+Agent|[A-Za-z\s]+Tool|...)
+PRD_TITLE_ANCHORS = (r'Product\s+Name', 'Project')
+PRD_TITLE_TAILS = ('agent', 'tool', 'system')
+
+
+def _content_offset(text: str, skip_lines: int) -> int:
+    """Offset in text of the (skip_lines + 1)-th non-empty line, or 0 if there are no more lines than that"""
+    offset = 0
+    seen = 0
+    for line in text.split('\n'):
+        if line.strip():
+            if seen == skip_lines:
+                return offset
+            seen += 1
+        offset += len(line) + 1
+    return 0
+
+
+class ScreenRegenerationError(RuntimeError):
+    """Raised by regenerate_screens when the LLM call fails (the caller falls back to a full report)"""
+
+
 class UIAnalyzer:
     def __init__(self, groq_model: Optional[str] = None) -> None:
         self.groq_model = groq_model or os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+        # Cheap, fast model for per-chunk extraction in map-reduce mode
+        self.chunk_model = os.getenv("GROQ_CHUNK_MODEL", "llama-3.1-8b-instant")
         
+        # LLM_REPLAY_MODE=replay serves completions from a cassette (no key, no network)
+        self._groq_client = wrap_llm_client(self._create_groq_client)
+
+    @staticmethod
+    def _create_groq_client() -> Any:
         api_key = os.getenv("GROQ_API_KEY")
         if not api_key:
             raise RuntimeError("GROQ_API_KEY is missing.")
         if Groq is None:
             raise RuntimeError("groq python package missing. Install: pip install groq")
         
-        self._groq_client = Groq(api_key=api_key)
+        # GROQ_BASE_URL can point at stub_llm_server.py for offline load tests
+        return Groq(api_key=api_key, base_url=os.getenv("GROQ_BASE_URL") or None)
 
     def generate_ui_spec(self, document_text: str) -> Dict[str, Any]:
         if not document_text.strip():
             document_text = "Create a modern e-commerce application with colorful UI design"
 
         # Extract content-specific information
-        content_analysis = self._analyze_document_content(document_text)
-        
-        excerpt = document_text[:3000]
-        prompt = self._build_content_aware_prompt(excerpt, content_analysis)
-        
-        raw_output = self._call_groq_with_retry(prompt)
-        parsed = self._safe_parse_json(raw_output, document_text)
+        content_analysis = self.analyze_content(document_text)
+        
+        # document_text is the assembled design prompt (its document content is already summarized);
+        # it goes in whole so section headers and design rules survive, and _fit_prompt enforces the budget
+        prompt = self._build_content_aware_prompt(document_text, content_analysis)
+        
+        # Room for the screens (one per feature, at least 3) and their layout sections
+        max_tokens = completion_budget(max(3, len(content_analysis['features'])),
+                                       min(max(len(content_analysis['sections']), 2), 5))
+        with metrics.stage("llm_call"):
+            raw_output = self._call_groq_with_retry(prompt, max_tokens=max_tokens)
+        with metrics.stage("llm_parse"):
+            parsed = self._safe_parse_json(raw_output, document_text)
 
         # Enhance with extracted content
         parsed = self._enhance_with_content(parsed, content_analysis)
@@ -184,7 +328,90 @@ class UIAnalyzer:
             raise HTTPException(status_code=502, detail="LLM returned invalid JSON.")
 
         return parsed
-    
+
+    def analyze_content(self, document_text: str) -> Dict[str, Any]:
+        """Project name, app type, features, sections and colors of a document (no LLM call)"""
+        with metrics.stage("content_analysis"):
+            return self._analyze_document_content(document_text)
+
+    def build_document_brief(self, text: str) -> str:
+        """
+        Map-reduce pass over the whole document: split by section, extract
+        features/screens/workflows from every chunk concurrently on the
+        cheap chunk model, and merge the results locally into a short brief
+        for the main prompt. Returns "" for short documents or on failure.
+        """
+        if not chunked_mode_enabled(text):
+            return ""
+        chunks = split_sections(text)
+        if len(chunks) < 2:
+            return ""
+
+        def extract(chunk: str) -> Dict[str, Any]:
+            # Chunks of very long documents outgrow the prompt budget; keep their most relevant sentences
+            prompt = CHUNK_PROMPT.format(fields=", ".join(BRIEF_FIELDS), chunk=summarize(chunk, CHUNK_PROMPT_TOKENS))
+            try:
+                raw = self._call_groq_with_retry(prompt, max_retries=2, model=self.chunk_model,
+                                                 max_tokens=CHUNK_MAX_TOKENS, system=CHUNK_SYSTEM)
+                parsed = json.loads(re.sub(r"^```(?:json)?\s*|```$", "", raw.strip()))
+                return parsed if isinstance(parsed, dict) else {}
+            except Exception as e:
+                print(f"Chunk extraction failed: {e}")
+                return {}
+
+        with metrics.stage("chunk_map"):
+            with ThreadPoolExecutor(max_workers=min(CHUNK_CONCURRENCY, len(chunks)), thread_name_prefix="chunk") as pool:
+                # One context copy per chunk, so the calls count towards this request's token usage
+                contexts = [contextvars.copy_context() for _ in chunks]
+                extractions = list(pool.map(lambda context, chunk: context.run(extract, chunk), contexts, chunks))
+        with metrics.stage("chunk_reduce"):
+            brief = format_brief(reduce_extractions(extractions), len(chunks))
+        print(f"Map-reduce brief: {len(chunks)} chunks, {len(brief)} chars")
+        return brief
+
+    def regenerate_screens(self, changed_text: str, targets: List[Dict[str, Any]], colors: Dict[str, str]) -> tuple:
+        """
+        Re-request only the given screens for a revised document.
+        targets: [{"name", "feature"}]. Returns (screens, prompt); screens may be
+        shorter than targets if the model returned fewer.
+        """
+        screen_lines = "\n".join(f"{i + 1}. {t['name']} — {t['feature']}" for i, t in enumerate(targets))
+        prompt = f"""
+A product document was revised. Regenerate ONLY the screens listed below, using the revised content.
+Keep the existing visual language: primary {colors.get('primary', '#6366F1')}, secondary {colors.get('secondary', '#8B5CF6')}, accent {colors.get('accent', '#06B6D4')}.
+
+REVISED CONTENT:
+{summarize(changed_text, DOCUMENT_CONTENT_TOKENS)}
+
+SCREENS TO REGENERATE (in this order):
+{screen_lines}
+
+Output ONLY valid JSON with exactly {len(targets)} screens, in the order above:
+
+{{
+  "screens": [
+    {{
+      "name": "{targets[0]['name'] if targets else 'Screen'}",
+      "layout": {{"sections": [{{"component": "gradient_banner", "title": "...", "gradient": "linear {colors.get('primary', '#6366F1')} → {colors.get('secondary', '#8B5CF6')}"}}]}},
+      "description": "..."
+    }}
+  ]
+}}
+"""
+        with metrics.stage("llm_call"):
+            try:
+                raw_output = self._call_groq_with_retry(prompt, max_tokens=completion_budget(len(targets), 3, base=50))
+            except Exception as e:
+                raise ScreenRegenerationError(f"screen regeneration failed: {e}") from e
+        with metrics.stage("llm_parse"):
+            # No template fallback here: unparseable output means the old screens are kept
+            try:
+                parsed = json.loads(re.sub(r"^```(?:json)?\s*|```$", "", raw_output.strip()))
+            except json.JSONDecodeError:
+                parsed = {}
+        screens = parsed.get("screens", []) if isinstance(parsed, dict) else []
+        return [s for s in screens if isinstance(s, dict)][:len(targets)], prompt
+
     def _generate_multiple_screens(self, content_analysis: Dict) -> list:
         """Generate multiple screens based on PDF features (NOT document headings)"""
         screens = []
@@ -333,16 +560,28 @@ class UIAnalyzer:
         phrases = []
         
         # Phrases after "is", "are", "will", "can"
-        action_phrases = re.findall(r'(?:is|are|will|can)\s+([a-zA-Z\s]{10,50})', text, re.IGNORECASE)
+        action_phrases = ACTION_PHRASES.findall(text)
         phrases.extend([p.strip() for p in action_phrases])
         
         # Phrases in quotes
-        quoted_phrases = re.findall(r'"([^"]{5,50})"', text)
+        quoted_phrases = QUOTED_PHRASES.findall(text)
         phrases.extend(quoted_phrases)
         
-        # Important noun phrases
-        noun_phrases = re.findall(r'\b(?:the|a|an)\s+([A-Z][a-zA-Z\s]{5,30})', text)
-        phrases.extend([p.strip() for p in noun_phrases])
+        # Important noun phrases: a capitalized run of words after "the", "a", "an"
+        index = token_index(text)
+        for i in sorted(itertools.chain(index.occurrences('the'), index.occurrences('a'), index.occurrences('an'))):
+            if not index.tokens[i].islower():
+                continue
+            run = index.run_after(i, 5)
+            if not run or not index.tokens[run[0]][0].isupper():
+                continue
+            phrase = index.tokens[run[0]]
+            for j in run[1:]:
+                if len(phrase) + 1 + len(index.tokens[j]) > 30:
+                    break
+                phrase += ' ' + index.tokens[j]
+            if len(phrase) >= 6:
+                phrases.append(phrase)
         
         # Clean and return unique phrases
         clean_phrases = [p for p in phrases if len(p.split()) >= 2 and len(p) <= 40]
@@ -396,20 +635,55 @@ class UIAnalyzer:
         
         return parsed
 
-    def _call_groq_with_retry(self, prompt: str, max_retries: int = 3) -> str:
+    def _fit_prompt(self, prompt: str, system: str) -> str:
+        """Compact a prompt over LLM_MAX_PROMPT_TOKENS; reject it if it still does not fit"""
+        budget = LLM_MAX_PROMPT_TOKENS - count_tokens(system)
+        if count_tokens(prompt) <= budget:
+            return prompt
+        compacted = compact_prompt(prompt)
+        tokens = count_tokens(compacted)
+        if tokens <= budget:
+            metrics.LLM_PROMPT_BUDGET.inc(action="compacted")
+            print(f"Prompt compacted to {tokens} tokens (budget {budget})")
+            return compacted
+        metrics.LLM_PROMPT_BUDGET.inc(action="rejected")
+        raise HTTPException(status_code=413, detail=f"Prompt is {tokens} tokens, over the {budget}-token budget")
+
+    def _call_groq_with_retry(self, prompt: str, max_retries: int = 3, model: Optional[str] = None,
+                              max_tokens: int = LLM_MAX_COMPLETION_TOKENS, system: Optional[str] = None) -> str:
+        model = model or self.groq_model
+        system = system or UI_SYSTEM
+        prompt = self._fit_prompt(prompt, system)
+        prompt_estimate = count_tokens(system) + count_tokens(prompt)
         for attempt in range(max_retries):
             try:
                 response = self._groq_client.chat.completions.create(
-                    model=self.groq_model,
+                    model=model,
                     temperature=0.2,
-                    max_tokens=3000,
+                    max_tokens=max_tokens,
                     timeout=45,
                     messages=[
-                        {"role": "system", "content": "You are a senior UI/UX designer. Analyze the document content carefully and extract REAL project information. Create content-specific designs, not generic templates. Output only valid JSON."},
+                        {"role": "system", "content": system},
                         {"role": "user", "content": prompt},
                     ],
                 )
-                return response.choices[0].message.content.strip()
+                content = response.choices[0].message.content.strip()
+                usage = getattr(response, "usage", None)
+                prompt_tokens = getattr(usage, "prompt_tokens", None)
+                completion_tokens = getattr(usage, "completion_tokens", None)
+                # Providers without usage data are accounted with the local counter
+                metrics.record_llm_usage(
+                    prompt_estimate if prompt_tokens is None else prompt_tokens,
+                    count_tokens(content) if completion_tokens is None else completion_tokens,
+                    model=model,
+                    estimated=prompt_tokens is None or completion_tokens is None,
+                )
+                if getattr(response.choices[0], "finish_reason", None) == "length" and max_tokens < LLM_MAX_COMPLETION_TOKENS \
+                        and attempt < max_retries - 1:
+                    print(f"Completion cut off at max_tokens={max_tokens}; retrying with {LLM_MAX_COMPLETION_TOKENS}")
+                    max_tokens = LLM_MAX_COMPLETION_TOKENS
+                    continue
+                return content
             except Exception as e:
                 if "rate_limit" in str(e).lower() and attempt < max_retries - 1:
                     wait_time = (attempt + 1) * 3
@@ -554,34 +828,15 @@ CRITICAL: Do NOT use generic templates. Extract REAL content from the document a
 """
     
     def _detect_app_type(self, text: str) -> str:
-        text_lower = text.lower()
-        
-        # Enhanced keyword detection with more specific terms
-        tech_keywords = ['code', 'coding', 'programming', 'software', 'developer', 'api', 'function', 'algorithm', 'debug', 'git', 'repository', 'framework', 'library', 'script', 'syntax', 'testing', 'unit test', 'automation', 'qa', 'quality', 'junit', 'pytest']
-        healthcare_keywords = ['health', 'medical', 'doctor', 'patient', 'hospital', 'clinic', 'medicine', 'healthcare', 'treatment', 'diagnosis', 'prescription']
-        fintech_keywords = ['finance', 'financial', 'bank', 'banking', 'investment', 'trading', 'wallet', 'cryptocurrency', 'loan', 'payment', 'transaction', 'money', 'credit', 'debit']
-        education_keywords = ['education', 'learning', 'course', 'student', 'teacher', 'school', 'university', 'academic', 'curriculum', 'assignment', 'grade', 'exam']
-        food_keywords = ['food', 'restaurant', 'delivery', 'recipe', 'cooking', 'meal', 'dining', 'kitchen', 'chef', 'menu', 'order']
-        ecommerce_keywords = ['ecommerce', 'e-commerce', 'shop', 'shopping', 'cart', 'product', 'store', 'retail', 'buy', 'sell', 'marketplace', 'catalog', 'purchase']
-        
-        # Count with weighted scoring
-        tech_count = sum(2 if word in text_lower else 0 for word in tech_keywords)
-        healthcare_count = sum(2 if word in text_lower else 0 for word in healthcare_keywords)
-        fintech_count = sum(2 if word in text_lower else 0 for word in fintech_keywords)
-        education_count = sum(2 if word in text_lower else 0 for word in education_keywords)
-        food_count = sum(2 if word in text_lower else 0 for word in food_keywords)
-        ecommerce_count = sum(1 if word in text_lower else 0 for word in ecommerce_keywords)
+        hits = keyword_matcher.scan(text)
         
-        # Return the domain with the highest keyword count
+        # Weighted count of the distinct keywords present
         counts = {
-            'tech app': tech_count,
-            'healthcare app': healthcare_count,
-            'fintech app': fintech_count,
-            'education app': education_count,
-            'food delivery app': food_count,
-            'e-commerce app': ecommerce_count
+            app_type: APP_TYPE_WEIGHTS.get(app_type, 2) * len(hits.counts(f"app_type:{app_type}"))
+            for app_type in APP_TYPE_KEYWORDS
         }
         
+        # Return the domain with the highest keyword count
         max_domain = max(counts, key=counts.get)
         print(f"Domain detection: {counts}, Selected: {max_domain}")
         return max_domain if counts[max_domain] > 0 else 'tech app'
@@ -597,22 +852,21 @@ CRITICAL: Do NOT use generic templates. Extract REAL content from the document a
         hex_colors = re.findall(r'#[0-9A-Fa-f]{6}', text)
         if hex_colors:
             primary = hex_colors[0]
-            secondary = hex_colors[1] if len(hex_colors) > 1 else self._adjust_color(primary, -20, 10)
-            accent = hex_colors[2] if len(hex_colors) > 2 else self._adjust_color(primary, 60, -10)
+            derived = adjust_colors([primary, primary], [-20, 60], [10, -10])
+            secondary = hex_colors[1] if len(hex_colors) > 1 else derived[0]
+            accent = hex_colors[2] if len(hex_colors) > 2 else derived[1]
         else:
             # Content-based color generation
-            primary, secondary, accent = self._generate_content_colors(text_lower)
+            primary, secondary, accent = self._generate_content_colors(text_lower, keyword_matcher.scan(text))
         
         # Dynamic background and surface colors based on primary
-        background = self._lighten_color(primary, 95)
-        surface = self._lighten_color(primary, 98)
+        background, surface = tint([primary, primary], [95, 98])
         
-        # Dynamic text colors based on contrast
-        primary_text = self._get_contrast_color(primary)
-        secondary_text = self._get_contrast_color(secondary)
-        accent_text = self._get_contrast_color(accent)
-        background_text = self._get_contrast_color(background)
-        surface_text = self._get_contrast_color(surface)
+        # Dynamic text colors based on contrast (WCAG, all five at once)
+        primary_text, secondary_text, accent_text, background_text, surface_text = text_colors(
+            [primary, secondary, accent, background, surface]
+        )
+        gradient_start, gradient_end = adjust_colors([primary, secondary], [-10, 10], 5)
         
         return {
             'primary': primary,
@@ -625,63 +879,18 @@ CRITICAL: Do NOT use generic templates. Extract REAL content from the document a
             'accent_text': accent_text,
             'background_text': background_text,
             'surface_text': surface_text,
-            'gradient_start': self._adjust_color(primary, -10, 5),
-            'gradient_end': self._adjust_color(secondary, 10, 5)
+            'gradient_start': gradient_start,
+            'gradient_end': gradient_end
         }
     
-    def _generate_content_colors(self, text_lower: str) -> tuple:
+    def _generate_content_colors(self, text_lower: str, hits: Optional[KeywordHits] = None) -> tuple:
         """Generate colors based on content keywords and context"""
         import hashlib
         
-        # Content-based color mapping
-        color_keywords = {
-            # Security/Scanning - Red family
-            'security': ('#DC2626', '#B91C1C', '#F59E0B'),
-            'scan': ('#EF4444', '#DC2626', '#F97316'),
-            'vulnerability': ('#B91C1C', '#991B1B', '#EA580C'),
-            
-            # Healthcare - Blue/Green family
-            'health': ('#0EA5E9', '#06B6D4', '#10B981'),
-            'medical': ('#0284C7', '#0891B2', '#059669'),
-            'hospital': ('#0369A1', '#0E7490', '#047857'),
-            
-            # Finance - Blue/Green family
-            'finance': ('#1E40AF', '#3B82F6', '#10B981'),
-            'bank': ('#1E3A8A', '#2563EB', '#059669'),
-            'payment': ('#1D4ED8', '#3B82F6', '#0D9488'),
-            
-            # Technology - Dark/Cyan family
-            'tech': ('#374151', '#6B7280', '#06B6D4'),
-            'code': ('#1F2937', '#4B5563', '#0891B2'),
-            'software': ('#111827', '#374151', '#0E7490'),
-            
-            # Education - Purple/Blue family
-            'education': ('#7C3AED', '#8B5CF6', '#3B82F6'),
-            'learning': ('#6D28D9', '#7C3AED', '#2563EB'),
-            'course': ('#5B21B6', '#6D28D9', '#1D4ED8'),
-            
-            # Food - Orange/Red family
-            'food': ('#EA580C', '#F97316', '#DC2626'),
-            'restaurant': ('#C2410C', '#EA580C', '#B91C1C'),
-            'delivery': ('#9A3412', '#C2410C', '#991B1B'),
-            
-            # E-commerce - Purple/Pink family
-            'shop': ('#7C3AED', '#EC4899', '#F59E0B'),
-            'ecommerce': ('#6D28D9', '#DB2777', '#D97706'),
-            'marketplace': ('#5B21B6', '#BE185D', '#B45309'),
-            
-            # Calculator - Blue/Orange family
-            'calculator': ('#2563EB', '#1D4ED8', '#F59E0B'),
-            'math': ('#1E40AF', '#1E3A8A', '#EA580C'),
-            'computation': ('#1D4ED8', '#1E40AF', '#D97706')
-        }
-        
-        # Find matching keywords
-        matched_colors = None
-        for keyword, colors in color_keywords.items():
-            if keyword in text_lower:
-                matched_colors = colors
-                break
+        # First keyword of the table that occurs decides the palette
+        hits = hits or keyword_matcher.scan(text_lower)
+        found = hits.found("content_colors")
+        matched_colors = CONTENT_COLOR_KEYWORDS[found[0]] if found else None
         
         if matched_colors:
             return matched_colors
@@ -698,99 +907,14 @@ CRITICAL: Do NOT use generic templates. Extract REAL content from the document a
         saturation = 60 + (int(content_hash[2:4], 16) % 25)  # 60-85%
         lightness = 45 + (int(content_hash[4:6], 16) % 15)   # 45-60%
         
-        primary = self._hsl_to_hex(primary_hue, saturation, lightness)
-        secondary = self._hsl_to_hex(secondary_hue, saturation - 10, lightness + 5)
-        accent = self._hsl_to_hex(accent_hue, saturation + 5, lightness - 5)
+        primary, secondary, accent = hsl_to_hex(
+            [primary_hue, secondary_hue, accent_hue],
+            [saturation, saturation - 10, saturation + 5],
+            [lightness, lightness + 5, lightness - 5],
+        )
         
         return (primary, secondary, accent)
     
-    def _adjust_color(self, hex_color: str, hue_shift: int, lightness_shift: int) -> str:
-        """Adjust a hex color by shifting hue and lightness"""
-        # Convert hex to HSL, adjust, convert back
-        r, g, b = int(hex_color[1:3], 16), int(hex_color[3:5], 16), int(hex_color[5:7], 16)
-        h, s, l = self._rgb_to_hsl(r, g, b)
-        
-        h = (h + hue_shift) % 360
-        l = max(0, min(100, l + lightness_shift))
-        
-        return self._hsl_to_hex(h, s, l)
-    
-    def _lighten_color(self, hex_color: str, target_lightness: int) -> str:
-        """Create a lighter version of a color"""
-        r, g, b = int(hex_color[1:3], 16), int(hex_color[3:5], 16), int(hex_color[5:7], 16)
-        h, s, l = self._rgb_to_hsl(r, g, b)
-        return self._hsl_to_hex(h, max(10, s - 40), target_lightness)
-    
-    def _get_contrast_color(self, hex_color: str) -> str:
-        """Calculate optimal text color for given background color"""
-        # Convert hex to RGB
-        r, g, b = int(hex_color[1:3], 16), int(hex_color[3:5], 16), int(hex_color[5:7], 16)
-        
-        # Calculate luminance
-        luminance = (0.299 * r + 0.587 * g + 0.114 * b) / 255
-        
-        # Generate contrasting color based on luminance
-        if luminance > 0.6:  # Light background
-            # Use dark color variations instead of pure black
-            h, s, l = self._rgb_to_hsl(r, g, b)
-            return self._hsl_to_hex(h, min(80, s + 20), max(15, l - 70))
-        else:  # Dark background
-            # Use light color variations instead of pure white
-            h, s, l = self._rgb_to_hsl(r, g, b)
-            return self._hsl_to_hex(h, max(10, s - 30), min(95, l + 60))
-    
-    def _rgb_to_hsl(self, r: int, g: int, b: int) -> tuple:
-        """Convert RGB to HSL"""
-        r, g, b = r/255.0, g/255.0, b/255.0
-        max_val = max(r, g, b)
-        min_val = min(r, g, b)
-        diff = max_val - min_val
-        
-        # Lightness
-        l = (max_val + min_val) / 2
-        
-        if diff == 0:
-            h = s = 0
-        else:
-            # Saturation
-            s = diff / (2 - max_val - min_val) if l > 0.5 else diff / (max_val + min_val)
-            
-            # Hue
-            if max_val == r:
-                h = (g - b) / diff + (6 if g < b else 0)
-            elif max_val == g:
-                h = (b - r) / diff + 2
-            else:
-                h = (r - g) / diff + 4
-            h /= 6
-        
-        return (int(h * 360), int(s * 100), int(l * 100))
-    
-    def _hsl_to_hex(self, h: int, s: int, l: int) -> str:
-        """Convert HSL to HEX color"""
-        h = h / 360
-        s = s / 100
-        l = l / 100
-        
-        def hue_to_rgb(p, q, t):
-            if t < 0: t += 1
-            if t > 1: t -= 1
-            if t < 1/6: return p + (q - p) * 6 * t
-            if t < 1/2: return q
-            if t < 2/3: return p + (q - p) * (2/3 - t) * 6
-            return p
-        
-        if s == 0:
-            r = g = b = l
-        else:
-            q = l * (1 + s) if l < 0.5 else l + s - l * s
-            p = 2 * l - q
-            r = hue_to_rgb(p, q, h + 1/3)
-            g = hue_to_rgb(p, q, h)
-            b = hue_to_rgb(p, q, h - 1/3)
-        
-        return f"#{int(r*255):02x}{int(g*255):02x}{int(b*255):02x}"
-    
     def _analyze_document_content(self, text: str) -> Dict[str, Any]:
         """Extract specific content from document for UI generation"""
         import re
@@ -800,6 +924,8 @@ CRITICAL: Do NOT use generic templates. Extract REAL content from the document a
         lines = [line.strip() for line in text.split('\n') if line.strip()]
         content_lines = lines[10:] if len(lines) > 10 else lines
         content_text = '\n'.join(content_lines)
+        index = token_index(text)
+        content_tokens = [index.tokens[i] for i in index.token_range(_content_offset(text, 10))]
         
         # Extract project name using improved method
         project_name = self._extract_project_title(text)
@@ -807,9 +933,9 @@ CRITICAL: Do NOT use generic templates. Extract REAL content from the document a
         # Clean up project name if it's too generic
         if any(generic in project_name.lower() for generic in ['dynamic project', 'document analysis', 'product overview']):
             # Try to find a better name from the content
-            better_names = re.findall(r'(?:Project|System|Application|Platform|Tool|Agent)\s*:?\s*([A-Z][A-Za-z\s]{5,30})', text, re.IGNORECASE)
-            if better_names:
-                project_name = f"{better_names[0].strip()} {str(int(time.time()))[-4:]}"
+            better_name = TITLED_NAMES.first(text)
+            if better_name:
+                project_name = f"{better_name.strip()} {str(int(time.time()))[-4:]}"
         
         # Extract meaningful features from PDF content
         features = []
@@ -818,34 +944,23 @@ CRITICAL: Do NOT use generic templates. Extract REAL content from the document a
         prd_features = []
         
         # Unit test specific patterns
-        test_patterns = [
-            r'\b(Unit\s+Test[a-zA-Z\s]*)',
-            r'\b(Test\s+Case[a-zA-Z\s]*)',
-            r'\b(Code\s+Coverage[a-zA-Z\s]*)',
-            r'\b(Test\s+Automation[a-zA-Z\s]*)',
-            r'\b(Quality\s+Assurance[a-zA-Z\s]*)',
-            r'\b(Bug\s+Detection[a-zA-Z\s]*)',
-            r'\b(Test\s+Generation[a-zA-Z\s]*)',
-            r'\b(Code\s+Analysis[a-zA-Z\s]*)',
-        ]
-        
-        for pattern in test_patterns:
-            matches = re.findall(pattern, content_text, re.IGNORECASE)
+        for pattern in TEST_FEATURES:
+            matches = pattern.findall(content_text)
             prd_features.extend([m.strip().title() for m in matches])
         
         # Look for bullet points and numbered lists (skip first 10 lines)
-        bullet_features = re.findall(r'[•\-\*]\s*([A-Za-z][A-Za-z\s]{3,40})', content_text)
+        bullet_features = BULLET_FEATURES.findall(content_text)
         features.extend([f.strip().title()[:40] for f in bullet_features])
         
         # Add PRD-specific features first
         features = prd_features + features
         
         # Look for key phrases after colons
-        colon_features = re.findall(r':\s*([A-Z][A-Za-z\s]{3,40})', content_text)
+        colon_features = COLON_FEATURES.findall(content_text)
         features.extend([f.strip().title()[:40] for f in colon_features])
         
         # Extract important nouns and phrases (minimum 5 characters)
-        important_words = re.findall(r'\b([A-Z][a-z]{5,15})\b', content_text)
+        important_words = [t for t in content_tokens if 6 <= len(t) <= 16 and t[0].isupper() and t[1:].islower() and t.isalpha()]
         features.extend(important_words)
         
         # Expanded common words to filter out document metadata
@@ -868,7 +983,7 @@ CRITICAL: Do NOT use generic templates. Extract REAL content from the document a
         # If no features found, extract from document content dynamically
         if len(features) < 4:
             # Extract meaningful words from document (skip first 10 lines, minimum 5 chars)
-            meaningful_words = re.findall(r'\b([A-Z][a-z]{5,12})\b', content_text)
+            meaningful_words = [t for t in content_tokens if 6 <= len(t) <= 13 and t[0].isupper() and t[1:].islower() and t.isalpha()]
             # Filter out common words
             filtered_words = [w for w in meaningful_words if w.lower() not in common_words]
             features.extend(filtered_words[:4-len(features)])
@@ -925,7 +1040,7 @@ CRITICAL: Do NOT use generic templates. Extract REAL content from the document a
             'features': features[:4] if features else ['Feature 1', 'Feature 2', 'Feature 3', 'Feature 4'],
             'sections': sections[:3] if sections else ['Main Section', 'Secondary Section'],
             'colors': color_scheme,
-            'keywords': re.findall(r'\b[a-zA-Z]{4,12}\b', text)[:20]
+            'keywords': list(itertools.islice((t for t in index.tokens if 4 <= len(t) <= 12 and t.isalpha()), 20))
         }
     
     def _build_content_aware_prompt(self, document_text: str, content_analysis: Dict) -> str:
@@ -942,7 +1057,7 @@ CRITICAL: Do NOT use generic templates. Extract REAL content from the document a
 ANALYZE this SPECIFIC document and create a UNIQUE, DYNAMIC UI design based ENTIRELY on the PDF content:
 
 DOCUMENT CONTENT:
-{document_text[:2000]}
+{document_text}
 
 EXTRACTED ANALYSIS:
 - Project Name: {content_analysis['project_name']}
@@ -1204,18 +1319,17 @@ Output ONLY valid JSON with REAL PDF content:
         timestamp = str(int(time.time()))[-4:]
         
         # Look for specific PRD patterns first
-        prd_patterns = [
-            r'Product\s+Name\s*:?\s*([A-Za-z\s]+Agent|[A-Za-z\s]+Tool|[A-Za-z\s]+System)',
-            r'Project\s*:?\s*([A-Za-z\s]+Agent|[A-Za-z\s]+Tool|[A-Za-z\s]+System)',
-            r'([A-Za-z\s]*Unit\s+Test[A-Za-z\s]*Agent)',
-            r'([A-Za-z\s]*Test[A-Za-z\s]*Agent)',
-            r'([A-Za-z\s]*Agent[A-Za-z\s]*)',
-        ]
-        
-        for pattern in prd_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            if matches:
-                return matches[0].strip().title()
+        for anchor in PRD_TITLE_ANCHORS:
+            match = anchored_run_match(text, anchor, PRD_TITLE_TAILS)
+            if match:
+                return match.strip().title()
+        
+        # "... Unit Test ... Agent", "... Test ... Agent", "... Agent ..." (linear forms of the [A-Za-z\s]* patterns)
+        if 'agent' in token_index(text).lower:
+            for anchor, tail in ((r'unit\s+test', 'agent'), ('test', 'agent'), ('agent', None)):
+                match = letter_run_match(text, anchor, tail)
+                if match:
+                    return match.strip().title()
         
         # Look for title patterns in lines
         for line in lines:
@@ -1240,9 +1354,9 @@ Output ONLY valid JSON with REAL PDF content:
         
         # Fallback with timestamp
         # Try to extract from content patterns
-        content_titles = re.findall(r'(?:Project|System|Application|Platform|Tool|Agent)\s*:?\s*([A-Z][A-Za-z\s]{5,30})', text, re.IGNORECASE)
-        if content_titles:
-            return content_titles[0].strip()
+        content_title = TITLED_NAMES.first(text)
+        if content_title:
+            return content_title.strip()
         
         return "Dynamic Project"
 
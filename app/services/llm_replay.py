@@ -0,0 +1,286 @@
+# app/services/llm_replay.py
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from app.services.tokens import count_tokens
+
+
+# Canned completion used when a cassette has no entries. It carries just
+# enough structure for build_ui_report to run the full post-processing path.
+SYNTHETIC_COMPLETION = json.dumps({
+    "project_name": "Synthetic Project",
+    "summary": "Synthetic completion for offline benchmarking",
+    "screens": [
+        {
+            "name": "Home Screen",
+            "layout": {"sections": [
+                {"component": "gradient_banner", "gradient": "linear #6366F1 → #8B5CF6", "height": 280},
+                {"component": "filter_chips", "items": ["Category1", "Category2", "Category3"]},
+                {"component": "event_cards", "grid_columns": 2},
+            ]},
+            "description": "Synthetic home screen",
+        },
+        {
+            "name": "Details Screen",
+            "layout": {"sections": [
+                {"component": "section_heading", "title": "Details"},
+                {"component": "elevated_container", "title": "Overview"},
+            ]},
+            "description": "Synthetic details screen",
+        },
+        {
+            "name": "Settings Screen",
+            "layout": {"sections": [
+                {"component": "section_heading", "title": "Settings"},
+                {"component": "rounded_card", "title": "Preferences"},
+            ]},
+            "description": "Synthetic settings screen",
+        },
+    ],
+    "styles": {
+        "colors": {"primary": "#6366F1", "secondary": "#8B5CF6", "accent": "#06B6D4"},
+        "typography": {"display": "Poppins 800", "heading": "Poppins 700", "body": "Inter 500"},
+    },
+})
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count for offline accounting (same counter as the live prompt budget)"""
+    return count_tokens(text)
+
+
+def completion_key(model: str, messages: List[Dict[str, str]]) -> str:
+    """Stable lookup key for a chat completion request"""
+    payload = json.dumps({"model": model, "messages": messages}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def request_family(model: str, messages: List[Dict[str, str]]) -> str:
+    """Key of the kind of request (model and system prompt), shared by every document sent with it"""
+    system = [m.get("content", "") for m in messages if m.get("role") == "system"]
+    payload = json.dumps({"model": model, "system": system}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# --------------------------------------------
+# CASSETTE (captured completions, one JSON object per line)
+# --------------------------------------------
+class Cassette:
+    """Append-only JSONL store of captured completions and their timing"""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+        self.entries: List[Dict[str, Any]] = []
+        self._by_key: Dict[str, Dict[str, Any]] = {}
+        self._by_family: Dict[str, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        self._index(json.loads(line))
+
+    def _index(self, entry: Dict[str, Any]) -> None:
+        self.entries.append(entry)
+        self._by_key[entry["key"]] = entry
+        if entry.get("family"):
+            self._by_family.setdefault(entry["family"], []).append(entry)
+
+    def lookup(self, key: str, family: Optional[str] = None, strict: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Exact match by key; otherwise a stable pick among entries recorded for the
+        same model and system prompt, so unseen documents still replay a response
+        of the right shape. None when nothing of that kind was recorded.
+        """
+        entry = self._by_key.get(key)
+        if entry is not None or strict:
+            return entry
+        candidates = self._by_family.get(family or "")
+        if not candidates:
+            return None
+        return candidates[int(key[:8], 16) % len(candidates)]
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._index(entry)
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+# --------------------------------------------
+# LATENCY PROFILES
+# --------------------------------------------
+class LatencyProfile:
+    """
+    How long a replayed completion should take.
+    mode="recorded" reuses the captured timing; mode="synthetic" derives it
+    from time-to-first-token plus completion_tokens / tokens_per_sec.
+    """
+
+    def __init__(
+        self,
+        mode: str = "recorded",
+        ttft_s: float = 0.3,
+        tokens_per_sec: float = 250.0,
+        jitter: float = 0.0,
+        speedup: float = 1.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.mode = mode
+        self.ttft_s = ttft_s
+        self.tokens_per_sec = tokens_per_sec
+        self.jitter = jitter
+        self.speedup = speedup if speedup > 0 else 1.0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "LatencyProfile":
+        seed = os.getenv("LLM_STUB_SEED")
+        return cls(
+            mode=os.getenv("LLM_STUB_PROFILE", "recorded").lower(),
+            ttft_s=float(os.getenv("LLM_STUB_TTFT_MS", "300")) / 1000,
+            tokens_per_sec=float(os.getenv("LLM_STUB_TOKENS_PER_SEC", "250")),
+            jitter=float(os.getenv("LLM_STUB_JITTER", "0")),
+            speedup=float(os.getenv("LLM_STUB_SPEEDUP", "1")),
+            seed=int(seed) if seed else None,
+        )
+
+    def token_delays(self, entry: Dict[str, Any]) -> List[float]:
+        """Delay before the first token, followed by one delay per further token"""
+        tokens = max(1, int(entry.get("completion_tokens") or 1))
+        if self.mode == "recorded" and entry.get("latency_s") is not None:
+            ttft = float(entry.get("ttft_s") or 0.0)
+            per_token = max(0.0, float(entry["latency_s"]) - ttft) / tokens
+        else:
+            ttft = self.ttft_s
+            per_token = 1.0 / self.tokens_per_sec if self.tokens_per_sec > 0 else 0.0
+        if self.jitter:
+            with self._lock:
+                factor = max(0.0, 1.0 + self._rng.uniform(-self.jitter, self.jitter))
+            ttft *= factor
+            per_token *= factor
+        return [ttft / self.speedup] + [per_token / self.speedup] * (tokens - 1)
+
+    def total_delay(self, entry: Dict[str, Any]) -> float:
+        return sum(self.token_delays(entry))
+
+
+def _completion_response(entry: Dict[str, Any], model: str) -> SimpleNamespace:
+    """Shape a cassette entry like a groq ChatCompletion object"""
+    message = SimpleNamespace(role="assistant", content=entry["content"])
+    usage = SimpleNamespace(
+        prompt_tokens=entry.get("prompt_tokens", 0),
+        completion_tokens=entry.get("completion_tokens", 0),
+        total_tokens=entry.get("prompt_tokens", 0) + entry.get("completion_tokens", 0),
+    )
+    return SimpleNamespace(
+        id=f"replay-{entry['key'][:12]}",
+        model=model,
+        choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")],
+        usage=usage,
+    )
+
+
+# --------------------------------------------
+# CLIENTS (drop-in for Groq().chat.completions.create)
+# --------------------------------------------
+class ReplayClient:
+    """Serves completions from a cassette without touching the network"""
+
+    def __init__(self, cassette: Cassette, profile: Optional[LatencyProfile] = None, strict: bool = False) -> None:
+        self.cassette = cassette
+        self.profile = profile or LatencyProfile()
+        self.strict = strict
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def resolve(self, model: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Find the entry to replay for a request, synthesizing one if the cassette is empty"""
+        key = completion_key(model, messages)
+        entry = self.cassette.lookup(key, request_family(model, messages), strict=self.strict)
+        if entry is not None and entry["key"] != key:
+            print(f"Replay miss for request {key[:12]}: replaying {entry['key'][:12]} recorded for the same system prompt")
+        if entry is None:
+            if self.strict and self.cassette.entries:
+                raise KeyError(f"No recorded completion for request {key[:12]}")
+            if self.cassette.entries:
+                print(f"Replay miss for request {key[:12]}: nothing recorded for this system prompt, serving a synthetic completion")
+            entry = {
+                "key": key,
+                "content": SYNTHETIC_COMPLETION,
+                "prompt_tokens": sum(estimate_tokens(m.get("content", "")) for m in messages),
+                "completion_tokens": estimate_tokens(SYNTHETIC_COMPLETION),
+            }
+        return entry
+
+    def _create(self, model: str, messages: List[Dict[str, str]], **kwargs: Any) -> SimpleNamespace:
+        entry = self.resolve(model, messages)
+        delay = self.profile.total_delay(entry)
+        if delay > 0:
+            time.sleep(delay)
+        return _completion_response(entry, model)
+
+
+class RecordingClient:
+    """Wraps a real client and captures every completion with its timing"""
+
+    def __init__(self, client: Any, cassette: Cassette) -> None:
+        self._client = client
+        self.cassette = cassette
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model: str, messages: List[Dict[str, str]], **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        response = self._client.chat.completions.create(model=model, messages=messages, **kwargs)
+        latency = time.perf_counter() - started
+
+        content = response.choices[0].message.content or ""
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        # Groq reports queue/prompt time separately; use it as time-to-first-token when present
+        prompt_time = getattr(usage, "prompt_time", None) or 0.0
+        queue_time = getattr(usage, "queue_time", None) or 0.0
+
+        self.cassette.append({
+            "key": completion_key(model, messages),
+            "family": request_family(model, messages),
+            "model": model,
+            "content": content,
+            "prompt_tokens": prompt_tokens if prompt_tokens is not None else sum(estimate_tokens(m.get("content", "")) for m in messages),
+            "completion_tokens": completion_tokens if completion_tokens is not None else estimate_tokens(content),
+            "latency_s": round(latency, 4),
+            "ttft_s": round(min(latency, prompt_time + queue_time), 4),
+            "recorded_at": int(time.time()),
+        })
+        return response
+
+
+def wrap_llm_client(client_factory) -> Optional[Any]:
+    """
+    Apply LLM_REPLAY_MODE to a client.
+    - off (default): return the real client
+    - record: real client, every completion appended to LLM_CASSETTE_PATH
+    - replay: no network; completions served from LLM_CASSETTE_PATH
+    client_factory is only called when a real client is needed.
+    """
+    mode = os.getenv("LLM_REPLAY_MODE", "off").lower()
+    cassette_path = os.getenv("LLM_CASSETTE_PATH", "./llm_cassette.jsonl")
+
+    if mode == "replay":
+        strict = os.getenv("LLM_REPLAY_STRICT", "false").lower() == "true"
+        return ReplayClient(Cassette(cassette_path), LatencyProfile.from_env(), strict=strict)
+
+    client = client_factory()
+    if mode == "record":
+        return RecordingClient(client, Cassette(cassette_path))
+    return client
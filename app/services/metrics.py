@@ -0,0 +1,311 @@
+# app/services/metrics.py
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds: parsing/regex stages sit in the ms range,
+# LLM and Figma calls in the 1-60 s range.
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    @contextmanager
+    def track(self, **labels: str) -> Iterator[None]:
+        """Increment for the duration of the block (e.g. in-flight jobs)"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., +Inf count], sum
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    def count(self, **labels: str) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v), self._sums[k]) for k, v in self._counts.items())
+        lines = self.header()
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# --------------------------------------------
+# PIPELINE METRICS
+# --------------------------------------------
+STAGE_LATENCY = Histogram(
+    "uiux_stage_duration_seconds", "Latency of each report pipeline stage", ("stage",)
+)
+LLM_TOKENS = Histogram(
+    "uiux_llm_tokens", "Tokens per LLM call", ("kind",), buckets=TOKEN_BUCKETS
+)
+LLM_TOKENS_TOTAL = Counter(
+    "uiux_llm_tokens_total", "LLM tokens by kind (prompt/completion) and model", ("kind", "model")
+)
+LLM_PROMPT_BUDGET = Counter(
+    "uiux_llm_prompt_budget_total", "Prompts over LLM_MAX_PROMPT_TOKENS by action (compacted/rejected)", ("action",)
+)
+REGEX_BUDGET_EXCEEDED = Counter(
+    "uiux_regex_budget_exceeded_total", "Document scans stopped at SAFE_REGEX_BUDGET_MS, by pattern", ("pattern",)
+)
+CACHE_REQUESTS = Counter(
+    "uiux_cache_requests_total", "Cache lookups by cache and result (hit/miss)", ("cache", "result")
+)
+QUEUE_DEPTH = Gauge(
+    "uiux_queue_depth", "Jobs waiting for a pipeline slot", ("lane",)
+)
+JOBS_IN_FLIGHT = Gauge(
+    "uiux_jobs_in_flight", "Report pipelines currently running", ("endpoint",)
+)
+
+
+class TokenUsage:
+    """LLM token totals for one request; shared by the threads working on it"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.estimated = False
+
+    def add(self, prompt_tokens: int, completion_tokens: int, estimated: bool = False) -> None:
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.estimated = self.estimated or estimated
+
+    def as_dict(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "llm_calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "total_tokens": self.prompt_tokens + self.completion_tokens,
+                "estimated": self.estimated,
+            }
+
+    def header(self) -> str:
+        """X-Token-Usage header value"""
+        usage = self.as_dict()
+        return f"calls={usage['llm_calls']}, prompt={usage['prompt_tokens']}, completion={usage['completion_tokens']}"
+
+
+# Per-request trace of (stage, seconds), used for logging and Server-Timing
+_current_trace: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("uiux_trace", default=None)
+# Per-request LLM token usage, reported in responses
+_current_usage: ContextVar[Optional[TokenUsage]] = ContextVar("uiux_usage", default=None)
+
+# Running stages per thread (only threads inside a stage), read by the sampling profiler to tag samples
+_thread_stages: Dict[int, List[str]] = {}
+
+
+def start_trace() -> List[Tuple[str, float]]:
+    """Begin collecting stage timings and LLM token usage for the current request/context"""
+    trace: List[Tuple[str, float]] = []
+    _current_trace.set(trace)
+    _current_usage.set(TokenUsage())
+    return trace
+
+
+def request_usage() -> TokenUsage:
+    """Token usage of the current request (an empty one outside a trace)"""
+    return _current_usage.get() or TokenUsage()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a pipeline stage into STAGE_LATENCY and the active trace"""
+    thread_id = threading.get_ident()
+    stack = _thread_stages.setdefault(thread_id, [])
+    stack.append(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        stack.pop()
+        if not stack:
+            # Otherwise every thread that ever ran a stage would keep an entry
+            _thread_stages.pop(thread_id, None)
+        STAGE_LATENCY.observe(elapsed, stage=name)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.append((name, elapsed))
+
+
+def current_stage(thread_id: int) -> Optional[str]:
+    """Innermost stage running on a thread, if any"""
+    stack = _thread_stages.get(thread_id)
+    return stack[-1] if stack else None
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def record_regex_budget_exceeded(pattern: str) -> None:
+    REGEX_BUDGET_EXCEEDED.inc(pattern=pattern)
+
+
+def record_llm_usage(prompt_tokens: Optional[int], completion_tokens: Optional[int], model: str = "unknown",
+                     estimated: bool = False) -> None:
+    if prompt_tokens is not None:
+        LLM_TOKENS.observe(prompt_tokens, kind="prompt")
+        LLM_TOKENS_TOTAL.inc(prompt_tokens, kind="prompt", model=model)
+    if completion_tokens is not None:
+        LLM_TOKENS.observe(completion_tokens, kind="completion")
+        LLM_TOKENS_TOTAL.inc(completion_tokens, kind="completion", model=model)
+    usage = _current_usage.get()
+    if usage is not None:
+        usage.add(prompt_tokens or 0, completion_tokens or 0, estimated)
+
+
+def format_trace(trace: List[Tuple[str, float]]) -> str:
+    return ", ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in trace)
+
+
+def server_timing_header(trace: List[Tuple[str, float]]) -> str:
+    """Render a trace as a Server-Timing header value"""
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in trace)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,141 @@
+# app/services/ocr.py
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Dict, List, Optional, Sequence
+
+from app.services import metrics
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+    ImageOps = None
+
+# Pages with fewer extracted characters than this are treated as scanned
+OCR_MIN_CHARS_PER_PAGE = int(os.getenv("OCR_MIN_CHARS_PER_PAGE", "80"))
+# Stop OCR once this much text is available; analysis never reads more than a few thousand chars
+OCR_TARGET_CHARS = int(os.getenv("OCR_TARGET_CHARS", "20000"))
+OCR_MAX_WORKERS = int(os.getenv("OCR_MAX_WORKERS", str(os.cpu_count() or 2)))
+OCR_CACHE_SIZE = int(os.getenv("OCR_CACHE_SIZE", "512"))
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+
+_cache: "OrderedDict[str, str]" = OrderedDict()
+_cache_lock = threading.Lock()
+_tesseract_available: Optional[bool] = None
+
+
+def ocr_available() -> bool:
+    """True when pytesseract, Pillow and the tesseract binary are all usable (checked once)"""
+    global _tesseract_available
+    if _tesseract_available is None:
+        if pytesseract is None or Image is None:
+            _tesseract_available = False
+        else:
+            try:
+                pytesseract.get_tesseract_version()
+                _tesseract_available = True
+            except Exception as e:
+                print(f"OCR disabled: {e}")
+                _tesseract_available = False
+    return _tesseract_available
+
+
+def needs_ocr(pages_text: Sequence[str]) -> bool:
+    """Low text density: the average page yields fewer than OCR_MIN_CHARS_PER_PAGE characters"""
+    if not pages_text:
+        return False
+    total = sum(len(text.strip()) for text in pages_text)
+    return total < OCR_MIN_CHARS_PER_PAGE * len(pages_text)
+
+
+def _page_images(page) -> List[bytes]:
+    """
+    Encoded images embedded in a PDF page. A scanned page is one full-page
+    image, so this is the page raster without needing a PDF renderer.
+    """
+    try:
+        return [image.data for image in page.images]
+    except Exception:
+        return []
+
+
+def _cache_get(key: str) -> Optional[str]:
+    with _cache_lock:
+        text = _cache.get(key)
+        if text is not None:
+            _cache.move_to_end(key)
+        return text
+
+
+def _cache_put(key: str, text: str) -> None:
+    with _cache_lock:
+        _cache[key] = text
+        _cache.move_to_end(key)
+        while len(_cache) > OCR_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _ocr_page(images: List[bytes]) -> str:
+    """OCR every image on one page, reusing results for pages seen before"""
+    key = hashlib.sha256(b"".join(images)).hexdigest()
+    cached = _cache_get(key)
+    metrics.record_cache("ocr", cached is not None)
+    if cached is not None:
+        return cached
+
+    parts = []
+    for data in images:
+        try:
+            with Image.open(BytesIO(data)) as image:
+                gray = ImageOps.grayscale(image)
+                parts.append(pytesseract.image_to_string(gray, lang=OCR_LANG) or "")
+        except Exception as e:
+            print(f"OCR failed for page image: {e}")
+    text = "\n".join(part.strip() for part in parts if part.strip())
+    _cache_put(key, text)
+    return text
+
+
+def ocr_pdf_pages(reader, pages_text: List[str], target_chars: int = OCR_TARGET_CHARS) -> List[str]:
+    """
+    Fill in text for scanned pages of an already-open PdfReader.
+
+    Pages that came back (nearly) empty are OCR'd in page order, one batch
+    of OCR_MAX_WORKERS pages at a time; tesseract runs as a subprocess per
+    page, so a thread pool keeps every core busy. OCR stops as soon as the
+    document holds `target_chars` characters. Returns a new pages_text list.
+    """
+    if not ocr_available():
+        return pages_text
+
+    pages_text = list(pages_text)
+    collected = sum(len(text.strip()) for text in pages_text)
+    pending = [i for i, text in enumerate(pages_text) if len(text.strip()) < OCR_MIN_CHARS_PER_PAGE]
+    workers = max(1, OCR_MAX_WORKERS)
+
+    with metrics.stage("ocr"), ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr") as pool:
+        for start in range(0, len(pending), workers):
+            if collected >= target_chars:
+                break
+            batch: Dict[int, List[bytes]] = {}
+            for index in pending[start:start + workers]:
+                images = _page_images(reader.pages[index])
+                if images:
+                    batch[index] = images
+            for index, text in zip(batch, pool.map(_ocr_page, batch.values())):
+                if len(text) > len(pages_text[index].strip()):
+                    collected += len(text) - len(pages_text[index].strip())
+                    pages_text[index] = text
+
+    print(f"OCR: {len(pending)} low-text pages, {collected} chars available")
+    return pages_text
@@ -0,0 +1,122 @@
+# app/services/pages.py
+
+import hashlib
+import html
+import re
+from pathlib import Path
+from string import Template
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+from app.services.compression import PrecompressedBody
+
+APP_DIR = Path(__file__).resolve().parent.parent
+TEMPLATE_DIR = APP_DIR / "templates"
+STATIC_DIR = APP_DIR / "static"
+
+# Fingerprinted assets never change under the same URL
+STATIC_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Pages are revalidated with their ETag on every load
+PAGE_CACHE_CONTROL = "no-cache"
+
+# Values allowed into the report page's CSS custom properties
+CSS_COLOR = re.compile(r"#[0-9A-Fa-f]{3,8}|(?:rgba?|hsla?)\([0-9.,%\s]+\)|[A-Za-z]+")
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+
+
+class StaticAsset:
+    """A file under app/static served at a content-hashed URL (e.g. /static/report.3f9a1c2b7d4e.css)"""
+
+    def __init__(self, path: Path, media_type: str) -> None:
+        body = path.read_bytes()
+        digest = hashlib.sha256(body).hexdigest()[:12]
+        self.name = f"{path.stem}.{digest}{path.suffix}"
+        self.url = f"/static/{self.name}"
+        self.media_type = media_type
+        self.etag = _etag(body)
+        self.content = PrecompressedBody(body)
+
+
+class StaticPage:
+    """A fully rendered page with its ETag and precompressed variants"""
+
+    def __init__(self, body: str) -> None:
+        encoded = body.encode("utf-8")
+        self.media_type = "text/html; charset=utf-8"
+        self.etag = _etag(encoded)
+        self.content = PrecompressedBody(encoded)
+
+
+def _load_template(name: str) -> Template:
+    return Template((TEMPLATE_DIR / name).read_text(encoding="utf-8"))
+
+
+STYLESHEETS: Dict[str, StaticAsset] = {
+    name: StaticAsset(STATIC_DIR / f"{name}.css", "text/css; charset=utf-8") for name in ("upload_form", "report")
+}
+# By fingerprinted file name, for the /static route
+ASSETS: Dict[str, StaticAsset] = {asset.name: asset for asset in STYLESHEETS.values()}
+
+UPLOAD_FORM = StaticPage(_load_template("upload_form.html").substitute(stylesheet=STYLESHEETS["upload_form"].url))
+REPORT_TEMPLATE = _load_template("report.html")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match semantics: weak comparison against a list of ETags, or *"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+def cached_response(request: Request, item, cache_control: str) -> Response:
+    """
+    Serve a StaticAsset or StaticPage: 304 when If-None-Match matches its
+    ETag, otherwise the precompressed variant the client accepts.
+    """
+    headers = {"ETag": item.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), item.etag):
+        return Response(status_code=304, headers=headers)
+    body, encoding = item.content.select(request.headers.get("accept-encoding", ""))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type=item.media_type, headers=headers)
+
+
+def _css_color(value: str, default: str) -> str:
+    return value if isinstance(value, str) and CSS_COLOR.fullmatch(value.strip()) else default
+
+
+def render_report_page(report_dict: dict, domain: str, figma_url: Optional[str], prompt_used: str) -> str:
+    """The /upload-and-report result page: only the report-specific fragments are rendered per request"""
+    screens_html = ''.join([
+        f'''<div class="screen-card">
+                    <div class="screen-icon">🎨</div>
+                    <h3>{html.escape(screen.get("name", "Screen"))}</h3>
+                    <p>{html.escape(screen.get("description", "No description")[:150])}...</p>
+                </div>'''
+        for screen in report_dict.get('screens', [])[:6]
+    ])
+    colors = report_dict.get('styles', {}).get('colors', {})
+    figma_button = (
+        f'<a href="{html.escape(figma_url)}" class="figma-btn" target="_blank">🚀 Open in Figma</a>' if figma_url else ''
+    )
+    return REPORT_TEMPLATE.substitute(
+        stylesheet=STYLESHEETS["report"].url,
+        title=html.escape(report_dict.get('project_name', 'Project')),
+        project_name=html.escape(report_dict.get('project_name', 'UI Report')),
+        summary=html.escape(report_dict.get('summary', 'No summary available')[:400]),
+        primary=_css_color(colors.get('primary', '#667eea'), '#667eea'),
+        secondary=_css_color(colors.get('secondary', '#764ba2'), '#764ba2'),
+        screen_count=len(report_dict.get('screens', [])),
+        domain=html.escape(domain.title()),
+        color_count=len(colors),
+        figma_button=figma_button,
+        screens=screens_html,
+        prompt=html.escape(prompt_used),
+    )
@@ -0,0 +1,158 @@
+# app/services/parse_cache.py
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.services import metrics
+from app.services.ocr import ocr_available
+from app.services.parser import PARSER_VERSION, document_kind, parse_document
+
+PARSE_CACHE_DIR = os.getenv("PARSE_CACHE_DIR", "./.parse_cache")
+PARSE_CACHE_MEMORY_ENTRIES = int(os.getenv("PARSE_CACHE_MEMORY_ENTRIES", "64"))
+PARSE_CACHE_MAX_MB = float(os.getenv("PARSE_CACHE_MAX_MB", "512"))
+
+
+class ParseCache:
+    """
+    Two-tier cache of parsed documents ({"kind", "text"}).
+
+    Keys combine the content SHA-256, the document kind and PARSER_VERSION,
+    so an extractor change never serves stale text. Hot entries live in an
+    in-process LRU; every entry is also written zlib-compressed under
+    `directory`, which all workers on the host (web and job workers) share.
+    Disk writes are atomic renames, so concurrent writers are safe.
+    """
+
+    def __init__(self, directory: str = PARSE_CACHE_DIR, memory_entries: int = PARSE_CACHE_MEMORY_ENTRIES,
+                 max_disk_mb: float = PARSE_CACHE_MAX_MB) -> None:
+        self.directory = directory
+        self.memory_entries = max(0, memory_entries)
+        self.max_disk_bytes = int(max_disk_mb * 1024 * 1024)
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # (path, mtime_ns, size) -> cache key, so cached local files are not even re-read
+        self._file_keys: Dict[Tuple[str, int, int], str] = {}
+        self._writes = 0
+
+    @staticmethod
+    def make_key(sha256: str, kind: str) -> str:
+        # OCR availability changes what a scanned PDF yields
+        ocr = "ocr" if kind == "pdf" and ocr_available() else "noocr"
+        return f"v{PARSER_VERSION}-{kind}-{ocr}-{sha256}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[-2:], f"{key}.json.z")
+
+    # --------------------------------------------
+    # Tiers
+    # --------------------------------------------
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            document = self._memory.get(key)
+            if document is not None:
+                self._memory.move_to_end(key)
+                return document
+
+        try:
+            with open(self._path(key), "rb") as f:
+                document = json.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, zlib.error) as e:
+            print(f"Parse cache: dropping unreadable entry {key}: {e}")
+            return None
+        self._remember(key, document)
+        return document
+
+    def put(self, key: str, document: Dict[str, Any]) -> None:
+        self._remember(key, document)
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            payload = zlib.compress(json.dumps(document, separators=(",", ":")).encode("utf-8"), 6)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Parse cache: could not write {key}: {e}")
+            return
+
+        self._writes += 1
+        if self._writes % 50 == 0:
+            self.prune()
+
+    def _remember(self, key: str, document: Dict[str, Any]) -> None:
+        if not self.memory_entries:
+            return
+        with self._lock:
+            self._memory[key] = document
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def prune(self) -> None:
+        """Delete the least recently written disk entries until the tier fits in max_disk_mb"""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    # --------------------------------------------
+    # Parsing through the cache
+    # --------------------------------------------
+    def parse(self, file_bytes, file_type: str, sha256: Optional[str] = None) -> Dict[str, Any]:
+        """parse_document() with caching; pass the upload's sha256 when it is already known"""
+        kind = document_kind(file_bytes, file_type) if file_bytes else "text"
+        key = self.make_key(sha256 or hashlib.sha256(file_bytes).hexdigest(), kind)
+        document = self.get(key)
+        metrics.record_cache("parse", document is not None)
+        if document is None:
+            started = time.perf_counter()
+            document = parse_document(file_bytes, file_type)
+            print(f"Parse cache miss: parsed {kind} in {time.perf_counter() - started:.2f}s")
+            # parse_document() returns empty text instead of raising, so failures are not cached
+            if document["text"].strip():
+                self.put(key, document)
+        return document
+
+    def parse_file(self, path: str, file_type: str) -> Dict[str, Any]:
+        """Parse a local file; unchanged files (same mtime and size) are served without reading them"""
+        stat = os.stat(path)
+        file_id = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        key = self._file_keys.get(file_id)
+        if key is not None:
+            document = self.get(key)
+            if document is not None:
+                metrics.record_cache("parse", True)
+                return document
+
+        with open(path, "rb") as f:
+            file_bytes = f.read()
+        sha256 = hashlib.sha256(file_bytes).hexdigest()
+        self._file_keys[file_id] = self.make_key(sha256, document_kind(file_bytes, file_type))
+        return self.parse(file_bytes, file_type, sha256)
+
+
+parse_cache = ParseCache()
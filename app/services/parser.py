@@ -1,6 +1,11 @@
 # app/services/parser.py
 
+import mmap
+import os
+import zipfile
 from io import BytesIO
+from typing import Any, Dict, Iterator, List, Union
+from xml.etree import ElementTree
 
 try:
     from PyPDF2 import PdfReader
@@ -8,46 +13,421 @@ except ImportError:
     PdfReader = None
 
 try:
-    from docx import Document
+    from pptx import Presentation
+    from pptx.enum.shapes import MSO_SHAPE_TYPE
+    from pptx.opc.constants import RELATIONSHIP_TYPE as RT
 except ImportError:
-    Document = None
+    Presentation = None
 
+from app.services.ocr import needs_ocr, ocr_pdf_pages
 
-def extract_text_from_bytes(file_bytes: bytes, file_type: str) -> str:
+# Early cutoff shared by every format: stop reading pages/slides once this much text is extracted
+MAX_EXTRACT_CHARS = int(os.getenv("PARSE_MAX_CHARS", "1000000"))
+# Bump whenever extraction output changes; it is part of the parse cache key
+PARSER_VERSION = "5"
+
+DRAWINGML_NS = {"a": "http://schemas.openxmlformats.org/drawingml/2006/main"}
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+# Word stores text boxes twice: DrawingML in mc:Choice and a VML copy in mc:Fallback
+MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+PPTX_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def _as_stream(file_bytes):
+    """Seekable stream over bytes, a memoryview, or a read-only mmap (used as-is, no copy)"""
+    if hasattr(file_bytes, "seek") and hasattr(file_bytes, "read"):
+        file_bytes.seek(0)
+        return file_bytes
+    return BytesIO(file_bytes)
+
+
+def _sniff_office_type(file_bytes) -> str:
+    """Tell PPTX from DOCX for uploads sent as application/octet-stream"""
+    if bytes(file_bytes[:4]) != b"PK\x03\x04":
+        return ""
+    try:
+        with zipfile.ZipFile(_as_stream(file_bytes)) as archive:
+            names = set(archive.namelist())
+    except Exception:
+        return ""
+    if "ppt/presentation.xml" in names:
+        return PPTX_TYPE
+    if "word/document.xml" in names:
+        return DOCX_TYPE
+    return ""
+
+
+# --------------------------------------------
+# PPTX (PowerPoint)
+# --------------------------------------------
+def _iter_shape_text(shapes) -> Iterator[tuple]:
+    """(indent level, text) for every paragraph and table row, descending into groups"""
+    for shape in shapes:
+        if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+            yield from _iter_shape_text(shape.shapes)
+        elif getattr(shape, "has_table", False):
+            for row in shape.table.rows:
+                cells = [cell.text.strip() for cell in row.cells if cell.text.strip()]
+                if cells:
+                    yield 0, " | ".join(cells)
+        elif shape.has_text_frame:
+            for paragraph in shape.text_frame.paragraphs:
+                text = paragraph.text.strip()
+                if text:
+                    yield paragraph.level, text
+
+
+def iter_pptx_slides(prs) -> Iterator[Dict[str, Any]]:
+    """Yield one slide at a time: number, title, bullets [(level, text)] and speaker notes"""
+    for number, slide in enumerate(prs.slides, start=1):
+        title_shape = slide.shapes.title
+        title = title_shape.text_frame.text.strip() if title_shape is not None and title_shape.has_text_frame else ""
+        body = [shape for shape in slide.shapes if title_shape is None or shape.shape_id != title_shape.shape_id]
+        notes = ""
+        if slide.has_notes_slide and slide.notes_slide.notes_text_frame is not None:
+            notes = slide.notes_slide.notes_text_frame.text.strip()
+        yield {
+            "number": number,
+            "title": " ".join(title.split()),
+            "bullets": list(_iter_shape_text(body)),
+            "notes": notes,
+        }
+
+
+def pptx_theme_colors(prs) -> List[str]:
+    """Hex colors of the deck theme, in accent1..accent6 order"""
+    try:
+        theme = prs.slide_master.part.part_related_by(RT.THEME)
+        root = ElementTree.fromstring(theme.blob)
+    except Exception:
+        return []
+    scheme = root.find(".//a:clrScheme", DRAWINGML_NS)
+    if scheme is None:
+        return []
+    colors = []
+    for index in range(1, 7):
+        slot = scheme.find(f"a:accent{index}", DRAWINGML_NS)
+        if slot is None:
+            continue
+        srgb = slot.find("a:srgbClr", DRAWINGML_NS)
+        system = slot.find("a:sysClr", DRAWINGML_NS)
+        value = srgb.get("val") if srgb is not None else (system.get("lastClr") if system is not None else None)
+        if value and len(value) == 6:
+            colors.append(f"#{value.upper()}")
+    return colors
+
+
+def _document(kind: str, lines: List[str]) -> Dict[str, Any]:
+    return {"kind": kind, "text": "\n".join(lines)}
+
+
+def parse_pptx(stream, max_chars: int = MAX_EXTRACT_CHARS) -> Dict[str, Any]:
     """
-    Extract text from uploaded file bytes based on the file type.
-    Supports: PDF, DOCX, and plain text.
-    Always returns a clean string (never None) and never crashes.
+    Flatten a deck into the line conventions the analyzers already read:
+    slide titles as "Title:" headings (screen candidates), body text as
+    "•" bullets, speaker notes as plain lines, and theme accents as
+    "primary/secondary/accent: #hex". python-pptx loads the whole package
+    up front; text is extracted slide by slide and extraction stops once
+    max_chars of text has been collected.
     """
-    if not file_bytes:
-        return ""
+    prs = Presentation(stream)
+    lines: List[str] = []
+    total = 0
+    colors = pptx_theme_colors(prs)
+
+    for slide in iter_pptx_slides(prs):
+        slide_lines = []
+        if slide["title"]:
+            # The first slide title is the deck/project name, later ones are screens
+            first = slide["number"] == 1
+            slide_lines.append(slide["title"] if first else f"{slide['title']}:")
+        for level, text in slide["bullets"]:
+            slide_lines.append(f"{'  ' * level}• {text}")
+        if slide["notes"]:
+            slide_lines.extend(line.strip() for line in slide["notes"].splitlines() if line.strip())
+
+        if slide["number"] == 1 and colors:
+            labels = ("primary", "secondary", "accent")
+            slide_lines.append("Theme colors - " + ", ".join(f"{label}: {color}" for label, color in zip(labels, colors)))
+
+        lines.extend(slide_lines)
+        total += sum(len(line) + 1 for line in slide_lines)
+        if total >= max_chars:
+            break
+    return _document("pptx", lines)
+
+
+# --------------------------------------------
+# DOCX (Word), streamed with iterparse
+# --------------------------------------------
+def _docx_styles(archive: zipfile.ZipFile) -> Dict[str, Dict[str, Any]]:
+    """styleId -> {"name", "outline"} from word/styles.xml (small, parsed whole)"""
+    try:
+        root = ElementTree.fromstring(archive.read("word/styles.xml"))
+    except (KeyError, ElementTree.ParseError):
+        return {}
+    styles = {}
+    for style in root.iter(f"{W}style"):
+        name = style.find(f"{W}name")
+        outline = style.find(f"{W}pPr/{W}outlineLvl")
+        styles[style.get(f"{W}styleId")] = {
+            "name": (name.get(f"{W}val") if name is not None else "").lower(),
+            "outline": int(outline.get(f"{W}val")) if outline is not None else None,
+        }
+    return styles
+
+
+def _descendants(elem, stop: tuple) -> Iterator[Any]:
+    """Every element below `elem`, not descending into elements whose tag is in `stop`"""
+    for child in elem:
+        yield child
+        if child.tag not in stop:
+            yield from _descendants(child, stop)
+
+
+def _paragraph_text(paragraph) -> str:
+    """Text of the paragraph's own runs; text boxes anchored in it are read separately"""
+    parts = []
+    runs = (node for node in _descendants(paragraph, (f"{W}txbxContent", MC_FALLBACK)) if node.tag == f"{W}r")
+    # Only run children count: pPr also holds <w:tab> tab-stop definitions
+    for run in runs:
+        for node in run:
+            if node.tag == f"{W}t" and node.text:
+                parts.append(node.text)
+            elif node.tag == f"{W}tab":
+                parts.append("\t")
+            elif node.tag in (f"{W}br", f"{W}cr"):
+                parts.append("\n")
+    return "".join(parts).strip()
+
 
+def _text_box_paragraphs(paragraph) -> Iterator[tuple]:
+    """(paragraph, text) for the non-empty paragraphs of text boxes anchored in `paragraph`"""
+    for node in _descendants(paragraph, (MC_FALLBACK,)):
+        if node.tag == f"{W}p":
+            text = _paragraph_text(node)
+            if text:
+                yield node, text
+
+
+def _paragraph_block(paragraph, text: str, styles: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Classify a body paragraph as title, heading (level 1-9), list item (indent level) or paragraph"""
+    props = paragraph.find(f"{W}pPr")
+    style_id = ""
+    outline = None
+    list_level = None
+    if props is not None:
+        style = props.find(f"{W}pStyle")
+        style_id = style.get(f"{W}val", "") if style is not None else ""
+        level = props.find(f"{W}outlineLvl")
+        outline = int(level.get(f"{W}val")) if level is not None else None
+        numbering = props.find(f"{W}numPr")
+        if numbering is not None:
+            indent = numbering.find(f"{W}ilvl")
+            list_level = int(indent.get(f"{W}val", 0)) if indent is not None else 0
+
+    info = styles.get(style_id, {})
+    name = info.get("name") or style_id.lower()
+    if outline is None:
+        outline = info.get("outline")
+
+    if name == "title":
+        return {"kind": "title", "level": 0, "style": name, "text": text}
+    if name.startswith("heading") and name[7:].strip().isdigit():
+        return {"kind": "heading", "level": int(name[7:].strip()), "style": name, "text": text}
+    if outline is not None and outline < 9:
+        return {"kind": "heading", "level": outline + 1, "style": name, "text": text}
+    if list_level is not None or name.startswith("list"):
+        kind = "numbered" if "number" in name else "bullet"
+        if list_level is None:
+            # "List Bullet 2" style names carry the indent level
+            suffix = name.rsplit(" ", 1)[-1]
+            list_level = int(suffix) - 1 if suffix.isdigit() else 0
+        return {"kind": kind, "level": list_level, "style": name, "text": text}
+    return {"kind": "paragraph", "level": 0, "style": name, "text": text}
+
+
+def iter_docx_blocks(stream) -> Iterator[Dict[str, Any]]:
+    """
+    Stream word/document.xml straight out of the zip and yield one block
+    at a time: {"kind", "level", "style", "text"} for paragraphs, and
+    kind "table_row" with "cells" for each table row. Text-box paragraphs
+    follow the paragraph they are anchored in. Finished top-level body
+    children and table rows are cleared as we go, so memory stays flat on
+    very large documents; paragraphs nested in text boxes are left to
+    their anchor.
+    """
+    with zipfile.ZipFile(stream) as archive:
+        styles = _docx_styles(archive)
+        with archive.open("word/document.xml") as xml:
+            body = None
+            table_depth = 0
+            # Open <w:p> elements: above 1 we are inside a text box, which its anchor paragraph reads
+            paragraph_depth = 0
+            rows: List[List[str]] = []
+            cells: List[List[str]] = []
+            for event, elem in ElementTree.iterparse(xml, events=("start", "end")):
+                tag = elem.tag
+                if event == "start":
+                    if tag == f"{W}p":
+                        paragraph_depth += 1
+                    elif paragraph_depth:
+                        continue
+                    elif tag == f"{W}body":
+                        body = elem
+                    elif tag == f"{W}tbl":
+                        table_depth += 1
+                    elif tag == f"{W}tr":
+                        rows.append([])
+                    elif tag == f"{W}tc":
+                        cells.append([])
+                    continue
+
+                if tag == f"{W}p":
+                    paragraph_depth -= 1
+                    if paragraph_depth:
+                        continue
+                    text = _paragraph_text(elem)
+                    boxes = list(_text_box_paragraphs(elem))
+                    if table_depth:
+                        if cells:
+                            cells[-1].extend(t for t in [text] + [box_text for _, box_text in boxes] if t)
+                    else:
+                        if text:
+                            yield _paragraph_block(elem, text, styles)
+                        for box, box_text in boxes:
+                            yield _paragraph_block(box, box_text, styles)
+                elif paragraph_depth:
+                    continue
+                elif tag == f"{W}tc" and cells:
+                    cell_text = " ".join(cells.pop())
+                    if rows:
+                        rows[-1].append(cell_text)
+                elif tag == f"{W}tr" and rows:
+                    row = [cell for cell in rows.pop() if cell]
+                    if table_depth > 1 and cells:
+                        # Nested table: fold the row into the enclosing cell
+                        cells[-1].append(" | ".join(row))
+                    elif row:
+                        yield {"kind": "table_row", "level": 0, "style": "table", "text": " | ".join(row), "cells": row}
+                    if table_depth == 1:
+                        elem.clear()
+                elif tag == f"{W}tbl":
+                    table_depth -= 1
+
+                if body is not None and table_depth == 0 and tag in (f"{W}p", f"{W}tbl"):
+                    body.clear()
+
+
+def parse_docx(stream, max_chars: int = MAX_EXTRACT_CHARS) -> Dict[str, Any]:
+    """
+    Flatten DOCX blocks for the analyzers: headings as "Heading:" lines
+    (numbered headings keep their "1." form), list items as "•" bullets or
+    "N." steps, table rows as "•" bullets with " | " between cells.
+    """
+    lines: List[str] = []
+    total = 0
+    number = 0
+    for block in iter_docx_blocks(stream):
+        kind, text = block["kind"], block["text"]
+        if kind != "numbered":
+            number = 0
+        if kind == "heading":
+            line = text if text.endswith(":") or text[:1].isdigit() else f"{text}:"
+        elif kind == "bullet":
+            line = f"{'  ' * block['level']}• {text}"
+        elif kind == "numbered":
+            number += 1
+            line = f"{'  ' * block['level']}{number}. {text}"
+        elif kind == "table_row":
+            line = f"• {text}"
+        else:
+            line = text
+        lines.append(line)
+        total += len(line) + 1
+        if total >= max_chars:
+            break
+    return _document("docx", lines)
+
+
+def parse_pdf(file_bytes, max_chars: int = MAX_EXTRACT_CHARS) -> Dict[str, Any]:
+    """Page by page text (OCR for scanned pages), stopping once max_chars is reached"""
+    reader = PdfReader(_as_stream(file_bytes))
+    pages_text = []
+    total = 0
+    for page in reader.pages:
+        try:
+            pages_text.append(page.extract_text() or "")
+        except Exception:
+            pages_text.append("")
+        total += len(pages_text[-1]) + 1
+        if total >= max_chars:
+            break
+    if needs_ocr(pages_text):
+        # Image-only (scanned) PDF: recover the text with OCR
+        pages_text = ocr_pdf_pages(reader, pages_text)
+    return _document("pdf", pages_text)
+
+
+def document_kind(file_bytes, file_type: str) -> str:
+    """pdf | pptx | docx | text, from the content type (or zip contents when it is generic)"""
     file_type = (file_type or "").lower()
+    if not any(kind in file_type for kind in ("pdf", "word", "docx", "presentation", "pptx")):
+        file_type = _sniff_office_type(file_bytes) or file_type
+    if "pdf" in file_type:
+        return "pdf"
+    if "presentation" in file_type or "pptx" in file_type:
+        return "pptx"
+    if "word" in file_type or "docx" in file_type:
+        return "docx"
+    return "text"
+
+
+def parse_document(file_bytes: Union[bytes, memoryview, mmap.mmap], file_type: str) -> Dict[str, Any]:
+    """
+    Parse an upload into {"kind", "text"}.
+    Supports: PDF, DOCX, PPTX, and plain text. Never raises; a document
+    that cannot be read comes back with empty text.
+    """
+    if not file_bytes:
+        return _document("text", [])
+
+    kind = document_kind(file_bytes, file_type)
 
     # ----- PDF -----
-    if "pdf" in file_type and PdfReader is not None:
+    if kind == "pdf" and PdfReader is not None:
+        try:
+            return parse_pdf(file_bytes)
+        except Exception:
+            return _document(kind, [])
+
+    # ----- PPTX (PowerPoint) -----
+    if kind == "pptx" and Presentation is not None:
         try:
-            reader = PdfReader(BytesIO(file_bytes))
-            pages_text = []
-            for page in reader.pages:
-                try:
-                    pages_text.append(page.extract_text() or "")
-                except Exception:
-                    pages_text.append("")
-            return "\n".join(pages_text)
+            return parse_pptx(_as_stream(file_bytes))
         except Exception:
-            return ""
+            return _document(kind, [])
 
     # ----- DOCX (Word) -----
-    if ("word" in file_type or "docx" in file_type) and Document is not None:
+    if kind == "docx":
         try:
-            doc = Document(BytesIO(file_bytes))
-            return "\n".join(p.text for p in doc.paragraphs)
+            return parse_docx(_as_stream(file_bytes))
         except Exception:
-            return ""
+            return _document(kind, [])
 
     # ----- Fallback: Treat as plain text -----
     try:
-        return file_bytes.decode("utf-8", errors="ignore")
+        return _document("text", [bytes(file_bytes[:]).decode("utf-8", errors="ignore")])
     except Exception:
-        return ""
+        return _document("text", [])
+
+
+def extract_text_from_bytes(file_bytes: Union[bytes, memoryview, mmap.mmap], file_type: str) -> str:
+    """
+    Extract text from uploaded file bytes based on the file type.
+    Supports: PDF, DOCX, PPTX, and plain text.
+    Accepts bytes or a memory-mapped view of a spooled upload.
+    Always returns a clean string (never None) and never crashes.
+    """
+    return parse_document(file_bytes, file_type)["text"]
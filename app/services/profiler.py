@@ -0,0 +1,98 @@
+# app/services/profiler.py
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from app.services import metrics
+
+MAX_PROFILE_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a profile is already being collected on this worker"""
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler built on sys._current_frames().
+    Output is Brendan Gregg's collapsed-stack format
+    ("frame;frame;frame count" per line), ready for flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, interval: float = 0.005, tag_stages: bool = True, max_depth: int = 128) -> None:
+        self.interval = max(0.001, interval)
+        self.tag_stages = tag_stages
+        self.max_depth = max_depth
+        self.samples: Counter = Counter()
+        self.sample_rounds = 0
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _sample_once(self, own_thread: int, thread_names: Dict[int, str]) -> None:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(self._frame_label(frame))
+                frame = frame.f_back
+            stack.reverse()
+
+            root = [thread_names.get(thread_id, f"thread-{thread_id}")]
+            if self.tag_stages:
+                stage_name = metrics.current_stage(thread_id)
+                root.append(f"[stage:{stage_name}]" if stage_name else "[stage:none]")
+            self.samples[";".join(root + stack)] += 1
+        self.sample_rounds += 1
+
+    def run(self, seconds: float) -> "SamplingProfiler":
+        """Sample every other thread of this process for `seconds`"""
+        own_thread = threading.get_ident()
+        deadline = time.perf_counter() + seconds
+        names_refreshed = 0.0
+        thread_names: Dict[int, str] = {}
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            if now - names_refreshed > 1.0:
+                thread_names = {t.ident: t.name for t in threading.enumerate() if t.ident is not None}
+                names_refreshed = now
+            self._sample_once(own_thread, thread_names)
+            time.sleep(self.interval)
+        return self
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in sorted(self.samples.items())) + "\n"
+
+
+_profile_lock = threading.Lock()
+
+
+def profile_worker(seconds: float, interval_ms: float = 5.0, tag_stages: bool = True) -> str:
+    """Profile this worker for `seconds` and return collapsed stacks (one profile at a time)"""
+    seconds = max(0.1, min(seconds, MAX_PROFILE_SECONDS))
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already running on this worker")
+    try:
+        profiler = SamplingProfiler(interval=interval_ms / 1000, tag_stages=tag_stages).run(seconds)
+        print(f"Profiler collected {profiler.sample_rounds} sample rounds over {seconds:.1f}s")
+        return profiler.collapsed()
+    finally:
+        _profile_lock.release()
+
+
+def check_admin_token(supplied: Optional[str]) -> bool:
+    """Constant-time comparison against ADMIN_TOKEN; admin endpoints are disabled when it is unset"""
+    import hmac
+    expected = os.getenv("ADMIN_TOKEN")
+    if not expected or not supplied:
+        return False
+    return hmac.compare_digest(expected.encode(), supplied.encode())
@@ -0,0 +1,105 @@
+# app/services/report_feed.py
+
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.fast_json import encode_fields
+
+# Longest a /latest-report?wait= request is held open, in seconds
+LATEST_REPORT_MAX_WAIT = float(os.getenv("LATEST_REPORT_MAX_WAIT", "30"))
+
+
+class PublishedReport:
+    """
+    One version of the latest report, with its pre-encoded /latest-report body and ETag.
+    refinement_error is set on a mode=draft report whose LLM refinement failed.
+    """
+
+    __slots__ = ("version", "data", "report_json", "prompt_used", "at", "draft", "refinement_error", "body", "etag")
+
+    def __init__(self, version: int, data: Dict[str, Any], report_json: bytes, prompt_used: Optional[str],
+                 at: float, draft: bool, refinement_error: Optional[str] = None) -> None:
+        self.version = version
+        self.data = data
+        self.report_json = report_json
+        self.prompt_used = prompt_used
+        self.at = at
+        self.draft = draft
+        self.refinement_error = refinement_error
+        fields = {"status": "success", "version": version, "report": None, "draft": draft}
+        if refinement_error:
+            fields["refinement_error"] = refinement_error
+        self.body = encode_fields(fields, {"report": report_json})
+        # Content hash rather than the bare version, so ETags stay valid across restarts
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:16] + '"'
+
+
+class ReportFeed:
+    """
+    The latest report, versioned. publish() may be called from any thread;
+    wait() lets event-loop handlers sleep until a version newer than the one
+    they have exists, without polling.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.current: Optional[PublishedReport] = None
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    @property
+    def version(self) -> int:
+        current = self.current
+        return current.version if current else 0
+
+    def publish(self, data: Dict[str, Any], report_json: bytes, prompt_used: Optional[str], draft: bool = False,
+                at: Optional[float] = None) -> PublishedReport:
+        with self._lock:
+            published = PublishedReport(self.version + 1, data, report_json, prompt_used,
+                                        time.time() if at is None else at, draft)
+            self._set_current(published)
+        return published
+
+    def fail_refinement(self, version: int, error: str) -> bool:
+        """Republish draft `version` with refinement_error set, unless a newer report replaced it"""
+        with self._lock:
+            current = self.current
+            if current is None or current.version != version:
+                return False
+            self._set_current(PublishedReport(version + 1, current.data, current.report_json, current.prompt_used,
+                                              current.at, current.draft, error))
+        return True
+
+    def _set_current(self, published: PublishedReport) -> None:
+        """Swap in a new version and wake every waiter (called with the lock held)"""
+        self.current = published
+        waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+    async def wait(self, version: int, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for a version other than `version`; True if one exists"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = (loop, future)
+        with self._lock:
+            if self.version != version:
+                return True
+            self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
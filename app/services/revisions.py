@@ -0,0 +1,191 @@
+# app/services/revisions.py
+
+import difflib
+import json
+import os
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Union
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS document_versions (
+    project_key TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    sha256 TEXT,
+    domain TEXT,
+    paragraphs TEXT NOT NULL,          -- JSON list of normalized paragraphs
+    features TEXT NOT NULL,            -- JSON list: business_requirements that named the screens
+    report TEXT NOT NULL,              -- JSON UIReport
+    prompt TEXT,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (project_key, version)
+);
+"""
+
+# Above this share of changed paragraphs a revision is regenerated from scratch
+FULL_REGENERATION_RATIO = float(os.getenv("REVISION_FULL_RATIO", "0.5"))
+KEEP_VERSIONS = int(os.getenv("REVISION_KEEP_VERSIONS", "5"))
+# build_ui_report names (at most) this many screens after business requirements
+NAMED_SCREENS = 5
+
+_VERSION_SUFFIX = re.compile(r"[\s_\-]*(v\d+(\.\d+)*|rev(ision)?\s*\d+|draft|final|copy|\(\d+\)|\d{4}-\d{2}-\d{2}|\d+)$",
+                             re.IGNORECASE)
+_HEX_COLOR = re.compile(r"#[0-9A-Fa-f]{6}")
+
+
+def project_key(filename: str, project: Optional[str] = None) -> str:
+    """
+    Revision history key. An explicit client project id wins; otherwise the file name
+    with version suffixes stripped ('Food_PRD v3 (final).pdf' and 'food-prd-v4.pdf'
+    both map to 'food prd'). The prefix keeps the two kinds of key apart.
+    """
+    if project and project.strip():
+        return "id:" + " ".join(project.split()).lower()
+    stem = os.path.splitext(os.path.basename(filename or "document"))[0]
+    stem = re.sub(r"[\s_\-]+", " ", stem).strip()
+    previous = None
+    while stem and stem != previous:
+        previous = stem
+        stem = _VERSION_SUFFIX.sub("", stem).strip(" ()")
+    return stem.lower() or "document"
+
+
+def split_paragraphs(text: str) -> List[str]:
+    """
+    Paragraph units for diffing. Extracted PDF/DOCX/PPTX text is line
+    oriented (one bullet, heading or paragraph per line), so each non-empty
+    line with whitespace collapsed is one unit.
+    """
+    return [" ".join(line.split()) for line in text.split("\n") if line.strip()]
+
+
+def diff_paragraphs(old: Sequence[str], new: Sequence[str]) -> Dict[str, Any]:
+    """Indexes of inserted/replaced paragraphs in `new` and the number of removed ones"""
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    changed: Set[int] = set()
+    removed = 0
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag in ("replace", "insert"):
+            changed.update(range(j1, j2))
+        if tag in ("replace", "delete"):
+            removed += i2 - i1
+    return {"changed": changed, "removed": removed}
+
+
+def feature_sources(paragraphs: Sequence[str], features: Sequence[str]) -> List[Optional[int]]:
+    """Index of the paragraph each extracted feature came from (None if not found)"""
+    sources: List[Optional[int]] = []
+    for feature in features:
+        needle = " ".join(feature.split())
+        sources.append(next((i for i, paragraph in enumerate(paragraphs) if needle and needle in paragraph), None))
+    return sources
+
+
+def plan_revision(previous: Optional[Dict[str, Any]], paragraphs: List[str], features: List[str],
+                  domain: str) -> Dict[str, Any]:
+    """
+    Decide how much of the previous report can be reused.
+
+    Screen i (i < NAMED_SCREENS) is named after features[i], so it is
+    affected when that feature changed or its source paragraph was edited.
+    Screens past the end of the new feature list have no feature to be
+    regenerated from and are kept as they are.
+    Returns {"mode": "full" | "partial" | "reuse", "affected": [...],
+    "changed": n, "reason": str}.
+    """
+    if previous is None:
+        return {"mode": "full", "affected": [], "changed": len(paragraphs), "reason": "first version"}
+
+    old_paragraphs = previous["paragraphs"]
+    diff = diff_paragraphs(old_paragraphs, paragraphs)
+    changed = len(diff["changed"]) + diff["removed"]
+    plan = {"changed": changed, "affected": []}
+
+    if previous.get("domain") != domain:
+        return {**plan, "mode": "full", "reason": f"domain changed to {domain}"}
+    if changed > FULL_REGENERATION_RATIO * max(len(old_paragraphs), len(paragraphs), 1):
+        return {**plan, "mode": "full", "reason": f"more than {FULL_REGENERATION_RATIO:.0%} of paragraphs changed"}
+    old_colors = _HEX_COLOR.findall("\n".join(old_paragraphs))
+    new_colors = _HEX_COLOR.findall("\n".join(paragraphs))
+    if old_colors != new_colors:
+        return {**plan, "mode": "full", "reason": "brand colors changed"}
+
+    old_features = previous["features"]
+    screen_count = len(previous["report"].get("screens", []))
+    sources = feature_sources(paragraphs, features)
+    affected = []
+    for i in range(min(NAMED_SCREENS, screen_count, len(features))):
+        new_feature = features[i]
+        old_feature = old_features[i] if i < len(old_features) else None
+        edited = i < len(sources) and sources[i] is not None and sources[i] in diff["changed"]
+        if new_feature != old_feature or edited:
+            affected.append(i)
+
+    if affected:
+        return {**plan, "mode": "partial", "affected": affected, "reason": f"screens {affected} affected"}
+    return {**plan, "mode": "reuse", "reason": "no screen-level changes"}
+
+
+class RevisionStore:
+    """
+    Last processed versions of each project's document, in SQLite.
+    Same connection-per-call pattern as JobQueue, so web and worker
+    processes can share the file.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or os.getenv("REVISIONS_DB_PATH", "./revisions.db")
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                self._initialized = True
+            yield conn
+        finally:
+            conn.close()
+
+    def latest(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM document_versions WHERE project_key = ? ORDER BY version DESC LIMIT 1", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        data = {k: row[k] for k in row.keys()}
+        for field in ("paragraphs", "features", "report"):
+            data[field] = json.loads(data[field])
+        return data
+
+    def save(self, key: str, sha256: Optional[str], domain: str, paragraphs: List[str], features: List[str],
+             report: Union[Dict[str, Any], str], prompt: str) -> int:
+        """Store a new version; report may be a dict or its already-encoded JSON"""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT COALESCE(MAX(version), 0) AS v FROM document_versions WHERE project_key = ?", (key,)
+                ).fetchone()
+                version = row["v"] + 1
+                conn.execute(
+                    "INSERT INTO document_versions (project_key, version, sha256, domain, paragraphs, features, "
+                    "report, prompt, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, version, sha256, domain, json.dumps(paragraphs), json.dumps(features),
+                     report if isinstance(report, str) else json.dumps(report), prompt, time.time()),
+                )
+                conn.execute(
+                    "DELETE FROM document_versions WHERE project_key = ? AND version <= ?",
+                    (key, version - KEEP_VERSIONS),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return version
@@ -0,0 +1,148 @@
+# app/services/safe_regex.py
+
+import os
+import re
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.services import metrics
+
+# Largest slice of a document one regex call sees; bounds a superlinear pattern to O(n * window)
+SAFE_REGEX_WINDOW_CHARS = int(os.getenv("SAFE_REGEX_WINDOW_CHARS", "20000"))
+# Time budget per pattern per document; checked between windows, so one window can overrun it
+SAFE_REGEX_BUDGET_MS = float(os.getenv("SAFE_REGEX_BUDGET_MS", "50"))
+
+# Every pattern built with safe_pattern(), by name (benchmarks/regex_fuzz.py fuzzes all of them)
+PATTERNS: Dict[str, "SafePattern"] = {}
+
+
+def windows(text: str, size: int = SAFE_REGEX_WINDOW_CHARS) -> Iterator[Tuple[int, str]]:
+    """(offset, slice) pairs covering text, cut after a newline in the second half of each window when there is one"""
+    start = 0
+    while start < len(text):
+        end = start + size
+        if end < len(text):
+            newline = text.rfind("\n", start + size // 2, end)
+            if newline != -1:
+                end = newline + 1
+        yield start, text[start:end]
+        start = end
+
+
+def _findall_item(match: "re.Match") -> Any:
+    """What re.findall returns for one match: the whole match, the single group, or a tuple of groups"""
+    groups = match.groups("")
+    if not groups:
+        return match.group(0)
+    return groups[0] if len(groups) == 1 else groups
+
+
+class SafePattern:
+    """
+    A compiled pattern that scans documents window by window under a time
+    budget. Matches never span a window cut (cuts fall at line ends where
+    possible), and a scan that runs out of budget returns what it found so
+    far and counts the event in uiux_regex_budget_exceeded_total.
+    """
+
+    def __init__(self, name: str, pattern: str, flags: int = 0, window: Optional[int] = None,
+                 budget_ms: Optional[float] = None) -> None:
+        self.name = name
+        self.regex = re.compile(pattern, flags)
+        self.window = window or SAFE_REGEX_WINDOW_CHARS
+        self.budget_ms = SAFE_REGEX_BUDGET_MS if budget_ms is None else budget_ms
+
+    def finditer(self, text: str) -> Iterator["re.Match"]:
+        """Matches in document order; positions are relative to their window"""
+        started = time.perf_counter()
+        for _, chunk in windows(text, self.window):
+            yield from self.regex.finditer(chunk)
+            if (time.perf_counter() - started) * 1000 > self.budget_ms:
+                print(f"Regex '{self.name}' stopped after {self.budget_ms:.0f} ms")
+                metrics.record_regex_budget_exceeded(self.name)
+                return
+
+    def findall(self, text: str, limit: Optional[int] = None) -> List[Any]:
+        """re.findall, windowed and budgeted; stops after `limit` matches"""
+        found = []
+        for match in self.finditer(text):
+            found.append(_findall_item(match))
+            if limit is not None and len(found) >= limit:
+                break
+        return found
+
+    def first(self, text: str) -> Optional[Any]:
+        found = self.findall(text, limit=1)
+        return found[0] if found else None
+
+
+def safe_pattern(name: str, pattern: str, flags: int = 0, **options: Any) -> SafePattern:
+    compiled = SafePattern(name, pattern, flags, **options)
+    PATTERNS[name] = compiled
+    return compiled
+
+
+# --------------------------------------------
+# Linear-time replacements for backtracking patterns
+# --------------------------------------------
+_LETTER_RUN = re.compile(r"[A-Za-z\s]+")
+
+
+def letter_run_match(text: str, anchor: str, tail: Optional[str] = None) -> Optional[str]:
+    """
+    First match of ([A-Za-z\\s]*ANCHOR[A-Za-z\\s]*TAIL), or of
+    ([A-Za-z\\s]*ANCHOR[A-Za-z\\s]*) without a tail, case-insensitive.
+
+    The regex form retries the whole letter/space run from every start
+    position, which is quadratic in the run length. Here each maximal run
+    is scanned once: the match is the run up to the end of its last TAIL
+    (starting after the first ANCHOR), or the whole run when there is no TAIL.
+    """
+    anchor_regex = re.compile(anchor, re.IGNORECASE)
+    tail_regex = re.compile(tail, re.IGNORECASE) if tail else None
+    for run in _LETTER_RUN.finditer(text):
+        value = run.group(0)
+        hit = anchor_regex.search(value)
+        if hit is None:
+            continue
+        if tail_regex is None:
+            return value
+        last = None
+        for last in tail_regex.finditer(value, hit.end()):
+            pass
+        if last is not None:
+            return value[:last.end()]
+    return None
+
+
+def anchored_run_match(text: str, anchor: str, tails: Tuple[str, ...]) -> Optional[str]:
+    """
+    First match of ANCHOR\\s*:?\\s*([A-Za-z\\s]+TAIL1|[A-Za-z\\s]+TAIL2|...),
+    case-insensitive, returning the group.
+
+    After each anchor (and an optional colon) the group is the following
+    letter/space run cut after its last TAIL, trying the tails in order. A
+    later anchor inside a run that already failed cannot succeed either, so
+    every run is scanned once instead of once per anchor and backtrack.
+    """
+    anchor_regex = re.compile(anchor + r"(?:\s*:)?", re.IGNORECASE)
+    tail_regexes = [re.compile(tail, re.IGNORECASE) for tail in tails]
+    covered = -1
+    for hit in anchor_regex.finditer(text):
+        if hit.end() <= covered:
+            continue
+        run = _LETTER_RUN.match(text, hit.end())
+        if run is None:
+            continue
+        covered = run.end()
+        value = run.group(0)
+        # The group starts after the whitespace; the regex backtracks it by one space at most to fit a tail
+        skip = len(value) - len(value.lstrip())
+        for start in ([skip, skip - 1] if skip else [0]):
+            for tail_regex in tail_regexes:
+                last = None
+                for last in tail_regex.finditer(value, start + 1):
+                    pass
+                if last is not None:
+                    return value[start:last.end()]
+    return None
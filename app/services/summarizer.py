@@ -0,0 +1,177 @@
+# app/services/summarizer.py
+
+import os
+import re
+import zlib
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from app.services import metrics
+from app.services.tokens import count_tokens as default_count_tokens
+
+# The similarity matrix is O(n^2); longer documents pre-select this many candidate sentences
+SUMMARY_MAX_SENTENCES = int(os.getenv("SUMMARY_MAX_SENTENCES", "1200"))
+# Lines longer than this are split into sentences; shorter ones (headings, bullets) stay whole
+SENTENCE_SPLIT_CHARS = 200
+HASH_DIMENSIONS = 2048
+DAMPING = 0.85
+MAX_ITERATIONS = 50
+# Each UI term in a sentence multiplies its rank by (1 + UI_BOOST), up to MAX_UI_HITS terms
+UI_BOOST = 0.35
+MAX_UI_HITS = 4
+# Skip a sentence that is this similar (cosine) to one already picked
+REDUNDANCY_THRESHOLD = 0.7
+
+UI_TERMS = frozenset("""
+screen screens page pages view dashboard home login signup register onboarding profile settings account
+menu navigation nav tab tabs sidebar header footer button buttons form forms field fields input search
+filter sort list lists table card cards modal dialog notification notifications alert chart charts report
+reports upload download checkout cart payment payments order orders booking calendar schedule message
+messages chat feed map user users customer customers admin role roles persona workflow flow step steps
+feature features display displays show shows select selects click tap submit create edit delete
+manage track browse allow allows enable enables can should must ui ux design mobile web app application
+""".split())
+
+STOPWORDS = frozenset("""
+the a an and or but of to in on at for with by from as is are was were be been being this that these those
+it its into than then there their they them we our you your he she his her not no will would shall may
+might also such which who whom what when where how all any each other some more most very can could
+""".split()) - UI_TERMS
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(•])")
+_WORD = re.compile(r"[a-z][a-z0-9]+")
+# "Heading:" lines (the parsers emit DOCX/PPTX headings this way) and "=== SECTION ===" banners
+_HEADING = re.compile(r"^(===.*|[^•\-\*].{0,78}:)$")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Ranking units: non-empty lines, with long lines split at sentence ends. Exact repeats (page headers) are dropped."""
+    units: List[str] = []
+    seen = set()
+    for line in text.split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+        pieces = [line] if len(line) <= SENTENCE_SPLIT_CHARS else _SENTENCE_END.split(line)
+        for piece in pieces:
+            piece = piece.strip()
+            if piece and piece not in seen:
+                seen.add(piece)
+                units.append(piece)
+    return units
+
+
+def _content_words(sentence: str) -> List[str]:
+    return [word for word in _WORD.findall(sentence.lower()) if word not in STOPWORDS]
+
+
+def _textrank(words: List[List[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    TextRank over hashed TF-IDF vectors: cosine similarity graph, then
+    PageRank power iteration. Hashing (crc32, stable across processes)
+    keeps the matrix at n x HASH_DIMENSIONS whatever the vocabulary size.
+    Returns (rank, similarity).
+    """
+    n = len(words)
+    rows = [i for i, sentence in enumerate(words) for _ in sentence]
+    cols = [zlib.crc32(word.encode()) % HASH_DIMENSIONS for sentence in words for word in sentence]
+    tf = np.zeros((n, HASH_DIMENSIONS), dtype=np.float32)
+    np.add.at(tf, (np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)), 1.0)
+
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log((1.0 + n) / (1.0 + df)).astype(np.float32) + 1.0
+    vectors = np.log1p(tf) * idf
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.where(norms == 0, 1.0, norms)
+
+    similarity = vectors @ vectors.T
+    np.fill_diagonal(similarity, 0.0)
+    out_weight = similarity.sum(axis=1, keepdims=True)
+    # Sentences with no similar sentence spread their rank uniformly
+    transition = np.where(out_weight > 0, similarity / np.where(out_weight == 0, 1.0, out_weight), 1.0 / n)
+
+    rank = np.full(n, 1.0 / n, dtype=np.float32)
+    for _ in range(MAX_ITERATIONS):
+        updated = (1.0 - DAMPING) / n + DAMPING * (transition.T @ rank)
+        converged = np.abs(updated - rank).sum() < 1e-6
+        rank = updated
+        if converged:
+            break
+    return rank, similarity
+
+
+def _candidates(ui_hits: np.ndarray, lengths: np.ndarray, limit: int) -> np.ndarray:
+    """Pre-select `limit` sentences, spread evenly across the document, preferring UI-heavy and longer ones"""
+    n = len(ui_hits)
+    segments = np.array_split(np.arange(n), 8)
+    per_segment = limit // len(segments)
+    cheap = ui_hits + np.minimum(lengths, 40) / 40.0
+    picked = [segment[np.argsort(-cheap[segment], kind="stable")[:per_segment]] for segment in segments]
+    return np.sort(np.concatenate(picked))
+
+
+def _rank(sentences: List[str]) -> Tuple[List[float], Callable[[int, List[int]], bool]]:
+    """Scores per sentence, plus a redundancy check (sentence, already picked) -> too similar"""
+    words = [_content_words(sentence) for sentence in sentences]
+    ui = [min(sum(1 for word in sentence if word in UI_TERMS), MAX_UI_HITS) for sentence in words]
+    ui_hits = np.asarray(ui, dtype=np.float32)
+    scores = np.zeros(len(sentences), dtype=np.float32)
+    index = np.arange(len(sentences))
+    if len(sentences) > SUMMARY_MAX_SENTENCES:
+        index = _candidates(ui_hits, np.asarray([len(w) for w in words], dtype=np.float32), SUMMARY_MAX_SENTENCES)
+    rank, similarity = _textrank([words[i] for i in index])
+    scores[index] = rank * (1.0 + UI_BOOST * ui_hits[index])
+    row = {int(sentence): r for r, sentence in enumerate(index)}
+
+    def redundant(i: int, picked: List[int]) -> bool:
+        rows = [row[p] for p in picked if p in row]
+        return i in row and bool(rows) and float(similarity[row[i], rows].max()) > REDUNDANCY_THRESHOLD
+
+    return scores.tolist(), redundant
+
+
+def summarize(text: str, max_tokens: int, count_tokens: Callable[[str], int] = default_count_tokens) -> str:
+    """
+    Pick the highest-ranked sentences that fit in max_tokens, skipping
+    near-duplicates of sentences already picked, and return them (with
+    their section headings) in document order, one per line. Text that already fits is
+    returned unchanged, so short documents see no difference.
+    """
+    if not text or count_tokens(text) <= max_tokens:
+        return text
+    with metrics.stage("summarize"):
+        sentences = split_sentences(text)
+        if not sentences:
+            return ""
+        scores, redundant = _rank(sentences)
+
+        # A picked sentence brings its section heading along, so the excerpt keeps its structure
+        headings = [bool(_HEADING.match(sentence)) for sentence in sentences]
+        heading_of: List[Optional[int]] = []
+        current = None
+        for i, is_heading in enumerate(headings):
+            heading_of.append(current)
+            if is_heading:
+                current = i
+
+        chosen: List[int] = []
+        picked = set()
+        remaining = max_tokens
+        for i in sorted(range(len(sentences)), key=lambda i: -scores[i]):
+            if headings[i] or redundant(i, chosen):
+                continue
+            units = [i] if heading_of[i] is None or heading_of[i] in picked else [i, heading_of[i]]
+            # +1 per unit for the joining newline
+            cost = sum(count_tokens(sentences[j]) + 1 for j in units)
+            if cost <= remaining:
+                chosen.extend(units)
+                picked.update(units)
+                remaining -= cost
+                if remaining < 8:
+                    break
+        if not chosen:
+            # Every sentence is longer than the budget: keep the start of the best one (~4 chars per token)
+            best = max(range(len(sentences)), key=scores.__getitem__)
+            return sentences[best][:max_tokens * 4]
+        return "\n".join(sentences[i] for i in sorted(chosen))
@@ -0,0 +1,136 @@
+# app/services/text_index.py
+
+import bisect
+import itertools
+import os
+import re
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from functools import cached_property
+from typing import Dict, List, Optional, Tuple
+
+TOKEN_INDEX_CACHE_SIZE = int(os.getenv("TOKEN_INDEX_CACHE_SIZE", "4"))
+
+_TOKEN_SPLIT = re.compile(r"([A-Za-z0-9]+)")
+# Extracted documents are line oriented (headings and bullets carry no full stop), so a newline also ends a sentence
+_SENTENCE_END = re.compile(r"[.!?]+\s+|\n+")
+
+
+class TokenIndex:
+    """
+    One tokenization of a document, shared by every analyzer that reads it.
+
+    Tokens are ASCII letter/digit runs with their start offsets in `text`.
+    The lowercased view, lowercased tokens, frequencies, postings (token
+    positions by word) and sentence boundaries are computed on first use.
+    Build it through token_index(), which caches recent documents.
+    """
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        parts = _TOKEN_SPLIT.split(text)
+        # parts alternates separator, token, separator, ...; token i is parts[2 * i + 1]
+        self.tokens: List[str] = parts[1::2]
+        self._separators: List[str] = parts[0::2]
+        offsets = list(itertools.accumulate(map(len, parts)))
+        self.starts: List[int] = offsets[0:-1:2]
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    # --------------------------------------------
+    # Lazy views
+    # --------------------------------------------
+    @cached_property
+    def lower(self) -> str:
+        """Lowercased copy of the text, made once per document"""
+        return self.text.lower()
+
+    @cached_property
+    def lower_tokens(self) -> List[str]:
+        return [token if token.islower() else token.lower() for token in self.tokens]
+
+    @cached_property
+    def frequencies(self) -> Counter:
+        """Lowercased token -> count"""
+        return Counter(self.lower_tokens)
+
+    @cached_property
+    def _postings(self) -> Dict[str, List[int]]:
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for i, token in enumerate(self.lower_tokens):
+            postings[token].append(i)
+        return postings
+
+    @cached_property
+    def sentence_starts(self) -> List[int]:
+        """Start offset of every sentence (and of every line)"""
+        return [0] + [match.end() for match in _SENTENCE_END.finditer(self.text)]
+
+    # --------------------------------------------
+    # Queries
+    # --------------------------------------------
+    def occurrences(self, word: str) -> List[int]:
+        """Indexes of the tokens equal to word (case-insensitive)"""
+        return self._postings.get(word.lower(), [])
+
+    def token_range(self, start: int = 0, end: Optional[int] = None) -> range:
+        """Indexes of the tokens that start within text[start:end]"""
+        last = len(self.tokens) if end is None else bisect.bisect_left(self.starts, end)
+        return range(bisect.bisect_left(self.starts, start), last)
+
+    def spaced(self, i: int) -> bool:
+        """Token i and token i + 1 are separated by whitespace only"""
+        separator = self._separators[i + 1] if i + 1 < len(self._separators) else ""
+        return bool(separator) and separator.isspace()
+
+    def run_after(self, i: int, max_words: int) -> List[int]:
+        """Up to max_words alphabetic tokens directly after token i, each separated by whitespace only"""
+        run: List[int] = []
+        j = i
+        while len(run) < max_words and j + 1 < len(self.tokens) and self.spaced(j) and self.tokens[j + 1].isalpha():
+            j += 1
+            run.append(j)
+        return run
+
+    def words_after(self, words: Tuple[str, ...], max_words: int = 1) -> List[str]:
+        """Lowercased phrases of up to max_words words following any of `words`, in document order"""
+        anchors = sorted(itertools.chain.from_iterable(self.occurrences(word) for word in words))
+        phrases = []
+        for i in anchors:
+            run = self.run_after(i, max_words)
+            if run:
+                phrases.append(" ".join(self.lower_tokens[j] for j in run))
+        return phrases
+
+    def words_before(self, words: Tuple[str, ...]) -> List[str]:
+        """Lowercased alphabetic words directly followed (after whitespace) by any of `words`, in document order"""
+        anchors = sorted(itertools.chain.from_iterable(self.occurrences(word) for word in words))
+        return [self.lower_tokens[i - 1] for i in anchors
+                if i > 0 and self.spaced(i - 1) and self.tokens[i - 1].isalpha()]
+
+    def sentence_bounds(self, offset: int) -> Tuple[int, int]:
+        """(start, end) offsets of the sentence containing offset"""
+        starts = self.sentence_starts
+        k = bisect.bisect_right(starts, offset) - 1
+        end = starts[k + 1] if k + 1 < len(starts) else len(self.text)
+        return starts[k], end
+
+
+_cache: "OrderedDict[str, TokenIndex]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def token_index(text: str) -> TokenIndex:
+    """The TokenIndex for text, built once and shared while the document is in use"""
+    with _cache_lock:
+        index = _cache.get(text)
+        if index is not None:
+            _cache.move_to_end(text)
+            return index
+    index = TokenIndex(text)
+    with _cache_lock:
+        _cache[text] = index
+        while len(_cache) > TOKEN_INDEX_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return index
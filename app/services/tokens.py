@@ -0,0 +1,66 @@
+# app/services/tokens.py
+
+import math
+import os
+import re
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Prompt budget per call (system + user message); larger prompts are compacted, then rejected
+LLM_MAX_PROMPT_TOKENS = int(os.getenv("LLM_MAX_PROMPT_TOKENS", "6000"))
+# Ceiling and floor for adaptive max_tokens
+LLM_MAX_COMPLETION_TOKENS = int(os.getenv("LLM_MAX_COMPLETION_TOKENS", "3000"))
+LLM_MIN_COMPLETION_TOKENS = int(os.getenv("LLM_MIN_COMPLETION_TOKENS", "600"))
+
+# Shape of a UI spec response: project/summary/styles/navigation, plus per screen and per layout section
+COMPLETION_BASE_TOKENS = 400
+COMPLETION_TOKENS_PER_SCREEN = 80
+COMPLETION_TOKENS_PER_SECTION = 60
+COMPLETION_HEADROOM = 1.25
+
+# Words, 1-3 digit groups, single symbols, and runs of 2+ spaces (indentation is one token)
+_PIECE = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]| {2,}|\n")
+_encoding = None
+
+
+def _tiktoken_encoding():
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.get_encoding(os.getenv("TOKEN_ENCODING", "cl100k_base"))
+        except Exception as e:
+            print(f"tiktoken unavailable, using the estimate: {e}")
+            _encoding = False
+    return _encoding or None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Tokens in text. Uses tiktoken when installed (cl100k_base is close to
+    the Llama 3 tokenizer for English); otherwise a BPE-like estimate: a
+    word is one token per 6 letters, digits go in groups of three, and
+    every symbol is its own token.
+    """
+    if not text:
+        return 0
+    encoding = _tiktoken_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    tokens = 0
+    for piece in _PIECE.findall(text):
+        tokens += math.ceil(len(piece) / 6) if piece[0].isalpha() else 1
+    return tokens
+
+
+def completion_budget(screens: int, sections_per_screen: int, base: int = COMPLETION_BASE_TOKENS) -> int:
+    """max_tokens for a response with this many screens and layout sections, with headroom"""
+    expected = base + screens * (COMPLETION_TOKENS_PER_SCREEN + sections_per_screen * COMPLETION_TOKENS_PER_SECTION)
+    return max(LLM_MIN_COMPLETION_TOKENS, min(LLM_MAX_COMPLETION_TOKENS, int(expected * COMPLETION_HEADROOM)))
+
+
+def compact_prompt(prompt: str) -> str:
+    """Drop indentation, trailing spaces and blank lines; the model reads the prompt the same way"""
+    return "\n".join(line.strip() for line in prompt.split("\n") if line.strip())
@@ -0,0 +1,123 @@
+# app/services/uploads.py
+
+import hashlib
+import mmap
+import os
+from typing import Any, Optional, Union
+
+from fastapi import HTTPException, UploadFile
+
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "50")) * 1024 * 1024)
+CHUNK_SIZE = 1024 * 1024
+# Uploads below this size stay in memory (Starlette spools to disk above 1 MB)
+IN_MEMORY_LIMIT = 1024 * 1024
+
+UPLOAD_PATHS = ("/upload", "/upload-and-report", "/jobs")
+
+Buffer = Union[bytes, memoryview, mmap.mmap]
+
+
+def _too_large(limit: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Upload exceeds the {limit // (1024 * 1024)} MB limit")
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Rejects oversized uploads before the multipart body is parsed:
+    a declared Content-Length over the limit fails immediately, and chunked
+    bodies are counted as they stream in and aborted once over the limit.
+    """
+
+    def __init__(self, app: Any, max_bytes: int = MAX_UPLOAD_BYTES, paths=UPLOAD_PATHS) -> None:
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = tuple(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") != "POST" or scope.get("path") not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        declared = headers.get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > self.max_bytes:
+            await self._reject(send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised inside form parsing; FastAPI re-raises HTTPException as-is
+                    raise _too_large(self.max_bytes)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, send) -> None:
+        body = f'{{"detail":"{_too_large(self.max_bytes).detail}"}}'.encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                        (b"connection", b"close")],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+class SpooledUpload:
+    """
+    An upload already spooled to disk by the multipart parser, with its
+    SHA-256 and size. view() hands the parser a read-only memory map of the
+    spool file instead of a bytes copy, so memory per upload stays bounded.
+    """
+
+    def __init__(self, file: Any, size: int, sha256: str, filename: str, content_type: str) -> None:
+        self.file = file
+        self.size = size
+        self.sha256 = sha256
+        self.filename = filename or "document"
+        self.content_type = content_type or ""
+        self._map: Optional[mmap.mmap] = None
+
+    def view(self) -> Buffer:
+        if self.size == 0:
+            return b""
+        if self.size <= IN_MEMORY_LIMIT or not getattr(self.file, "_rolled", True):
+            self.file.seek(0)
+            return self.file.read()
+        if self._map is None:
+            self._map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def __enter__(self) -> "SpooledUpload":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+async def spool_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> SpooledUpload:
+    """Hash the spooled upload chunk by chunk and enforce the size limit without loading it whole"""
+    hasher = hashlib.sha256()
+    size = 0
+    await file.seek(0)
+    while True:
+        chunk = await file.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise _too_large(max_bytes)
+        hasher.update(chunk)
+    await file.seek(0)
+    return SpooledUpload(file.file, size, hasher.hexdigest(), file.filename, file.content_type)
@@ -0,0 +1,245 @@
+# benchmarks/corpus.py
+"""
+Synthetic PRD corpus for benchmarks.
+
+Briefs are generated deterministically from a seed so runs are comparable,
+and can be rendered as TXT, DOCX (python-docx), PPTX (python-pptx, one
+slide per section) or PDF (minimal built-in writer, no extra dependency). Roughly LINES_PER_PAGE lines make one page.
+docx_layout is the same brief with bullets in tables and user stories in
+text boxes, the layouts that nest paragraphs inside other elements.
+"""
+
+import html
+import random
+import textwrap
+from io import BytesIO
+from typing import List, Tuple
+
+try:
+    from docx import Document
+    from docx.oxml import parse_xml
+except ImportError:
+    Document = None
+
+try:
+    from pptx import Presentation
+except ImportError:
+    Presentation = None
+
+LINES_PER_PAGE = 45
+
+CONTENT_TYPES = {
+    "txt": "text/plain",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "docx_layout": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    "pdf": "application/pdf",
+}
+
+DOMAINS = {
+    "food": ("Food Delivery", ["restaurant", "menu", "order", "delivery", "meal", "kitchen"]),
+    "health": ("Patient Care", ["patient", "doctor", "appointment", "prescription", "clinic", "treatment"]),
+    "fintech": ("Smart Wallet", ["payment", "transaction", "wallet", "transfer", "account", "credit"]),
+    "education": ("Learning Hub", ["course", "student", "lesson", "assignment", "grade", "teacher"]),
+    "ecommerce": ("Shop Express", ["product", "cart", "checkout", "catalog", "store", "purchase"]),
+}
+
+PERSONAS = ["customer", "admin", "manager", "student", "doctor", "driver", "seller"]
+TECH = ["React", "Python", "PostgreSQL", "Docker", "AWS", "Node.js", "Kubernetes"]
+VERBS = ["browse", "search", "track", "manage", "schedule", "book", "pay", "review"]
+HEADINGS = ["Overview", "User Flows", "Feature Matrix", "Data Model", "Integrations", "Security Requirements"]
+
+
+def generate_brief(pages: int, seed: int = 0, domain: str = "food") -> List[Tuple[str, str]]:
+    """
+    Return the brief as (kind, text) lines where kind is one of
+    title, heading, bullet, numbered, paragraph.
+    """
+    rng = random.Random(f"{seed}-{domain}-{pages}")
+    app_name, nouns = DOMAINS.get(domain, DOMAINS["food"])
+    lines: List[Tuple[str, str]] = [
+        ("title", f"{app_name} App"),
+        ("paragraph", f"Product Name: {app_name} App"),
+        ("paragraph", f"Primary: #{rng.randint(0, 0xFFFFFF):06X} Secondary: #{rng.randint(0, 0xFFFFFF):06X}"),
+    ]
+
+    total = max(1, pages) * LINES_PER_PAGE
+    section = 0
+    while len(lines) < total:
+        section += 1
+        lines.append(("heading", f"{section}. {rng.choice(HEADINGS)}"))
+        for _ in range(rng.randint(6, 12)):
+            noun, other = rng.choice(nouns), rng.choice(nouns)
+            persona = rng.choice(PERSONAS)
+            kind = rng.choice(["bullet", "bullet", "numbered", "paragraph", "paragraph"])
+            if kind == "bullet":
+                text = f"{noun.title()} {rng.choice(VERBS)} with {other} filters and saved preferences"
+            elif kind == "numbered":
+                text = f"The {persona} can {rng.choice(VERBS)} the {noun} and confirm the {other}"
+            else:
+                text = (f"As a {persona}, I want to {rng.choice(VERBS)} every {noun} so that the {other} "
+                        f"stays accurate. The service is built with {rng.choice(TECH)} and will "
+                        f"notify the {persona} when the {noun} changes.")
+            lines.append((kind, text))
+    return lines[:total]
+
+
+def render_txt(lines: List[Tuple[str, str]]) -> bytes:
+    out = []
+    number = 0
+    for kind, text in lines:
+        if kind == "bullet":
+            out.append(f"• {text}")
+        elif kind == "numbered":
+            number += 1
+            out.append(f"{number}. {text}")
+        else:
+            out.append(text)
+    return "\n".join(out).encode("utf-8")
+
+
+def render_docx(lines: List[Tuple[str, str]]) -> bytes:
+    if Document is None:
+        raise RuntimeError("python-docx missing. Install: pip install python-docx")
+    doc = Document()
+    for kind, text in lines:
+        if kind == "title":
+            doc.add_heading(text, level=0)
+        elif kind == "heading":
+            doc.add_heading(text, level=1)
+        elif kind == "bullet":
+            doc.add_paragraph(text, style="List Bullet")
+        elif kind == "numbered":
+            doc.add_paragraph(text, style="List Number")
+        else:
+            doc.add_paragraph(text)
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+# A floating text box as Word writes it: DrawingML in mc:Choice and a VML copy in mc:Fallback
+TEXT_BOX_RUN = """<w:r xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+ xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006"
+ xmlns:wps="http://schemas.microsoft.com/office/word/2010/wordprocessingShape"
+ xmlns:v="urn:schemas-microsoft-com:vml"><mc:AlternateContent>
+<mc:Choice Requires="wps"><w:drawing><wps:wsp><wps:txbx><w:txbxContent>
+<w:p><w:r><w:t>{text}</w:t></w:r></w:p></w:txbxContent></wps:txbx></wps:wsp></w:drawing></mc:Choice>
+<mc:Fallback><w:pict><v:shape><v:textbox><w:txbxContent>
+<w:p><w:r><w:t>{text}</w:t></w:r></w:p></w:txbxContent></v:textbox></v:shape></w:pict></mc:Fallback>
+</mc:AlternateContent></w:r>"""
+
+
+def render_docx_layout(lines: List[Tuple[str, str]]) -> bytes:
+    """render_docx() with each section's bullets in a table and its paragraphs in anchored text boxes"""
+    if Document is None:
+        raise RuntimeError("python-docx missing. Install: pip install python-docx")
+    doc = Document()
+    table = None
+    number = 0
+    in_section = False
+    for kind, text in lines:
+        if kind != "bullet":
+            table = None
+        if kind == "title":
+            doc.add_heading(text, level=0)
+        elif kind == "heading":
+            doc.add_heading(text, level=1)
+            in_section = True
+        elif kind == "bullet":
+            if table is None:
+                table = doc.add_table(rows=0, cols=2)
+                number = 0
+            number += 1
+            cells = table.add_row().cells
+            cells[0].text = f"F{number}"
+            cells[1].text = text
+        elif kind == "numbered":
+            doc.add_paragraph(text, style="List Number")
+        elif not in_section:
+            # Product name and brand colors stay in the body, where the analyzers look for them
+            doc.add_paragraph(text)
+        else:
+            anchor = doc.add_paragraph("See note:")
+            anchor._p.append(parse_xml(TEXT_BOX_RUN.format(text=html.escape(text))))
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def render_pptx(lines: List[Tuple[str, str]]) -> bytes:
+    if Presentation is None:
+        raise RuntimeError("python-pptx missing. Install: pip install python-pptx")
+    prs = Presentation()
+    body = None
+    for kind, text in lines:
+        if kind in ("title", "heading"):
+            slide = prs.slides.add_slide(prs.slide_layouts[0 if kind == "title" else 1])
+            slide.shapes.title.text = text
+            body = slide.placeholders[1].text_frame
+            body.text = ""
+        elif body is not None:
+            paragraph = body.paragraphs[0] if not body.paragraphs[0].text else body.add_paragraph()
+            paragraph.text = text
+            paragraph.level = 1 if kind == "numbered" else 0
+    buffer = BytesIO()
+    prs.save(buffer)
+    return buffer.getvalue()
+
+
+def _pdf_escape(text: str) -> str:
+    text = text.encode("latin-1", errors="replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def render_pdf(lines: List[Tuple[str, str]]) -> bytes:
+    """Write a plain Helvetica text PDF that PyPDF2 can extract line by line"""
+    text_lines = []
+    for line in render_txt(lines).decode("utf-8").replace("•", "-").split("\n"):
+        text_lines.extend(textwrap.wrap(line, 110) or [""])
+    pages = [text_lines[i:i + LINES_PER_PAGE] for i in range(0, len(text_lines), LINES_PER_PAGE)] or [[]]
+
+    objects: List[bytes] = []
+    font_id = 3
+    page_ids = []
+    # 1: catalog, 2: pages, 3: font, then (page, content) pairs
+    for index, page_lines in enumerate(pages):
+        page_id = 4 + index * 2
+        content_id = page_id + 1
+        page_ids.append(page_id)
+        stream = "BT /F1 9 Tf 11 TL 40 800 Td\n" + "\n".join(
+            f"({_pdf_escape(line)}) Tj T*" for line in page_lines
+        ) + "\nET"
+        data = stream.encode("latin-1")
+        objects.append((f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                        f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {content_id} 0 R >>").encode())
+        objects.append(b"<< /Length " + str(len(data)).encode() + b" >>\nstream\n" + data + b"\nendstream")
+
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    header_objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+
+    out = BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(header_objects + objects, start=1):
+        offsets.append(out.tell())
+        out.write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+    xref_at = out.tell()
+    out.write(f"xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        out.write(f"{offset:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref_at}\n%%EOF\n".encode())
+    return out.getvalue()
+
+
+RENDERERS = {"txt": render_txt, "docx": render_docx, "docx_layout": render_docx_layout, "pptx": render_pptx,
+             "pdf": render_pdf}
+
+
+def build_document(fmt: str, pages: int, seed: int = 0, domain: str = "food") -> Tuple[bytes, str]:
+    """Return (file_bytes, content_type) for a synthetic brief"""
+    return RENDERERS[fmt](generate_brief(pages, seed, domain)), CONTENT_TYPES[fmt]
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Fuzz-style timing for the document-wide regexes.
+
+Every pattern registered with app.services.safe_regex.safe_pattern (plus the
+linear rewrites, letter_run_match and anchored_run_match) is run raw over adversarial inputs of
+growing size. The growth exponent between the two largest sizes flags
+superlinear patterns (1.0 is linear, 2.0 quadratic), and the slowest input
+per pattern is reported. Each pattern is also timed windowed over one large
+input. Fails when a pattern grows faster than --max-exponent.
+
+    python -m benchmarks.regex_fuzz --sizes 2000 4000 8000 --legacy
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("LLM_REPLAY_MODE", "replay")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app.main  # noqa: E402,F401  (registers the analyzers' patterns)
+from app.services.safe_regex import PATTERNS, SafePattern, anchored_run_match, letter_run_match  # noqa: E402
+from benchmarks.corpus import build_document  # noqa: E402
+
+# Below this the timer noise dominates and no exponent is computed
+MIN_MEASURABLE_MS = 1.0
+
+WORDS = "the user can browse menu items and place orders with delivery tracking for every restaurant".split()
+ANCHORS = ["Unit Test", "Test", "Product Name", "Project", "is", "are", "will", "can", "using", "built with",
+           ":", "-", "*", "•", '"', "Agent"]
+
+# The patterns the rewrites replaced, for comparison (--legacy)
+LEGACY = {
+    "legacy_unit_test_agent": r'([A-Za-z\s]*Unit\s+Test[A-Za-z\s]*Agent)',
+    "legacy_test_agent": r'([A-Za-z\s]*Test[A-Za-z\s]*Agent)',
+    "legacy_agent": r'([A-Za-z\s]*Agent[A-Za-z\s]*)',
+    "legacy_action_phrases": r'(?:is|are|will|can)\s+([a-zA-Z\s]{10,50})',
+    "legacy_prd_title_product_name": r'Product\s+Name\s*:?\s*([A-Za-z\s]+Agent|[A-Za-z\s]+Tool|[A-Za-z\s]+System)',
+    "legacy_prd_title_project": r'Project\s*:?\s*([A-Za-z\s]+Agent|[A-Za-z\s]+Tool|[A-Za-z\s]+System)',
+    "legacy_titled_names": r'(?:Project|System|Application|Platform|Tool|Agent)\s*:?\s*([A-Z][A-Za-z\s]{5,30})',
+}
+
+REWRITES = {
+    "rewrite_unit_test_agent": lambda text: letter_run_match(text, r'unit\s+test', 'agent'),
+    "rewrite_test_agent": lambda text: letter_run_match(text, 'test', 'agent'),
+    "rewrite_agent": lambda text: letter_run_match(text, 'agent'),
+    "rewrite_prd_title_product_name": lambda text: anchored_run_match(text, r'Product\s+Name', ('agent', 'tool', 'system')),
+    "rewrite_prd_title_project": lambda text: anchored_run_match(text, 'Project', ('agent', 'tool', 'system')),
+}
+
+
+# --------------------------------------------
+# Input generators: (rng, size) -> text of about `size` characters
+# --------------------------------------------
+def gen_letter_run(rng: random.Random, size: int) -> str:
+    """One unbroken run of words and spaces (a PDF whose punctuation was lost in extraction)"""
+    return " ".join(rng.choice(WORDS) for _ in range(size // 5))[:size]
+
+
+def gen_near_miss(rng: random.Random, size: int) -> str:
+    """Words mixed with pattern anchors whose required continuation never comes"""
+    parts, length = [], 0
+    while length < size:
+        parts.append(rng.choice(ANCHORS[:-1]) if rng.random() < 0.2 else rng.choice(WORDS))
+        length += len(parts[-1]) + 1
+    return " ".join(parts)[:size]
+
+
+def gen_whitespace(rng: random.Random, size: int) -> str:
+    """Anchors followed by long whitespace runs and short words"""
+    parts, length = [], 0
+    while length < size:
+        parts.append(rng.choice(ANCHORS) + " " * rng.randint(1, 200) + rng.choice(WORDS)[:rng.randint(1, 9)])
+        length += len(parts[-1])
+    return "".join(parts)[:size]
+
+
+def gen_mutated(rng: random.Random, size: int) -> str:
+    """Corpus text with punctuation and digits dropped, spans duplicated and anchors inserted"""
+    text, _ = build_document("txt", max(1, size // 3000 + 1), seed=rng.randint(0, 1000))
+    chars = [c for c in text.decode("utf-8") if c.isalpha() or c.isspace() or rng.random() < 0.02]
+    text = "".join(chars)
+    for _ in range(20):
+        at = rng.randrange(len(text))
+        text = text[:at] + rng.choice([rng.choice(ANCHORS), text[at:at + 300]]) + text[at:]
+    return text[:size]
+
+
+GENERATORS = {
+    "letter_run": gen_letter_run,
+    "near_miss": gen_near_miss,
+    "whitespace": gen_whitespace,
+    "mutated": gen_mutated,
+}
+
+
+def _best_ms(fn, text: str, repeat: int) -> float:
+    best = math.inf
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(text)
+        best = min(best, (time.perf_counter() - started) * 1000)
+    return best
+
+
+def fuzz(name: str, fn, sizes, inputs, repeat: int) -> dict:
+    result = {"name": name, "generators": {}, "worst": None}
+    for generator, texts in inputs.items():
+        timings = [_best_ms(fn, texts[size], repeat) for size in sizes]
+        exponent = None
+        if len(sizes) > 1 and timings[-1] >= MIN_MEASURABLE_MS:
+            exponent = math.log(timings[-1] / max(timings[-2], 1e-6)) / math.log(sizes[-1] / sizes[-2])
+        result["generators"][generator] = {
+            "ms": [round(t, 3) for t in timings],
+            "exponent": None if exponent is None else round(exponent, 2),
+        }
+        if result["worst"] is None or timings[-1] > result["generators"][result["worst"]]["ms"][-1]:
+            result["worst"] = generator
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Find slow inputs for the document-wide regexes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 10000, 20000])
+    parser.add_argument("--large", type=int, default=1_000_000, help="input size for the windowed timing")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-exponent", type=float, default=1.5)
+    parser.add_argument("--legacy", action="store_true", help="also time the replaced backtracking patterns")
+    parser.add_argument("--output", default="regex_fuzz_results.json")
+    args = parser.parse_args()
+
+    sizes = sorted(args.sizes)
+    rng = random.Random(args.seed)
+    inputs = {name: {size: gen(rng, size) for size in sizes} for name, gen in GENERATORS.items()}
+    large = {name: gen(rng, args.large) for name, gen in GENERATORS.items()}
+
+    entries = [(name, pattern.regex.findall, pattern) for name, pattern in sorted(PATTERNS.items())]
+    entries += [(name, fn, None) for name, fn in REWRITES.items()]
+    if args.legacy:
+        entries += [(name, re.compile(pattern, re.IGNORECASE).findall, None) for name, pattern in LEGACY.items()]
+
+    results, failures = [], []
+    for name, fn, pattern in entries:
+        result = fuzz(name, fn, sizes, inputs, args.repeat)
+        if pattern is not None:
+            unbudgeted = SafePattern(name, pattern.regex.pattern, pattern.regex.flags, budget_ms=math.inf)
+            result["windowed_large_ms"] = round(max(_best_ms(unbudgeted.findall, text, 1) for text in large.values()), 3)
+        results.append(result)
+
+        exponents = {g: r["exponent"] for g, r in result["generators"].items() if r["exponent"] is not None}
+        worst = result["generators"][result["worst"]]
+        line = f"{name:>28}: worst={result['worst']} {worst['ms'][-1]:.1f}ms"
+        if exponents:
+            line += f", exponent={max(exponents.values()):.2f}"
+        if "windowed_large_ms" in result:
+            line += f", windowed {args.large} chars={result['windowed_large_ms']:.1f}ms"
+        print(line)
+        if not name.startswith("legacy_") and exponents and max(exponents.values()) > args.max_exponent:
+            failures.append(name)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "meta": {
+                "python": platform.python_version(),
+                "sizes": sizes,
+                "large": args.large,
+                "seed": args.seed,
+                "timestamp": int(time.time()),
+            },
+            "results": results,
+            "superlinear": failures,
+        }, f, indent=2)
+
+    print(f"Results written to {args.output}")
+    for name in failures:
+        print(f"SUPERLINEAR {name}: grows faster than n^{args.max_exponent}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark for DynamicUIGenerator.
+
+Builds a reference report per synthetic content analysis sequentially,
+then regenerates thousands of reports from a thread pool (one shared
+generator, shuffled order) and checks that every report is byte-identical
+to its reference. Prints sequential and concurrent throughput; exits
+non-zero if any report differs.
+
+    python -m benchmarks.rng_concurrency --contents 200 --reports 5000 --workers 16
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.dynamic_ui_generator import DynamicUIGenerator  # noqa: E402
+from benchmarks.corpus import DOMAINS, HEADINGS, VERBS  # noqa: E402
+
+
+def content_analyses(count: int, seed: int):
+    rng = random.Random(seed)
+    domains = sorted(DOMAINS)
+    analyses = []
+    for i in range(count):
+        domain = domains[i % len(domains)]
+        analyses.append({
+            "project_name": f"{domain.title()} Project {i}",
+            "app_type": f"{domain} app",
+            "features": [f"{verb.title()} {rng.choice(HEADINGS)}" for verb in rng.sample(VERBS, 4)],
+            "sections": rng.sample(HEADINGS, 3),
+        })
+    return analyses
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check DynamicUIGenerator determinism and throughput under threads")
+    parser.add_argument("--contents", type=int, default=200)
+    parser.add_argument("--reports", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="rng_concurrency_results.json")
+    args = parser.parse_args()
+
+    generator = DynamicUIGenerator()
+    analyses = content_analyses(args.contents, args.seed)
+
+    started = time.perf_counter()
+    reference = [generator.create_enhanced_ui_report(a).model_dump_json() for a in analyses]
+    sequential_s = time.perf_counter() - started
+
+    order = [i % len(analyses) for i in range(args.reports)]
+    random.Random(args.seed).shuffle(order)
+
+    def generate(i: int):
+        return i, generator.create_enhanced_ui_report(analyses[i]).model_dump_json()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(generate, order))
+    concurrent_s = time.perf_counter() - started
+
+    mismatches = sum(1 for i, report in results if report != reference[i])
+    summary = {
+        "meta": {"python": platform.python_version(), "workers": args.workers, "seed": args.seed,
+                 "timestamp": int(time.time())},
+        "contents": len(analyses),
+        "reports": len(results),
+        "mismatches": mismatches,
+        "sequential_reports_per_s": round(len(analyses) / sequential_s, 1),
+        "concurrent_reports_per_s": round(len(results) / concurrent_s, 1),
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"sequential: {summary['sequential_reports_per_s']} reports/s over {len(analyses)} contents")
+    print(f"{args.workers} threads: {summary['concurrent_reports_per_s']} reports/s over {len(results)} reports")
+    print(f"Results written to {args.output}")
+    if mismatches:
+        print(f"NONDETERMINISTIC: {mismatches} of {len(results)} reports differ from their reference")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
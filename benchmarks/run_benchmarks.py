@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+End-to-end stage benchmarks over the synthetic PRD corpus.
+
+Times every pipeline stage separately for each (format, page count) pair,
+writes machine-readable results and fails when a stage exceeds its budget
+in thresholds.json (base_ms + ms_per_page * pages, compared on the median).
+
+    python -m benchmarks.run_benchmarks --pages 1 10 100 500 --formats txt docx pptx pdf
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# The analyzer is created at import time of app.main; never hit the network here
+os.environ.setdefault("LLM_REPLAY_MODE", "replay")
+os.environ.setdefault("LLM_STUB_PROFILE", "synthetic")
+os.environ.setdefault("LLM_STUB_TTFT_MS", "0")
+os.environ.setdefault("LLM_STUB_TOKENS_PER_SEC", "0")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import main as app_main  # noqa: E402
+from app.schemas import UIReport  # noqa: E402
+from app.services.keywords import keyword_matcher  # noqa: E402
+from app.services.parser import extract_text_from_bytes  # noqa: E402
+from app.services.text_index import TokenIndex, token_index  # noqa: E402
+from benchmarks.corpus import RENDERERS, build_document  # noqa: E402
+
+DEFAULT_THRESHOLDS = Path(__file__).resolve().parent / "thresholds.json"
+
+
+def _time(fn, repeat: int):
+    """Run fn `repeat` times with stdout silenced; return (last result, timings in ms)"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            result = fn()
+            timings.append((time.perf_counter() - started) * 1000)
+    return result, timings
+
+
+def _summary(timings):
+    return {
+        "min_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "max_ms": round(max(timings), 3),
+    }
+
+
+def bench_document(fmt: str, pages: int, repeat: int, with_llm: bool) -> dict:
+    file_bytes, content_type = build_document(fmt, pages)
+    analyzer = app_main.analyzer
+    stages = {}
+
+    text, t = _time(lambda: extract_text_from_bytes(file_bytes, content_type), repeat)
+    stages["extract_text_from_bytes"] = t
+
+    # Tokenization (with the lowercased tokens every analyzer reads), built from scratch each time
+    _, t = _time(lambda: TokenIndex(text).lower_tokens, repeat)
+    stages["token_index"] = t
+    token_index(text)
+
+    def keyword_scan():
+        # Cold scan of every keyword table over the shared token index (analyzers share the cached result in the pipeline)
+        keyword_matcher.clear_cache()
+        return keyword_matcher.scan(text)
+
+    _, t = _time(keyword_scan, repeat)
+    stages["keyword_scan"] = t
+
+    domain, t = _time(lambda: app_main.detect_domain_from_text(text), repeat)
+    stages["detect_domain_from_text"] = t
+
+    _, t = _time(lambda: app_main.extract_detailed_pdf_content(text), repeat)
+    stages["extract_detailed_pdf_content"] = t
+
+    prompt, t = _time(lambda: app_main.generate_dynamic_prompt(text, "Benchmark Project", domain), repeat)
+    stages["generate_dynamic_prompt"] = t
+
+    analysis, t = _time(lambda: analyzer._analyze_document_content(text), repeat)
+    stages["analyze_document_content"] = t
+
+    payload = analyzer._create_fallback_design(analysis)
+    report, t = _time(lambda: UIReport(
+        project_name=payload["project_name"],
+        summary=payload["summary"],
+        screens=payload["screens"],
+        styles=payload["styles"],
+    ), repeat)
+    stages["report_validation"] = t
+
+    report_dict = report.model_dump()
+    _, t = _time(lambda: app_main.render_report_html(report_dict, domain, None, prompt), repeat)
+    stages["render_report_html"] = t
+
+    if with_llm:
+        _, t = _time(lambda: app_main.build_ui_report("Benchmark Project", text, domain), repeat)
+        stages["build_ui_report"] = t
+
+    return {
+        "format": fmt,
+        "pages": pages,
+        "bytes": len(file_bytes),
+        "chars": len(text),
+        "stages": {name: _summary(timings) for name, timings in stages.items()},
+    }
+
+
+def check_thresholds(results: list, thresholds: dict) -> list:
+    regressions = []
+    budgets = thresholds.get("stages", {})
+    for result in results:
+        for stage, stats in result["stages"].items():
+            budget = budgets.get(stage)
+            if not budget:
+                continue
+            limit = budget.get("base_ms", 0) + budget.get("ms_per_page", 0) * result["pages"]
+            if stats["median_ms"] > limit:
+                regressions.append({
+                    "format": result["format"],
+                    "pages": result["pages"],
+                    "stage": stage,
+                    "median_ms": stats["median_ms"],
+                    "limit_ms": round(limit, 3),
+                })
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages over a synthetic PRD corpus")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 100, 500])
+    parser.add_argument("--formats", nargs="+", default=["txt", "docx", "pdf"], choices=sorted(RENDERERS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--thresholds", default=str(DEFAULT_THRESHOLDS))
+    parser.add_argument("--with-llm", action="store_true", help="also time build_ui_report against the replay client")
+    args = parser.parse_args()
+
+    results = []
+    for fmt in args.formats:
+        for pages in args.pages:
+            result = bench_document(fmt, pages, args.repeat, args.with_llm)
+            results.append(result)
+            stage_line = ", ".join(f"{k}={v['median_ms']:.1f}ms" for k, v in result["stages"].items())
+            print(f"{fmt:>4} {pages:>4}p: {stage_line}")
+
+    thresholds = {}
+    if args.thresholds and os.path.exists(args.thresholds):
+        with open(args.thresholds, "r", encoding="utf-8") as f:
+            thresholds = json.load(f)
+    regressions = check_thresholds(results, thresholds)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "repeat": args.repeat,
+                "timestamp": int(time.time()),
+            },
+            "results": results,
+            "regressions": regressions,
+        }, f, indent=2)
+
+    print(f"Results written to {args.output}")
+    for r in regressions:
+        print(f"REGRESSION {r['format']} {r['pages']}p {r['stage']}: {r['median_ms']}ms > {r['limit_ms']}ms")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
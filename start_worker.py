@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Report generation worker for the durable SQLite job queue.
+
+Claims jobs enqueued by POST /jobs, runs the build_ui_report + Figma
+pipeline and stores the result. Run as many worker processes as the box
+allows; web and generation capacity scale independently as long as they
+share JOB_DB_PATH.
+"""
+
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+
+
+def _heartbeat(queue, job_id: str, worker_id: str, stop: threading.Event) -> None:
+    """Keep the lease alive while the pipeline runs (renew at a third of the lease)"""
+    while not stop.wait(LEASE_SECONDS / 3):
+        if not queue.heartbeat(job_id, worker_id, LEASE_SECONDS):
+            print(f"[{worker_id}] Lost lease on job {job_id}")
+            return
+
+
+def run_job(job: dict) -> dict:
+    from app.main import run_upload_pipeline
+    from app.services import metrics
+    from app.services.fast_json import encode_report
+
+    metrics.start_trace()
+    payload = job["payload"]
+    report, prompt_used, domain, figma_url = run_upload_pipeline(
+        job["file_bytes"] or b"",
+        payload.get("content_type", ""),
+        payload.get("filename", "document"),
+        payload.get("sha256"),
+        payload.get("project"),
+    )
+    return {
+        "figma_url": figma_url,
+        "report": encode_report(report).data,
+        "prompt_used": prompt_used,
+        "domain": domain,
+        "token_usage": metrics.request_usage().as_dict(),
+    }
+
+
+def worker_loop(index: int = 0) -> None:
+    from app.services.job_queue import JobQueue
+
+    queue = JobQueue()
+    worker_id = f"{socket.gethostname()}-{os.getpid()}-{index}"
+    stopping = threading.Event()
+
+    def _stop(signum, frame):
+        print(f"[{worker_id}] Stopping after current job")
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    print(f"[{worker_id}] Worker ready, polling {queue.path}")
+    while not stopping.is_set():
+        job = queue.claim(worker_id, LEASE_SECONDS)
+        if job is None:
+            stopping.wait(POLL_INTERVAL)
+            continue
+
+        print(f"[{worker_id}] Running job {job['id']} (attempt {job['attempts']}/{job['max_attempts']})")
+        stop_heartbeat = threading.Event()
+        beat = threading.Thread(target=_heartbeat, args=(queue, job["id"], worker_id, stop_heartbeat), daemon=True)
+        beat.start()
+        started = time.perf_counter()
+        try:
+            result = run_job(job)
+            queue.complete(job["id"], worker_id, result)
+            print(f"[{worker_id}] Job {job['id']} done in {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            traceback.print_exc()
+            queue.fail(job["id"], worker_id, f"{type(e).__name__}: {e}")
+            print(f"[{worker_id}] Job {job['id']} failed: {e}")
+        finally:
+            stop_heartbeat.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run report generation workers")
+    parser.add_argument("--processes", type=int, default=int(os.getenv("WORKER_PROCESSES", "1")))
+    args = parser.parse_args()
+
+    print("Starting report generation workers")
+    print("=" * 40)
+    print("Job database:", os.getenv("JOB_DB_PATH", "./jobs.db"))
+    print("Worker processes:", args.processes)
+    print("Lease:", LEASE_SECONDS, "seconds")
+    print("=" * 40)
+
+    if args.processes <= 1:
+        worker_loop(0)
+        return
+
+    processes = [multiprocessing.Process(target=worker_loop, args=(i,)) for i in range(args.processes)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        print("\nWorkers stopped by user")
+
+
+if __name__ == "__main__":
+    main()
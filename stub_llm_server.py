@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI/Groq-compatible stub server for offline load tests.
+
+Replays completions captured with LLM_REPLAY_MODE=record, either with their
+original timing or with a synthetic latency / token-rate profile.
+
+Usage:
+    LLM_CASSETTE_PATH=./llm_cassette.jsonl python stub_llm_server.py
+    GROQ_BASE_URL=http://localhost:8100 GROQ_API_KEY=stub uvicorn app.main:app
+"""
+
+import asyncio
+import json
+import os
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.services.llm_replay import Cassette, LatencyProfile, ReplayClient
+
+cassette = Cassette(os.getenv("LLM_CASSETTE_PATH", "./llm_cassette.jsonl"))
+profile = LatencyProfile.from_env()
+replayer = ReplayClient(cassette, profile, strict=os.getenv("LLM_REPLAY_STRICT", "false").lower() == "true")
+
+app = FastAPI(title="Stub LLM Server")
+
+
+def _split_tokens(content: str, count: int) -> list:
+    """Split content into `count` roughly equal chunks to stream as tokens"""
+    count = max(1, min(count, len(content) or 1))
+    step = -(-len(content) // count)
+    return [content[i:i + step] for i in range(0, len(content), step)] or [""]
+
+
+async def _stream(entry: dict, model: str):
+    created = int(time.time())
+    chunks = _split_tokens(entry["content"], int(entry.get("completion_tokens") or 1))
+    delays = profile.token_delays({**entry, "completion_tokens": len(chunks)})
+    for index, (chunk, delay) in enumerate(zip(chunks, delays)):
+        if delay > 0:
+            await asyncio.sleep(delay)
+        delta = {"content": chunk}
+        if index == 0:
+            delta["role"] = "assistant"
+        payload = {
+            "id": f"stub-{entry['key'][:12]}",
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+        }
+        yield f"data: {json.dumps(payload)}\n\n"
+    final = {
+        "id": f"stub-{entry['key'][:12]}",
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+    }
+    yield f"data: {json.dumps(final)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/openai/v1/chat/completions")
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "stub-model")
+    entry = replayer.resolve(model, body.get("messages", []))
+
+    if body.get("stream"):
+        return StreamingResponse(_stream(entry, model), media_type="text/event-stream")
+
+    delay = profile.total_delay(entry)
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+    prompt_tokens = entry.get("prompt_tokens", 0)
+    completion_tokens = entry.get("completion_tokens", 0)
+    return JSONResponse({
+        "id": f"stub-{entry['key'][:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": entry["content"]},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    })
+
+
+@app.get("/openai/v1/models")
+@app.get("/v1/models")
+async def list_models():
+    models = sorted({e.get("model", "stub-model") for e in cassette.entries} or {"stub-model"})
+    return {"object": "list", "data": [{"id": m, "object": "model", "owned_by": "stub"} for m in models]}
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "recorded_completions": len(cassette.entries), "profile": profile.mode}
+
+
+def main():
+    port = int(os.getenv("LLM_STUB_PORT", "8100"))
+    print("Starting stub LLM server")
+    print("=" * 40)
+    print("Cassette:", cassette.path, f"({len(cassette.entries)} completions)")
+    print("Latency profile:", profile.mode)
+    print(f"Point the API at it with: GROQ_BASE_URL=http://localhost:{port}")
+    print("=" * 40)
+    uvicorn.run(app, host="0.0.0.0", port=port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,11 @@
 #!/usr/bin/env python3
 """
 Test script to demonstrate dynamic color generation
-Run this to see how colors change each time
+Run this to see how colors change with the content (and stay the same for the same content)
 """
 
 import sys
 import os
-import time
 
 # Add the app directory to Python path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
@@ -32,21 +31,18 @@ def test_dynamic_colors():
         print(f"\n{i}. Project: {project}")
         print("-" * 30)
         
-        # Generate colors multiple times to show variation
+        # Generate colors multiple times to show they are reproducible
         for attempt in range(3):
             colors = generator.generate_professional_color_palette(project)
             print(f"  Attempt {attempt + 1}:")
             print(f"    Primary:   {colors['primary']}")
             print(f"    Secondary: {colors['secondary']}")
             print(f"    Accent:    {colors['accent']}")
-            
-            # Small delay to ensure different timestamps
-            time.sleep(0.1)
         
         print()
     
-    print("Each run produces unique, professional color schemes!")
-    print("Colors are generated based on content + timestamp for true dynamism")
+    print("Each project gets its own professional color scheme!")
+    print("Colors are seeded from the content, so the same document always gets the same palette")
 
 if __name__ == "__main__":
     test_dynamic_colors()
\ No newline at end of file
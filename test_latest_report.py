@@ -20,6 +20,16 @@ def test_latest_report():
         if response.status_code == 200:
             data = response.json()
             print(f"SUCCESS: {json.dumps(data, indent=2)}")
+            
+            etag = response.headers.get("ETag")
+            if etag:
+                # Unchanged report: 304 with an empty body
+                response = requests.get(url, headers={"If-None-Match": etag}, timeout=5)
+                print(f"Conditional GET: {response.status_code} ({len(response.content)} bytes)")
+                # Long-poll: held until a newer report is published, 304 after `wait` seconds
+                print("Long-polling for a newer report (upload a document now)...")
+                response = requests.get(url, params={"wait": 20}, headers={"If-None-Match": etag}, timeout=30)
+                print(f"Long-poll: {response.status_code} (version {response.headers.get('X-Report-Version')})")
         else:
             print(f"ERROR: {response.status_code} - {response.text}")
             